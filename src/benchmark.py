@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+'''Benchmark the key flows of the page-object layer.
+
+Every flow runs N times against a reproducible target, by default a fresh
+local stand-in storefront, on one reused browser that is reset between runs.
+p50/p95 wall time and the number of WebDriver commands of every flow are
+compared against a stored baseline.
+
+    python benchmark.py --runs 10                   # compare with the baseline
+    python benchmark.py --runs 10 --update-baseline # record a new baseline
+'''
+import argparse
+import json
+import os
+import sys
+import time
+
+from pom import timing
+from pom.driver import PROFILES, LaunchOptions, reset_driver
+from pom.pages import BasePage, CartModal, CartPage, HomePage, SearchResultsPage, SignInPage
+from pom.scenarios import SHIPPING_COST, Scenario
+from pom.stats import percentile
+from storefront.server import StorefrontServer
+
+# Next to this script, so it is found whatever directory it runs from.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'benchmark_baseline.json')
+
+
+def flow_home_load(driver, home_url):
+    '''Load the home page and read the product catalog.'''
+    BasePage(driver).get(home_url)
+    assert(HomePage(driver).catalog())
+
+
+def flow_search(driver, home_url):
+    '''Search for a known term from the home page and check the results.'''
+    homepage = HomePage(driver)
+    homepage.get(home_url)
+    homepage.search_and_click('Dress')
+    assert(SearchResultsPage(driver).check_results_known_search_term('Dress'))
+
+
+def flow_add_all_to_cart(driver, home_url):
+    '''Add every home page product through hover, click and the cart modal.'''
+    homepage = HomePage(driver)
+    homepage.get(home_url)
+    cart_items = homepage.items_list()
+    price_total = 0.0
+    for product in homepage.catalog():
+        (name, price) = homepage.hover_then_click_add(cart_items[product.index], product)
+        price_total = float('{0:.2f}'.format(price_total + price))
+        model = CartModal(driver)
+        assert(model.confirm_cart_product_name(name))
+        assert(model.confirm_block_product_total(price_total))
+        model.close_modal()
+
+
+def flow_cart_edit(driver, home_url):
+    '''Seed a cart, then add, subtract and remove on the cart page.'''
+    cart_list = Scenario(driver, home_url).cart()
+    cartpage = CartPage(driver)
+    assert(cartpage.click_cart_page())
+    cartpage.add_product_item()
+    cartpage.delete_product_item()
+    cartpage.remove_product_item()
+    assert(cartpage.check_cart_correctness(SHIPPING_COST, cart_list[1:]))
+
+
+def flow_login_matrix(driver, home_url):
+    '''Run every case of data/logins.yml through the sign in form.'''
+    Scenario(driver, home_url).sign_in_page()
+    SignInPage(driver).check_login_behavior()
+
+
+FLOWS = [flow_home_load, flow_search, flow_add_all_to_cart, flow_cart_edit, flow_login_matrix]
+
+
+def run_flow(flow, driver, home_url, runs):
+    '''Run a flow `runs` times, returning wall times (s) and command counts.'''
+    durations, commands = [], []
+    for _ in range(runs):
+        timeline = timing.Timeline()
+        timing.activate(timeline)
+        start = time.perf_counter()
+        try:
+            flow(driver, home_url)
+        finally:
+            durations.append(time.perf_counter() - start)
+            timing.activate(None)
+            reset_driver(driver)
+        commands.append(sum(1 for span in timeline.spans if span.category == 'command'))
+    return {'runs': runs,
+            'p50_s': percentile(durations, 50),
+            'p95_s': percentile(durations, 95),
+            'commands': max(commands)}
+
+
+def compare(results, baseline, threshold):
+    '''Regressions of results against baseline.
+
+    A flow regresses when its p50 or p95 grows by more than threshold (0.2 is
+    20%) or it sends more WebDriver commands than it used to.'''
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ('p50_s', 'p95_s'):
+            if result[key] > base[key] * (1 + threshold):
+                regressions.append('{}: {} {:.3f}s > baseline {:.3f}s (+{:.0%} allowed)'.format(
+                    name, key[:3], result[key], base[key], threshold))
+        if result['commands'] > base['commands']:
+            regressions.append('{}: {} WebDriver commands > baseline {}'.format(
+                name, result['commands'], base['commands']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the page-object flows.')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per flow.')
+    parser.add_argument('--base-url', default='local',
+                        help='Store to run against, "local" (default) starts the stand-in storefront.')
+    parser.add_argument('--driver-profile', choices=sorted(PROFILES), default='default',
+                        help='Named Chrome launch profile.')
+    parser.add_argument('--flow', action='append', choices=[f.__name__[len('flow_'):] for f in FLOWS],
+                        help='Only run this flow, can be repeated.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON file.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative slowdown before a flow counts as regressed.')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store these results as the new baseline instead of comparing.')
+    args = parser.parse_args()
+
+    server = StorefrontServer().start() if args.base_url == 'local' else None
+    home_url = (server.url if server else args.base_url.rstrip('/')) + '/index.php'
+    launch_options = LaunchOptions.profile(args.driver_profile)
+    driver = timing.instrument_driver(launch_options.launch())
+    print('{:<16} {:7.3f}s'.format('startup', launch_options.startup_times[0]))
+    results = {}
+    try:
+        for flow in FLOWS:
+            name = flow.__name__[len('flow_'):]
+            if args.flow and name not in args.flow:
+                continue
+            # One untimed run to warm the browser cache and the server.
+            flow(driver, home_url)
+            reset_driver(driver)
+            results[name] = run_flow(flow, driver, home_url, args.runs)
+            print('{:<16} p50 {p50_s:7.3f}s  p95 {p95_s:7.3f}s  commands {commands:4d}'.format(name, **results[name]))
+    finally:
+        driver.quit()
+        if server:
+            server.stop()
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline:
+            json.dump(results, baseline, indent=2, sort_keys=True)
+        print('Baseline written to {}'.format(args.baseline))
+        return 0
+
+    try:
+        with open(args.baseline, 'r') as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+    except IOError:
+        print('No baseline at {}, run with --update-baseline first.'.format(args.baseline))
+        return 0
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,438 @@
+import os
+import re
+import pytest
+from pom import metrics, results, timing, waits
+from pom.checkpoint import CheckpointStore
+from pom.driver import DEFAULT_BLOCKLIST, PAGE_LOAD_STRATEGIES, PROFILES, DriverPool, LaunchOptions, worker_id
+from pom.http import StoreClient
+from pom.pages import CartPage, HomePage, SignInPage
+from pom.resources import ResourceMonitor
+from pom.scenarios import PASSWORD, SHIPPING_COST, USERNAME, Scenario
+from pom.session import SessionCache
+from pom.traffic import TrafficRecorder
+from storefront.server import StorefrontServer
+
+# The store we test against unless told otherwise.
+PRACTICE_WEBPAGE_URL = 'http://automationpractice.com'
+
+def pytest_addoption(parser):
+    parser.addoption('--base-url', default=PRACTICE_WEBPAGE_URL,
+                     help='Base URL of the store under test. "local" starts the bundled '
+                          'stand-in storefront on a free loopback port.')
+    group = parser.getgroup('launch', 'browser launch profile')
+    group.addoption('--driver-profile', choices=sorted(PROFILES), default='default',
+                    help='Named Chrome profile: "headless", "lean" (headless, no GPU, extensions or '
+                         'background services, profile in tmpfs) or "ci" (lean without sandbox).')
+    group.addoption('--user-data-dir', metavar='DIR',
+                    help='Keep the Chrome profiles under DIR so their disk cache survives the run, '
+                         '"tmpfs" for throwaway profiles in RAM.')
+    group.addoption('--page-load-strategy', choices=PAGE_LOAD_STRATEGIES, default='normal',
+                    help='What driver.get() waits for. The page objects wait for their own elements.')
+    group.addoption('--block-images', action='store_true', help="Don't load images.")
+    group.addoption('--block-urls', default='',
+                    help='Comma separated URL patterns not to load, "default" for fonts, '
+                         'analytics and ad scripts.')
+    group.addoption('--allow-hosts', default='',
+                    help='Comma separated hosts the browser may reach, all others fail to resolve.')
+    group.addoption('--traffic-report', metavar='PATH',
+                    help='Write requests and bytes of every page loaded to this JSON file.')
+    group = parser.getgroup('resources', 'browser memory budget')
+    group.addoption('--resource-report', metavar='PATH',
+                    help='Sample chromedriver/Chrome RSS and the JS heap after every test and write '
+                         'the growth per test to this JSON file.')
+    group.addoption('--max-browser-mb', type=float,
+                    help='Relaunch a browser once chromedriver and Chrome hold more than this many MB.')
+    group.addoption('--max-browser-age', type=float, metavar='SECONDS',
+                    help='Relaunch a browser once it has been running this long.')
+    group.addoption('--max-browser-tests', type=int,
+                    help='Relaunch a browser after this many tests.')
+    group = parser.getgroup('waits', 'wait policy')
+    group.addoption('--wait-timeout', type=float, default=10,
+                    help='Seconds page objects wait for an element or condition.')
+    group.addoption('--wait-poll', type=float, default=0.1,
+                    help='Seconds between two checks of a waited for condition.')
+    group.addoption('--absence-grace', type=float, default=1.0,
+                    help='Seconds a displayed element gets to go away when it is expected to be absent.')
+    group.addoption('--adaptive-waits', action='store_true',
+                    help='Learn per locator timeouts from observed latencies, so a locator that normally '
+                         'shows up quickly fails fast instead of after --wait-timeout.')
+    group = parser.getgroup('metrics', 'browser side performance metrics')
+    group.addoption('--metrics-report', metavar='DIR',
+                    help='Record Navigation Timing, resources and long tasks of every page the page objects '
+                         'load and the XHR latency of cart actions, write percentiles per page class and '
+                         'their trend over the previous runs to DIR/report.json.')
+    group.addoption('--metrics-history', type=int, default=10,
+                    help='Previous runs the trend is compared against.')
+    group.addoption('--metrics-threshold', type=float, default=0.2,
+                    help='Relative p50/p95 increase over the previous runs reported as a regression.')
+    group = parser.getgroup('results', 'result cache')
+    group.addoption('--result-cache', metavar='DIR',
+                    help='Reuse passing results of read-only checks (title, empty cart, empty search alert) '
+                         'while the page markup they read and pages.py/locators.py are unchanged.')
+    group.addoption('--result-cache-ttl', type=float, default=60 * 60,
+                    help='Seconds a cached result is reused.')
+    group.addoption('--refresh-results', action='store_true',
+                    help='Run every cached check again and store its fresh result.')
+    group = parser.getgroup('checkpoints', 'checkpoint and resume')
+    group.addoption('--checkpoints', metavar='DIR',
+                    help='Checkpoint every test to DIR: its outcome and, when it passed, the cookies, URL '
+                         'and cart model of its browser.')
+    group.addoption('--resume', action='store_true',
+                    help='Skip the tests that passed in the last --checkpoints run up to the first that '
+                         "didn't, and seed the shared cart from its newest checkpoint.")
+    parser.addoption('--hybrid', action='store_true',
+                     help='Check server side facts (the login matrix, cart totals) over HTTP instead of in '
+                          'the browser.')
+    parser.addoption('--session-cache', metavar='DIR',
+                     help='Persist the signed in session here so workers and later runs reuse it.')
+    parser.addoption('--session-ttl', type=float, default=15 * 60,
+                     help='Seconds a signed in session is reused before logging in again.')
+    parser.addoption('--timing-report', metavar='DIR',
+                     help='Time every page-object action and WebDriver command, write a JSON '
+                          'summary per test and a Chrome trace per worker to DIR.')
+
+def pytest_configure(config):
+    '''Set up the wait policy and result cache every page object uses, in
+    every worker, and the checkpoints. The controller (or the only process without pytest-xdist)
+    prepares the checkpoint directory before any worker runs a test.'''
+    waits.set_default_policy(waits.WaitPolicy(timeout=config.getoption('wait_timeout'),
+                                              poll=config.getoption('wait_poll'),
+                                              absence_grace=config.getoption('absence_grace'),
+                                              adaptive=config.getoption('adaptive_waits')))
+    if config.getoption('result_cache'):
+        results.activate(results.ResultCache(config.getoption('result_cache'),
+                                             ttl=config.getoption('result_cache_ttl'),
+                                             refresh=config.getoption('refresh_results')))
+    if config.getoption('metrics_report') and not hasattr(config, 'workerinput'):
+        metrics.prepare(config.getoption('metrics_report'))
+    directory = config.getoption('checkpoints')
+    if config.getoption('resume') and not directory:
+        raise pytest.UsageError('--resume needs the --checkpoints DIR of the run to resume')
+    config.checkpoints = CheckpointStore(directory) if directory else None
+    if config.checkpoints is None:
+        return
+    if not hasattr(config, 'workerinput'):
+        if config.getoption('resume'):
+            config.checkpoints.freeze()
+        else:
+            config.checkpoints.clear()
+    if config.getoption('resume'):
+        config.checkpoints.thaw()
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    '''With --resume, deselect the tests that passed last time up to the first
+    one that didn't, after -k and -m had their say. When they all passed,
+    everything runs again.'''
+    checkpoints = config.checkpoints
+    if checkpoints is None or not config.getoption('resume'):
+        return
+    nodeids = [item.nodeid for item in items]
+    start = checkpoints.resume_point(nodeids)
+    if start in (0, len(items)):
+        return
+    reporter = config.pluginmanager.getplugin('terminalreporter')
+    if reporter is not None:
+        nearest = checkpoints.nearest(nodeids, start)
+        reporter.write_line('resuming at {}, {} test(s) passed last run{}'.format(
+            nodeids[start], start, ', nearest checkpoint {} at {}'.format(nearest.test, nearest.url)
+            if nearest else ''))
+    config.hook.pytest_deselected(items=items[:start])
+    items[:] = items[start:]
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session):
+    '''Merge the metrics every worker wrote, once they are all done, and print
+    the regressions against the previous runs.'''
+    config = session.config
+    directory = config.getoption('metrics_report')
+    if not directory or hasattr(config, 'workerinput'):
+        return
+    report = metrics.report(directory, config.getoption('metrics_history'), config.getoption('metrics_threshold'))
+    reporter = config.pluginmanager.getplugin('terminalreporter')
+    if report is None or reporter is None:
+        return
+    regressions = [row for row in report['trend'] if row['regression']]
+    reporter.write_line('{} page loads and {} cart actions measured, {} regression(s) against the '
+                        'previous runs'.format(report['navigations'], report['ajax'], len(regressions)))
+    for row in regressions:
+        reporter.write_line('  {name} {figure}: {value:.1f} vs {baseline:.1f} ({change:+.0%})'.format(**row))
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    '''Keep the report of every phase on the test item, and checkpoint tests
+    that failed or were skipped. Passing tests are checkpointed by the
+    browser fixture, with the state of their browser.'''
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, 'rep_' + report.when, report)
+    checkpoints = item.config.checkpoints
+    if checkpoints is None:
+        return
+    if report.failed:
+        checkpoints.fail(item.nodeid)
+    elif report.skipped:
+        checkpoints.skip(item.nodeid)
+    elif report.when == 'call':
+        checkpoints.record(item.nodeid)
+
+def split_option(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+@pytest.fixture(scope='session')
+def launch_options(request):
+    '''pytest test fixture for how browsers are launched.'''
+    config = request.config
+    blocklist = split_option(config.getoption('block_urls'))
+    if 'default' in blocklist:
+        blocklist.remove('default')
+        blocklist.extend(DEFAULT_BLOCKLIST)
+    overrides = {}
+    if config.getoption('user_data_dir'):
+        overrides['user_data_dir'] = config.getoption('user_data_dir')
+    return LaunchOptions.profile(config.getoption('driver_profile'),
+                                 page_load_strategy=config.getoption('page_load_strategy'),
+                                 block_images=config.getoption('block_images'),
+                                 blocklist=blocklist,
+                                 allowlist=split_option(config.getoption('allow_hosts')),
+                                 **overrides)
+
+@pytest.fixture(scope='session')
+def traffic_recorder(request):
+    '''pytest test fixture recording the traffic of every page when asked to.'''
+    path = request.config.getoption('traffic_report')
+    if not path:
+        yield None
+        return
+    recorder = TrafficRecorder()
+    yield recorder
+    root, ext = os.path.splitext(path)
+    recorder.write('{}-{}{}'.format(root, worker_id(), ext) if 'PYTEST_XDIST_WORKER' in os.environ else path)
+
+@pytest.fixture(scope='session')
+def resource_monitor(request):
+    '''pytest test fixture sampling browser memory, None unless a report or a
+    budget is asked for.'''
+    config = request.config
+    path = config.getoption('resource_report')
+    budgets = (config.getoption('max_browser_mb'), config.getoption('max_browser_age'),
+               config.getoption('max_browser_tests'))
+    if not path and all(budget is None for budget in budgets):
+        yield None
+        return
+    monitor = ResourceMonitor(*budgets)
+    yield monitor
+    if path:
+        root, ext = os.path.splitext(path)
+        monitor.write('{}-{}{}'.format(root, worker_id(), ext) if 'PYTEST_XDIST_WORKER' in os.environ else path)
+
+@pytest.fixture(scope='session')
+def base_url(request):
+    '''pytest test fixture for the base URL of the store under test.
+    With `--base-url local` each worker serves its own stand-in storefront.'''
+    url = request.config.getoption('base_url')
+    if url != 'local':
+        yield url.rstrip('/')
+        return
+    with StorefrontServer() as server:
+        yield server.url
+
+@pytest.fixture(scope='session')
+def home_url(base_url):
+    return base_url + '/index.php'
+
+@pytest.fixture(scope='session')
+def checkout_url(home_url):
+    return home_url + '?controller=order'
+
+@pytest.fixture(scope='session')
+def timeline(request):
+    '''pytest test fixture for the timing instrumentation, None when it is off.'''
+    directory = request.config.getoption('timing_report')
+    if not directory:
+        yield None
+        return
+    os.makedirs(directory, exist_ok=True)
+    timeline = timing.Timeline()
+    timing.activate(timeline)
+    try:
+        yield timeline
+    finally:
+        timing.activate(None)
+        timeline.write_trace(os.path.join(directory, 'trace-{}.json'.format(worker_id())))
+
+@pytest.fixture(autouse=True)
+def timing_summary(request, timeline):
+    '''Write the timing summary of every test once it is done.'''
+    yield
+    if timeline is not None:
+        name = re.sub(r'[^\w.-]+', '_', request.node.nodeid)
+        timeline.write_summary(request.node.nodeid,
+                               os.path.join(request.config.getoption('timing_report'), name + '.json'))
+
+@pytest.fixture(scope='session')
+def metrics_recorder(request):
+    '''pytest test fixture recording browser side metrics, None when they are off.'''
+    directory = request.config.getoption('metrics_report')
+    if not directory:
+        yield None
+        return
+    recorder = metrics.MetricsRecorder()
+    metrics.activate(recorder)
+    try:
+        yield recorder
+    finally:
+        metrics.activate(None)
+        recorder.write(os.path.join(directory, 'samples-{}.json'.format(worker_id())))
+
+@pytest.fixture(scope='session')
+def driver_pool(request, home_url, launch_options, traffic_recorder, timeline, resource_monitor,
+                metrics_recorder):
+    '''pytest test fixture for the worker's driver pool.
+    Each pytest-xdist worker is its own process and gets its own pool. Drivers
+    are launched lazily on first lease, so collecting tests never starts a
+    browser, and all quit once the session ends. Drivers over their memory or
+    age budget are relaunched.'''
+    def launch():
+        driver = launch_options.launch()
+        if timeline is not None:
+            timing.instrument_driver(driver)
+        if resource_monitor is not None:
+            resource_monitor.register(driver)
+        if metrics_recorder is not None:
+            metrics.instrument(driver)
+        return traffic_recorder.attach(driver) if traffic_recorder else driver
+
+    pool = DriverPool(factory=launch, warm_url=home_url,
+                      retire=resource_monitor.retire if resource_monitor else None)
+    try:
+        yield pool
+    finally:
+        pool.close()
+        report_startup(request.config, launch_options, resource_monitor)
+
+def report_startup(config, launch_options, resource_monitor=None):
+    '''Print how long the browsers of this worker took to start and how many
+    were relaunched over their budget.'''
+    startup = launch_options.startup_summary()
+    reporter = config.pluginmanager.getplugin('terminalreporter')
+    if not startup['count'] or reporter is None:
+        return
+    reporter.write_line('[{}] {} browser(s) started with profile "{}": mean {:.2f}s, max {:.2f}s'.format(
+        worker_id(), startup['count'], config.getoption('driver_profile'), startup['mean'], startup['max']))
+    if resource_monitor is not None:
+        summary = resource_monitor.summary()
+        reporter.write_line('[{}] peak browser RSS {:.0f}MB, {} browser(s) relaunched over budget'.format(
+            worker_id(), summary['peak_rss_mb'], summary['recycled']))
+
+@pytest.fixture
+def browser(request, driver_pool, home_url, resource_monitor):
+    '''pytest test fixture for initializing the browser.
+    Every test leases a pre-warmed driver from the pool, its cookies and storage
+    are reset afterwards instead of relaunching Chrome. No state is carried from
+    one test to the next so tests can run in any order and on any worker.
+
+    Args:
+        driver_pool (obj): Worker driver pool fixture.
+        home_url (str): THe webpage URL for the webdrive initialization.'''
+    with driver_pool.lease() as driver:
+        HomePage(driver).get(home_url)
+        yield driver
+        if resource_monitor is not None:
+            resource_monitor.sample(driver, request.node.nodeid)
+        checkpoint(request, driver)
+
+def checkpoint(request, driver):
+    '''Checkpoint a passing test with its browser and the cart model it
+    changed or restored, if it had one.'''
+    checkpoints = request.config.checkpoints
+    report = getattr(request.node, 'rep_call', None)
+    if checkpoints is None or report is None or not report.passed:
+        return
+    funcargs = request.node.funcargs or {}
+    cart = funcargs.get('cart_list', funcargs.get('restored_cart'))
+    checkpoints.record(request.node.nodeid, driver, cart)
+
+@pytest.fixture
+def scenario(browser, home_url):
+    '''pytest test fixture to seed the state a test starts from.'''
+    return Scenario(browser, home_url)
+
+@pytest.fixture(scope='session')
+def session_cache(request, home_url):
+    '''pytest test fixture for the signed in session, logged in once and reused.'''
+    def login(driver):
+        return Scenario(driver, home_url).login(USERNAME, PASSWORD)
+    return SessionCache(login, key='{}@{}'.format(USERNAME, home_url),
+                        ttl=request.config.getoption('session_ttl'),
+                        directory=request.config.getoption('session_cache'))
+
+@pytest.fixture
+def signed_in(browser, session_cache):
+    '''pytest test fixture for a browser signed in as the test account.
+    Replays cached session cookies instead of going through the login form.'''
+    assert(session_cache.sign_in(browser))
+
+@pytest.fixture
+def cart_list(scenario):
+    '''pytest test fixture for a cart seeded with every home page product.
+    Returns the list data object for tracking cart items.'''
+    return scenario.cart()
+
+@pytest.fixture(scope='session')
+def cart_state(request, driver_pool, home_url):
+    '''pytest test fixture for a cart with every home page product, seeded once
+    per worker and captured so tests can restore it in milliseconds. A resumed
+    run takes the newest checkpointed cart the store still holds instead.'''
+    checkpoints = request.config.checkpoints
+    if checkpoints is not None and request.config.getoption('resume'):
+        for state in checkpoints.carts():
+            if StoreClient.from_cookies(home_url, state.cookies).check_cart_correctness(SHIPPING_COST, state.items):
+                return state
+    with driver_pool.lease() as driver:
+        cart_list = Scenario(driver, home_url).cart()
+        return CartPage(driver).capture_state(cart_list)
+
+@pytest.fixture
+def restored_cart(browser, cart_state):
+    '''pytest test fixture restoring the captured cart into the browser.
+    Returns the list data object for tracking cart items. The cart is shared,
+    tests that change it take cart_list instead.'''
+    return CartPage(browser).restore_state(cart_state, SHIPPING_COST)
+
+@pytest.fixture
+def cartpage(browser, cart_list):
+    '''pytest test fixture for the cart page of a seeded cart.'''
+    cartpage = CartPage(browser)
+    assert(cartpage.click_cart_page())
+    return cartpage
+
+@pytest.fixture
+def store_client(home_url):
+    '''pytest test fixture for an HTTP client in a fresh store session.'''
+    return StoreClient(home_url)
+
+@pytest.fixture
+def cart_check(request, browser, home_url):
+    '''pytest test fixture checking the cart of the browser's session against
+    a cart_list model. With --hybrid the totals are asked from the store over
+    HTTP with the browser's cookies, otherwise they are read on the cart page.'''
+    def check(shipping_price, cart_items):
+        if request.config.getoption('hybrid'):
+            client = StoreClient.from_driver(browser, home_url)
+            return client.check_cart_correctness(shipping_price, cart_items)
+        cartpage = CartPage(browser)
+        assert(cartpage.click_cart_page())
+        return cartpage.check_cart_correctness(shipping_price, cart_items)
+    return check
+
+@pytest.fixture
+def login_check(request, home_url):
+    '''pytest test fixture checking one logins.yml case. With --hybrid the form
+    is posted over HTTP without leasing a browser, otherwise it is filled out
+    in a browser on the sign in page.'''
+    if request.config.getoption('hybrid'):
+        return StoreClient(home_url).check_login_case
+    browser = request.getfixturevalue('browser')
+    Scenario(browser, home_url).sign_in_page()
+    return SignInPage(browser).check_login_case
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+'''Drive the store with concurrent shoppers built from the page objects.
+
+Every session is its own headless browser running weighted shopper journeys
+back to back until the run is over. Sessions start one after the other over
+the ramp-up period. Throughput, the latency percentiles of every journey step
+and error rates are reported overall and per interval.
+
+    python loadrun.py --sessions 8 --ramp-up 20 --duration 120
+    python loadrun.py --base-url http://127.0.0.1:8000 --journey browse=3 --journey checkout=1
+'''
+import argparse
+import contextlib
+import json
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from pom.driver import PROFILES, LaunchOptions, reset_driver
+from pom.pages import CartModal, CartPage, HomePage, SignInPage, load_login_cases
+from pom.scenarios import PASSWORD, USERNAME
+from pom.stats import percentile, summarize
+from storefront.server import StorefrontServer
+
+# The product whose row the cart page's FIRST_ROW_* locators point at.
+FIRST_ROW_PRODUCT = '1'
+
+Record = namedtuple('Record', ['session', 'journey', 'step', 'start', 'duration', 'error'])
+
+
+class Session(object):
+    '''One shopper: a browser and the steps its journeys record.'''
+
+    def __init__(self, number, driver, home_url, recorder, rng):
+        self.number = number
+        self.driver = driver
+        self.home_url = home_url
+        self.recorder = recorder
+        self.random = rng
+        self.journey = None
+
+    @contextlib.contextmanager
+    def step(self, name):
+        '''Record the latency of a journey step, and its error if it fails.'''
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            self.recorder.add(self.number, self.journey, name, start, time.perf_counter() - start, error)
+
+
+def add_products(session, count, id_product=None):
+    '''Add count random home page products through hover, click and the cart
+    modal, or only the product id_product when it is given.'''
+    homepage = HomePage(session.driver)
+    with session.step('home'):
+        homepage.get(session.home_url)
+        products = homepage.catalog()
+    items = homepage.items_list()
+    if id_product is not None:
+        chosen = [product for product in products if product.id_product == id_product][:1]
+    else:
+        chosen = session.random.sample(products, min(count, len(products)))
+    for product in chosen:
+        with session.step('add_to_cart'):
+            homepage.hover_then_click_add(items[product.index], product)
+            modal = CartModal(session.driver)
+            assert(modal.confirm_cart_product_name(product.name))
+            modal.close_modal()
+
+
+def journey_browse(session):
+    '''Look at the home page and put two products in the cart.'''
+    add_products(session, 2)
+
+
+def journey_cart_edit(session):
+    '''Add a product, then change its quantity on the cart page.'''
+    add_products(session, 1, id_product=FIRST_ROW_PRODUCT)
+    cartpage = CartPage(session.driver)
+    with session.step('cart_page'):
+        assert(cartpage.click_cart_page())
+    with session.step('add_qty'):
+        cartpage.add_product_item()
+    with session.step('subtract_qty'):
+        cartpage.delete_product_item()
+
+
+def journey_login(session):
+    '''Sign in with one of the logins.yml cases, most of them are rejected.'''
+    signin = SignInPage(session.driver)
+    with session.step('sign_in_page'):
+        signin.get(session.home_url)
+        assert(signin.click_signin_page())
+    with session.step('login'):
+        signin.check_login_case(session.random.choice(load_login_cases()))
+
+
+def journey_checkout(session):
+    '''Add a product, check out and sign in on the way to the address step.'''
+    add_products(session, 1)
+    cartpage = CartPage(session.driver)
+    signin = SignInPage(session.driver)
+    with session.step('cart_page'):
+        assert(cartpage.click_cart_page())
+    with session.step('checkout'):
+        cartpage.checkout()
+        assert(signin.check_authentication_page())
+    with session.step('login'):
+        signin.fillout_authenticator(USERNAME, PASSWORD)
+        assert(cartpage.is_address_page())
+
+
+JOURNEYS = {'browse': journey_browse, 'cart_edit': journey_cart_edit,
+            'login': journey_login, 'checkout': journey_checkout}
+
+# Relative frequency of every journey unless --journey says otherwise.
+DEFAULT_WEIGHTS = {'browse': 5, 'cart_edit': 2, 'login': 2, 'checkout': 1}
+
+
+class LoadRecorder(object):
+    '''Thread safe collection of step and journey records.
+
+    Journeys are recorded with step None, start times are relative to the
+    start of the run.'''
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.records = []
+        self.session_starts = []
+        self._lock = threading.Lock()
+
+    def add(self, session, journey, step, start, duration, error=None):
+        with self._lock:
+            self.records.append(Record(session, journey, step, start - self.origin, duration, error))
+
+    def session_started(self):
+        with self._lock:
+            self.session_starts.append(time.perf_counter() - self.origin)
+
+    def summary(self, elapsed):
+        '''Throughput, error rate and step latencies over the whole run.'''
+        journeys = [r for r in self.records if r.step is None]
+        errors = [r for r in journeys if r.error]
+        steps = {}
+        for record in self.records:
+            if record.step is not None:
+                steps.setdefault('{}.{}'.format(record.journey, record.step), []).append(record)
+        return {'elapsed_s': elapsed,
+                'sessions': len(self.session_starts),
+                'journeys': len(journeys),
+                'errors': len(errors),
+                'error_rate': len(errors) / len(journeys) if journeys else 0.0,
+                'throughput_per_s': len(journeys) / elapsed if elapsed else 0.0,
+                'errors_by_type': {error: sum(1 for r in errors if r.error == error)
+                                   for error in sorted(set(r.error for r in errors))},
+                'steps': {name: dict(summarize([r.duration for r in records if not r.error]),
+                                     errors=sum(1 for r in records if r.error))
+                          for name, records in sorted(steps.items())}}
+
+    def intervals(self, elapsed, interval):
+        '''Journeys, throughput, errors and p95 journey time per interval,
+        by the time journeys ended.'''
+        rows = []
+        journeys = [r for r in self.records if r.step is None]
+        start = 0.0
+        while start < elapsed:
+            end = start + interval
+            done = [r for r in journeys if start <= r.start + r.duration < end]
+            rows.append({'start_s': start,
+                         'sessions': sum(1 for t in self.session_starts if t < end),
+                         'journeys': len(done),
+                         'throughput_per_s': len(done) / interval,
+                         'errors': sum(1 for r in done if r.error),
+                         'p95_s': percentile([r.duration for r in done if not r.error], 95)})
+            start = end
+        return rows
+
+
+class LoadRunner(object):
+    '''Runs weighted journeys in concurrent browser sessions.
+
+    Args:
+        home_url (str): URL of the store's index.php.
+        weights (dict): Journey name -> relative weight.
+        sessions (int): Concurrent browsers.
+        duration (float): Seconds to keep starting journeys.
+        ramp_up (float): Seconds over which the sessions are started.
+        launch_options (LaunchOptions): How every browser is launched.
+        seed (int): Seed of the journey choices, random when None.'''
+
+    def __init__(self, home_url, weights, sessions, duration, ramp_up, launch_options, seed=None):
+        self.home_url = home_url
+        self.names = [name for name in weights if weights[name] > 0]
+        self.weights = [weights[name] for name in self.names]
+        self.sessions = sessions
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.launch_options = launch_options
+        self.seed = seed if seed is not None else random.randrange(1 << 30)
+        self.recorder = LoadRecorder()
+
+    def _launch(self, number):
+        '''A new browser for session number, None when it can't be launched.
+        A failed launch is recorded as an errored "launch" journey.'''
+        start = time.perf_counter()
+        try:
+            return self.launch_options.launch()
+        except Exception as exc:
+            self.recorder.add(number, 'launch', None, start, time.perf_counter() - start, type(exc).__name__)
+            return None
+
+    def _session(self, number, deadline):
+        time.sleep(self.ramp_up * number / self.sessions)
+        rng = random.Random(self.seed + number)
+        driver = self._launch(number)
+        if driver is None:
+            return
+        self.recorder.session_started()
+        session = Session(number, driver, self.home_url, self.recorder, rng)
+        try:
+            while time.perf_counter() < deadline:
+                session.journey = rng.choices(self.names, self.weights)[0]
+                start = time.perf_counter()
+                error = None
+                try:
+                    JOURNEYS[session.journey](session)
+                except Exception as exc:
+                    error = type(exc).__name__
+                self.recorder.add(number, session.journey, None, start, time.perf_counter() - start, error)
+                try:
+                    reset_driver(driver)
+                except Exception:
+                    # The browser is gone, carry on with a new one.
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = session.driver = self._launch(number)
+                    if driver is None:
+                        return
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    def run(self):
+        '''Run the load, returns the elapsed time in seconds.'''
+        deadline = self.recorder.origin + self.ramp_up + self.duration
+        threads = [threading.Thread(target=self._session, args=(number, deadline), daemon=True)
+                   for number in range(self.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - self.recorder.origin
+
+
+def parse_weights(values):
+    '''"name=weight" strings into a weights dict, the defaults when empty.'''
+    if not values:
+        return dict(DEFAULT_WEIGHTS)
+    weights = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError('unknown journey {}, choose from {}'.format(
+                name, ', '.join(sorted(JOURNEYS))))
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run concurrent shopper journeys against the store.')
+    parser.add_argument('--base-url', default='local',
+                        help='Store to run against, "local" (default) starts the stand-in storefront.')
+    parser.add_argument('--sessions', type=int, default=4, help='Concurrent browser sessions.')
+    parser.add_argument('--duration', type=float, default=60,
+                        help='Seconds to run at full load, after the ramp-up.')
+    parser.add_argument('--ramp-up', type=float, default=10, help='Seconds over which sessions are started.')
+    parser.add_argument('--journey', action='append', metavar='NAME=WEIGHT',
+                        help='Journey and its weight, can be repeated. Journeys: {}. Default {}.'.format(
+                            ', '.join(sorted(JOURNEYS)),
+                            ' '.join('{}={}'.format(n, w) for n, w in sorted(DEFAULT_WEIGHTS.items()))))
+    parser.add_argument('--driver-profile', choices=sorted(PROFILES), default='lean',
+                        help='Named Chrome launch profile of every session.')
+    parser.add_argument('--interval', type=float, default=10, help='Seconds per row of the report over time.')
+    parser.add_argument('--seed', type=int, help='Seed of the journey choices.')
+    parser.add_argument('--output', help='Also write the report to this JSON file.')
+    parser.add_argument('--max-error-rate', type=float,
+                        help='Exit with 1 when more than this fraction of journeys failed, e.g. 0.01.')
+    args = parser.parse_args()
+    try:
+        weights = parse_weights(args.journey)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+
+    server = StorefrontServer().start() if args.base_url == 'local' else None
+    home_url = (server.url if server else args.base_url.rstrip('/')) + '/index.php'
+    runner = LoadRunner(home_url, weights, args.sessions, args.duration, args.ramp_up,
+                        LaunchOptions.profile(args.driver_profile), args.seed)
+    try:
+        elapsed = runner.run()
+    finally:
+        if server:
+            server.stop()
+
+    summary = runner.recorder.summary(elapsed)
+    intervals = runner.recorder.intervals(elapsed, args.interval)
+    print('{journeys} journeys in {elapsed_s:.0f}s over {sessions} sessions: {throughput_per_s:.2f}/s, '
+          '{errors} errors ({error_rate:.1%})'.format(**summary))
+    for error, count in summary['errors_by_type'].items():
+        print('  {:<40} {}'.format(error, count))
+    print('\n{:<28} {:>6} {:>8} {:>8} {:>8} {:>6}'.format('step', 'count', 'p50', 'p95', 'p99', 'errors'))
+    for name, step in summary['steps'].items():
+        if step['count']:
+            print('{:<28} {count:6d} {p50:7.3f}s {p95:7.3f}s {p99:7.3f}s {errors:6d}'.format(name, **step))
+        else:
+            print('{:<28} {:6d} {:>8} {:>8} {:>8} {:6d}'.format(name, 0, '-', '-', '-', step['errors']))
+    print('\n{:>7} {:>8} {:>8} {:>8} {:>6} {:>8}'.format('t', 'sessions', 'journeys', 'per s', 'errors', 'p95'))
+    for row in intervals:
+        print('{start_s:6.0f}s {sessions:8d} {journeys:8d} {throughput_per_s:8.2f} {errors:6d} {p95}'.format(
+            **dict(row, p95='{:7.2f}s'.format(row['p95_s']) if row['p95_s'] is not None else '      -')))
+    if args.output:
+        with open(args.output, 'w') as report:
+            json.dump({'seed': runner.seed, 'weights': weights, 'summary': summary, 'intervals': intervals},
+                      report, indent=2)
+    return 1 if args.max_error_rate is not None and summary['error_rate'] > args.max_error_rate else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
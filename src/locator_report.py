@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+'''Validate every locator of pom.locators against the store's pages.
+
+Each page is visited once and every locator is resolved there, both as
+written and through the ID/CSS equivalent BasePage.find() uses, to check they
+find the same element and to time them. Slow, fragile and never found
+locators are listed, most fragile first.
+
+    python locator_report.py                       # against the local stand-in storefront
+    python locator_report.py --output locators.json
+'''
+import argparse
+import json
+import sys
+
+from pom.driver import LaunchOptions
+from pom.registry import LocatorRegistry
+from pom.scenarios import PASSWORD, USERNAME, Scenario
+from storefront.server import StorefrontServer
+
+
+def visit_cart(scenario):
+    scenario.cart()
+    scenario.driver.get(scenario.url(controller='order'))
+
+
+def visit_my_account(scenario):
+    assert(scenario.login(USERNAME, PASSWORD))
+    scenario.driver.get(scenario.url(controller='my-account'))
+
+
+# (name, visit(scenario)) of every page the locators are meant for.
+PAGES = [('home', lambda scenario: scenario.home()),
+         ('search', lambda scenario: scenario.search('Dress')),
+         ('empty search', lambda scenario: scenario.search('')),
+         ('authentication', lambda scenario: scenario.sign_in_page()),
+         ('cart', visit_cart),
+         ('my account', visit_my_account)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate and time the page-object locators.')
+    parser.add_argument('--base-url', default='local',
+                        help='Store to run against, "local" (default) starts the stand-in storefront.')
+    parser.add_argument('--repeat', type=int, default=200, help='Resolutions timed per locator and page.')
+    parser.add_argument('--slow-ms', type=float, default=0.05, help='Resolution time that counts as slow.')
+    parser.add_argument('--fragile', type=int, default=4, help='Fragility score that counts as fragile.')
+    parser.add_argument('--output', help='Also write the report to this JSON file.')
+    args = parser.parse_args()
+
+    server = StorefrontServer().start() if args.base_url == 'local' else None
+    home_url = (server.url if server else args.base_url.rstrip('/')) + '/index.php'
+    driver = LaunchOptions.profile('headless').launch()
+    registry = LocatorRegistry()
+    try:
+        scenario = Scenario(driver, home_url)
+        for (name, visit) in PAGES:
+            visit(scenario)
+            page = registry.validate(driver, args.repeat)
+            print('{:<16} {} locators found'.format(name, sum(1 for r in page.values() if r['found'])))
+    finally:
+        driver.quit()
+        if server:
+            server.stop()
+
+    rows = registry.report(args.slow_ms, args.fragile)
+    for row in rows:
+        timing = '' if row['ms'] is None else ' {:.3f}ms'.format(row['ms'])
+        if row['fast_ms'] is not None:
+            timing += ' -> {:.3f}ms as {}'.format(row['fast_ms'], row['fast'][0])
+        print('{:<42} fragility {:2d}{}\n    {}'.format(row['name'], row['fragility'], timing,
+                                                      '; '.join(row['problems'])))
+    if args.output:
+        with open(args.output, 'w') as report:
+            json.dump(rows, report, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+'''Page objects for the CDP backend, see pom.cdp.
+
+They mirror the checks of pom.pages that are worth running concurrently.
+Locators, script arguments, record parsing and verdicts are the ones of
+pom.pages and pom.scenarios, only the awaited steps are written here.'''
+from pom.catalog import CATALOG_JS, product_from_row
+from pom.cdp import AsyncBasePage
+from pom.locators import CartPageLocator, MainPageLocators, SearchResultsPageLocators
+from pom.pages import CartPage, HomePage
+from pom.scenarios import ADD_TO_CART_JS, cart_items
+
+
+class AsyncHomePage(AsyncBasePage):
+    '''HomePage on a CDP tab.'''
+
+    async def catalog(self):
+        '''Name, prices, id and add-to-cart link of every home page product.'''
+        assert(await self.visible(*MainPageLocators.CART_ITEMS))
+        rows = await self.tab.execute_script(CATALOG_JS, *HomePage.CATALOG_ARGS)
+        return [product_from_row(row) for row in rows]
+
+    async def add_to_cart(self, products):
+        '''Add products through the store's AJAX cart controller, like
+        Scenario.cart(), and reload so the header shows them.
+
+        Returns (list): cart item dicts in the shape the tests track the cart with.'''
+        added = await self.tab.execute_async_script(ADD_TO_CART_JS, [p.id_product for p in products])
+        assert(added == len(products))
+        await self.refresh()
+        return cart_items(products)
+
+    async def search_and_click(self, text):
+        '''Search and click results.'''
+        await self.clear_text(*MainPageLocators.SEARCH_TEXTBOX, text='')
+        await self.enter_text(*MainPageLocators.SEARCH_TEXTBOX, text=text)
+        await self.click(*MainPageLocators.SEARCH_SUBMIT, navigates=True)
+
+
+class AsyncSearchResultsPage(AsyncBasePage):
+    '''SearchResultsPage on a CDP tab.'''
+
+    async def check_results_expect_empty(self, compare_text):
+        '''Does the results page show compare_text as its alert?'''
+        await self.find(*SearchResultsPageLocators.SEARCH_ALERT)
+        alert = await self.snapshot({'alert': SearchResultsPageLocators.SEARCH_ALERT}, attributes=())
+        return alert.text('alert') == compare_text
+
+    async def switch_check_to_grid_view(self):
+        await self.click(*SearchResultsPageLocators.GRID_VIEW)
+        return (await self.visible(*SearchResultsPageLocators.GRID_LIST) and
+                await self.disappear(*SearchResultsPageLocators.LIST_LIST))
+
+    async def switch_check_to_list_view(self):
+        await self.click(*SearchResultsPageLocators.LIST_VIEW)
+        return (await self.visible(*SearchResultsPageLocators.LIST_LIST) and
+                await self.disappear(*SearchResultsPageLocators.GRID_LIST))
+
+
+class AsyncCartPage(AsyncBasePage):
+    '''CartPage on a CDP tab.'''
+
+    async def click_cart_page(self):
+        await self.hover(*MainPageLocators.CART_PAGE)
+        await self.click(*MainPageLocators.CART_PAGE, navigates=True)
+        return await self.visible(*CartPageLocator.CART_TABLE)
+
+    async def check_cart_correctness(self, shipping_price, cart_items):
+        '''Check the cart page summary against the cart items.'''
+        summary = await self.snapshot(CartPage.SUMMARY, attributes=())
+        return CartPage.summary_matches(summary, shipping_price, cart_items)
@@ -0,0 +1,99 @@
+'''Bulk extraction of the product lists: the home page catalog and search results.'''
+import re
+from collections import namedtuple
+
+from pom.snapshot import RESOLVE_JS
+
+# Since there are discounts let's only get the first price.
+PRICE_RE = re.compile(r'^\$(?P<act_price>\d+\.\d{2}).*')
+
+# Walks every <li> of the product list once and returns plain records, so the
+# metadata of N products costs one round-trip instead of 3N find_element calls.
+# arguments: list id, then the class names of product block, add button, price
+# and name image.
+CATALOG_JS = '''
+var list = document.getElementById(arguments[0]);
+if (!list) { return []; }
+var items = list.getElementsByTagName('li'), products = [];
+for (var i = 0; i < items.length; i++) {
+    var block = items[i];
+    if (!block.classList.contains(arguments[1])) { continue; }
+    var btn = block.getElementsByClassName(arguments[2])[0];
+    var price = block.getElementsByClassName(arguments[3])[0];
+    var name = block.getElementsByClassName(arguments[4])[0];
+    var old = block.getElementsByClassName('old-price')[0];
+    products.push([i,
+                   btn ? btn.getAttribute('data-id-product') : null,
+                   name ? name.getAttribute('title') : null,
+                   price ? price.textContent.trim() : '',
+                   old ? old.textContent.trim() : '',
+                   btn ? btn.getAttribute('href') : null]);
+}
+return products;
+'''
+
+Product = namedtuple('Product', ['index', 'id_product', 'name', 'price', 'old_price', 'add_url'])
+Product.__doc__ = '''A home page product.
+
+index is the position of its <li> in HomePage.items_list(), price is what the
+cart charges (the discounted price when there is a discount) and old_price the
+crossed-out price before the discount, None without one.'''
+
+
+def parse_catalog_price(text):
+    '''Get the actual price out of a price label, None if there isn't one.'''
+    match = PRICE_RE.match(text)
+    return float(match.group('act_price')) if match else None
+
+
+def product_from_row(row):
+    '''Build a Product from one row returned by CATALOG_JS.'''
+    index, id_product, name, price, old_price, add_url = row
+    return Product(index, id_product, name, parse_catalog_price(price),
+                   parse_catalog_price(old_price), add_url)
+
+
+# Reads every result of a search results list in one go: the product rows and
+# the "N results have been found." counter of the heading.
+# arguments: by, value of the results <ul>, then the class names of price,
+# name link and availability.
+SEARCH_RESULTS_JS = RESOLVE_JS + '''
+var list = pomResolve(arguments[0], arguments[1]);
+var counter = document.getElementsByClassName('heading-counter')[0];
+var rows = [];
+var items = list ? list.children : [];
+for (var i = 0; i < items.length; i++) {
+    var block = items[i];
+    if (block.tagName !== 'LI') { continue; }
+    var price = block.getElementsByClassName(arguments[2])[0];
+    var name = block.getElementsByClassName(arguments[3])[0];
+    var availability = block.getElementsByClassName(arguments[4])[0];
+    var btn = block.querySelector('[data-id-product]');
+    rows.push([i,
+               btn ? btn.getAttribute('data-id-product') : null,
+               name ? (name.getAttribute('title') || name.textContent).trim() : null,
+               price ? price.textContent.trim() : '',
+               availability ? availability.textContent.trim() : '',
+               block.textContent.replace(/\\s+/g, ' ').trim()]);
+}
+return {'counter': counter ? counter.textContent.trim() : null, 'rows': rows};
+'''
+
+# "7 results have been found."
+COUNTER_RE = re.compile(r'^(?P<count>\d+) results? ')
+
+SearchResult = namedtuple('SearchResult', ['index', 'id_product', 'name', 'price', 'availability', 'text'])
+SearchResult.__doc__ = '''One search result. text is all the text of the result (name,
+prices, description...) with whitespace collapsed, what relevance is checked on.'''
+
+
+def search_result_from_row(row):
+    '''Build a SearchResult from one row returned by SEARCH_RESULTS_JS.'''
+    index, id_product, name, price, availability, text = row
+    return SearchResult(index, id_product, name, parse_catalog_price(price), availability, text)
+
+
+def parse_result_count(counter):
+    '''The number in the results heading counter, None without one.'''
+    match = COUNTER_RE.match(counter or '')
+    return int(match.group('count')) if match else None
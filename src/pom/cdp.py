@@ -0,0 +1,493 @@
+'''Drive Chrome over the DevTools protocol from asyncio.
+
+Selenium sends one blocking HTTP request per command, so a process drives one
+page at a time. Here every command is a message on one websocket to the
+browser and any number of tabs, each optionally in its own browser context
+(separate cookies and storage, like a separate browser), are driven
+concurrently from a single event loop:
+
+    async with await Browser.attach(driver) as chrome:
+        search, cart = await chrome.new_page(), await chrome.new_page()
+        await asyncio.gather(check_search(search), check_cart(cart))
+
+AsyncBasePage mirrors the BasePage actions on a Tab, resolving locators in
+the page with the same script the batched Selenium calls use.'''
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from urllib.request import urlopen
+
+import websockets
+from selenium.common.exceptions import TimeoutException
+
+from pom import waits
+from pom.driver import TMPFS_DIR, LaunchOptions
+from pom.element import FILL_JS
+from pom.snapshot import RESOLVE_JS, SNAPSHOT_JS, Snapshot, locator_args
+from pom.timing import TimedActions, timed
+
+# Chrome binary Browser.launch() starts.
+CHROME_BINARY = os.environ.get('CHROME_BINARY', 'google-chrome')
+
+# Seconds between two looks for the DevTools port of a launching Chrome.
+POLL_INTERVAL = 0.05
+
+# Page event each page load strategy waits for.
+LOAD_EVENTS = {'normal': 'Page.loadEventFired', 'eager': 'Page.domContentEventFired', 'none': None}
+
+# Scrolls the element of a locator into view and returns the viewport
+# coordinates of its center, null while it is missing or not displayed.
+# arguments: by, value
+FIND_JS = RESOLVE_JS + '''
+var element = pomResolve(arguments[0], arguments[1]);
+if (!element || !element.getClientRects().length) { return null; }
+var style = window.getComputedStyle(element);
+if (style.visibility === 'hidden' || style.display === 'none') { return null; }
+element.scrollIntoView({block: 'center', inline: 'center'});
+var rect = element.getBoundingClientRect();
+return {x: rect.left + rect.width / 2, y: rect.top + rect.height / 2};
+'''
+
+# arguments: by, value
+FOCUS_JS = RESOLVE_JS + '''
+var element = pomResolve(arguments[0], arguments[1]);
+if (element) { element.focus(); }
+return !!element;
+'''
+
+# Text, or attribute when given, of a locator's element; null when missing.
+# arguments: by, value, attribute
+VALUE_JS = RESOLVE_JS + '''
+var element = pomResolve(arguments[0], arguments[1]);
+if (!element) { return null; }
+if (!arguments[2]) { return element.innerText; }
+return arguments[2] === 'value' && 'value' in element ? element.value : element.getAttribute(arguments[2]);
+'''
+
+
+class CDPError(Exception):
+    '''The browser answered a command with an error or the connection closed.'''
+
+
+class Connection(object):
+    '''A DevTools websocket: numbered commands in, responses and events out.
+
+    Commands for a tab carry its session id (flat sessions), so one connection
+    serves the browser and every tab attached to it.'''
+
+    def __init__(self, socket):
+        self._socket = socket
+        self._ids = itertools.count(1)
+        self._pending = {}
+        # (session id, event) -> list of callbacks
+        self._listeners = {}
+        self._reader = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def open(cls, url):
+        return cls(await websockets.connect(url, max_size=None))
+
+    async def send(self, method, params=None, session_id=None):
+        '''Send a command and wait for its result.'''
+        command_id = next(self._ids)
+        message = {'id': command_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command_id] = future
+        await self._socket.send(json.dumps(message))
+        return await future
+
+    def on(self, method, callback, session_id=None):
+        self._listeners.setdefault((session_id, method), []).append(callback)
+
+    def off(self, method, callback, session_id=None):
+        listeners = self._listeners.get((session_id, method), [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def expect(self, method, session_id=None):
+        '''Future of the next `method` event. Ask for it before sending the
+        command that causes the event, it may arrive before the response.
+        Call it from a coroutine.'''
+        future = asyncio.get_running_loop().create_future()
+
+        def callback(params):
+            self.off(method, callback, session_id)
+            if not future.done():
+                future.set_result(params)
+        self.on(method, callback, session_id)
+        return future
+
+    async def _read(self):
+        try:
+            async for raw in self._socket:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self._pending.pop(message['id'], None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        future.set_exception(CDPError(message['error'].get('message', message['error'])))
+                    else:
+                        future.set_result(message.get('result', {}))
+                else:
+                    key = (message.get('sessionId'), message.get('method'))
+                    for callback in list(self._listeners.get(key, [])):
+                        callback(message.get('params', {}))
+        finally:
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(CDPError('DevTools connection closed'))
+
+    async def close(self):
+        await self._socket.close()
+        await asyncio.gather(self._reader, return_exceptions=True)
+
+
+class Browser(object):
+    '''A Chrome browser and the tabs opened in it.
+
+    Args:
+        connection (Connection): Browser-level DevTools connection.
+        launch_options (LaunchOptions): Page load strategy and URL blocklist
+            every new tab uses.
+        process (obj): The Chrome process when we launched it.
+        profile_dir (str): Its temporary profile, removed on close().'''
+
+    def __init__(self, connection, launch_options=None, process=None, profile_dir=None):
+        self.connection = connection
+        self.launch_options = launch_options or LaunchOptions()
+        self.process = process
+        self.profile_dir = profile_dir
+        self.contexts = []
+
+    @classmethod
+    async def connect(cls, url, launch_options=None):
+        '''Connect to a browser's DevTools websocket URL.'''
+        return cls(await Connection.open(url), launch_options)
+
+    @classmethod
+    async def attach(cls, driver, launch_options=None):
+        '''Connect to the Chrome a Selenium chromedriver session runs, so its
+        tabs share the one browser process instead of launching another.'''
+        address = driver.capabilities['goog:chromeOptions']['debuggerAddress']
+        loop = asyncio.get_running_loop()
+        version = await loop.run_in_executor(
+            None, lambda: json.load(urlopen('http://{}/json/version'.format(address))))
+        return await cls.connect(version['webSocketDebuggerUrl'], launch_options)
+
+    @classmethod
+    async def launch(cls, launch_options=None, executable=CHROME_BINARY, timeout=10):
+        '''Start Chrome with the flags of launch_options (lean by default) and
+        connect to it. No chromedriver is involved.'''
+        launch_options = launch_options or LaunchOptions.profile('lean')
+        profile_dir = tempfile.mkdtemp(prefix='pom-cdp-', dir=TMPFS_DIR)
+        arguments = ([executable, '--remote-debugging-port=0', '--user-data-dir={}'.format(profile_dir)]
+                     + launch_options.chrome_options().arguments + ['about:blank'])
+        process = subprocess.Popen(arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # Chrome writes the port and websocket path it picked to the profile.
+        port_file = os.path.join(profile_dir, 'DevToolsActivePort')
+        deadline = time.monotonic() + timeout
+        while True:
+            if os.path.exists(port_file):
+                with open(port_file, 'r') as active:
+                    lines = active.read().split()
+                if len(lines) >= 2:
+                    break
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                shutil.rmtree(profile_dir, ignore_errors=True)
+                raise CDPError('Chrome did not open a DevTools port within {}s'.format(timeout))
+            await asyncio.sleep(POLL_INTERVAL)
+        connection = await Connection.open('ws://127.0.0.1:{}{}'.format(lines[0], lines[1]))
+        return cls(connection, launch_options, process, profile_dir)
+
+    async def send(self, method, params=None):
+        return await self.connection.send(method, params)
+
+    async def new_context(self):
+        '''A new browser context: its tabs share no cookies or storage with
+        any other context.'''
+        result = await self.send('Target.createBrowserContext', {'disposeOnDetach': True})
+        context = BrowserContext(self, result['browserContextId'])
+        self.contexts.append(context)
+        return context
+
+    async def new_page(self, context_id=None):
+        '''Open a tab, in the given browser context or the default one.'''
+        params = {'url': 'about:blank'}
+        if context_id:
+            params['browserContextId'] = context_id
+        target = await self.send('Target.createTarget', params)
+        attached = await self.send('Target.attachToTarget', {'targetId': target['targetId'], 'flatten': True})
+        tab = Tab(self, target['targetId'], attached['sessionId'])
+        await tab.setup()
+        return tab
+
+    async def close(self):
+        '''Dispose of our contexts, and of Chrome itself if we launched it.'''
+        for context in self.contexts:
+            try:
+                await context.close()
+            except CDPError:
+                pass
+        if self.process is not None:
+            try:
+                await self.send('Browser.close')
+            except CDPError:
+                pass
+        await self.connection.close()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class BrowserContext(object):
+    '''An isolated browser context, the CDP counterpart of a fresh browser.'''
+
+    def __init__(self, browser, context_id):
+        self.browser = browser
+        self.context_id = context_id
+
+    async def new_page(self):
+        return await self.browser.new_page(self.context_id)
+
+    async def close(self):
+        '''Close the context with all of its tabs.'''
+        if self in self.browser.contexts:
+            self.browser.contexts.remove(self)
+        await self.browser.send('Target.disposeBrowserContext', {'browserContextId': self.context_id})
+
+
+class Tab(object):
+    '''One page target. execute_script() and friends behave like the
+    webdriver methods of the same name, minus element references.'''
+
+    def __init__(self, browser, target_id, session_id):
+        self.browser = browser
+        self.target_id = target_id
+        self.session_id = session_id
+
+    async def send(self, method, params=None):
+        return await self.browser.connection.send(method, params, self.session_id)
+
+    def expect(self, method):
+        return self.browser.connection.expect(method, self.session_id)
+
+    async def setup(self):
+        await self.send('Page.enable')
+        blocklist = self.browser.launch_options.blocklist
+        if blocklist:
+            await self.send('Network.enable')
+            await self.send('Network.setBlockedURLs', {'urls': blocklist})
+
+    async def _evaluate(self, expression):
+        result = await self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True,
+                                                      'awaitPromise': True})
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get('description') or details.get('text'))
+        return result['result'].get('value')
+
+    async def execute_script(self, script, *args):
+        '''Run a function body with `arguments` set to args, return its
+        JSON-serializable result.'''
+        return await self._evaluate('(function () {{\n{}\n}}).apply(null, {})'.format(script, json.dumps(args)))
+
+    async def execute_async_script(self, script, *args):
+        '''Like execute_script(), the last argument is a callback that ends the script.'''
+        return await self._evaluate(
+            'new Promise(function (done) {{ (function () {{\n{}\n}}).apply(null, {}.concat([done])); }})'.format(
+                script, json.dumps(args)))
+
+    async def _load(self, command, params=None, timeout=30):
+        event = LOAD_EVENTS[self.browser.launch_options.page_load_strategy]
+        loaded = self.expect(event) if event else None
+        result = await self.send(command, params)
+        if result.get('errorText'):
+            raise CDPError('{} failed: {}'.format(command, result['errorText']))
+        if loaded is not None:
+            await asyncio.wait_for(loaded, timeout)
+
+    async def get(self, url, timeout=30):
+        '''Navigate and wait for the event of the page load strategy.'''
+        await self._load('Page.navigate', {'url': url}, timeout)
+
+    async def refresh(self, timeout=30):
+        await self._load('Page.reload', {}, timeout)
+
+    async def current_url(self):
+        return await self._evaluate('window.location.href')
+
+    async def get_cookies(self):
+        return (await self.send('Network.getCookies'))['cookies']
+
+    async def mouse(self, kind, x, y, button='none', click_count=0):
+        await self.send('Input.dispatchMouseEvent', {'type': kind, 'x': x, 'y': y, 'button': button,
+                                                     'clickCount': click_count})
+
+    async def insert_text(self, text):
+        await self.send('Input.insertText', {'text': text})
+
+    async def close(self):
+        await self.browser.send('Target.closeTarget', {'targetId': self.target_id})
+
+
+class AsyncBasePage(TimedActions):
+    '''BasePage for a CDP Tab: the same actions, awaited.
+
+    There are no element references, actions take (By, value) locators and
+    resolve them in the page. Mouse input goes to the element's center like
+    Selenium's, so hover menus and click handlers behave the same.'''
+
+    def __init__(self, tab, policy=None):
+        self.tab = tab
+        self.policy = policy or waits.default_policy()
+
+    async def _until(self, condition, timeout=None, message='', key=None):
+        '''Await condition() until it is truthy, return its value. Timeout and
+        poll interval come from the wait policy like BasePage's waits.'''
+        timeout = self.policy.timeout_for(key, timeout)
+        start = time.monotonic()
+        while True:
+            value = await condition()
+            if value:
+                if key is not None:
+                    self.policy.observe(key, time.monotonic() - start)
+                return value
+            if time.monotonic() - start > timeout:
+                raise TimeoutException('{} (waited {:.1f}s)'.format(message or 'Timed out', timeout))
+            await asyncio.sleep(self.policy.poll)
+
+    @timed
+    async def find(self, *locator, timeout=None):
+        '''Wait for a locator to be visible, return the viewport point of its center.'''
+        return await self._until(lambda: self.tab.execute_script(FIND_JS, *locator), timeout,
+                                 'Element not visible: {}'.format(locator[1]), key=locator)
+
+    @timed
+    async def get(self, url):
+        await self.tab.get(url)
+
+    @timed
+    async def refresh(self):
+        await self.tab.refresh()
+
+    @timed
+    async def click(self, *locator, navigates=False):
+        '''Click an element once it is visible.
+
+        Args:
+            navigates (bool): The click loads a new page, wait for it.'''
+        point = await self.find(*locator)
+        event = LOAD_EVENTS[self.tab.browser.launch_options.page_load_strategy] if navigates else None
+        loaded = self.tab.expect(event) if event else None
+        await self.tab.mouse('mouseMoved', point['x'], point['y'])
+        await self.tab.mouse('mousePressed', point['x'], point['y'], 'left', 1)
+        await self.tab.mouse('mouseReleased', point['x'], point['y'], 'left', 1)
+        if loaded is not None:
+            await asyncio.wait_for(loaded, 30)
+
+    @timed
+    async def visible(self, *locator):
+        return bool(await self.find(*locator))
+
+    @timed
+    async def disappear(self, *locator):
+        '''Expect an element to not be there or to disappear, a displayed one
+        gets the policy's absence grace period to go away.'''
+        async def hidden():
+            return not await self.tab.execute_script(FIND_JS, *locator)
+        try:
+            return await self._until(hidden, self.policy.absence_grace)
+        except TimeoutException:
+            return False
+
+    @timed
+    async def enter_text(self, *locator, text):
+        await self.find(*locator)
+        await self.tab.execute_script(FOCUS_JS, *locator)
+        await self.tab.insert_text(text)
+
+    @timed
+    async def clear_text(self, *locator, text):
+        await self.find(*locator)
+        await self.tab.execute_script(FILL_JS, [[locator[1], locator[0], locator[1], 'value', '']])
+
+    @timed
+    async def hover(self, *locator):
+        point = await self.find(*locator)
+        await self.tab.mouse('mouseMoved', point['x'], point['y'])
+
+    @timed
+    async def fill(self, **values):
+        '''Fill many of the page's BasePageElement fields in one round-trip.'''
+        fields = [(getattr(type(self), name), value) for name, value in values.items()]
+        args = [[field.name or field.by[1], field.by[0], field.by[1], field.kind, field.to_dom(value)]
+                for field, value in fields]
+        timeout = max([self.policy.timeout_for(field.by, field.timeout) for field, _ in fields] or [0])
+        missing = []
+
+        async def filled():
+            missing[:] = await self.tab.execute_script(FILL_JS, args)
+            return not missing
+        try:
+            await self._until(filled, timeout)
+        except TimeoutException:
+            raise TimeoutException('Fields not found: {}'.format(', '.join(missing)))
+
+    @timed
+    async def snapshot(self, locators, attributes=('value',), root=None):
+        '''Read the text and attributes of many locators in one round-trip.
+
+        Args:
+            locators (dict): Field name -> (By, value) locator.
+            attributes (tuple): Attribute names to read for every field.
+            root (tuple): (By, value) locator to search under.
+
+        Returns (Snapshot): Field name -> Field(found, text, attrs).'''
+        result = await self.tab.execute_script(
+            SNAPSHOT_JS, locator_args(locators), list(attributes), list(root) if root else None)
+        return Snapshot.from_script(result)
+
+    async def track_ajax(self):
+        await self.tab.execute_script(waits.TRACK_AJAX_JS)
+
+    @timed
+    async def wait_for_ajax(self, timeout=None):
+        '''Wait for jQuery and tracked XHR/fetch activity to finish.'''
+        await self._until(lambda: self.tab.execute_script(waits.AJAX_IDLE_JS), timeout, 'AJAX still running')
+
+    @timed
+    async def wait_for_dom_settled(self, quiet=0.2, timeout=None):
+        '''Wait for the DOM to stop changing.'''
+        return await asyncio.wait_for(
+            self.tab.execute_async_script(waits.DOM_SETTLED_JS, None, int(quiet * 1000)),
+            self.policy.timeout_for(timeout=timeout))
+
+    @timed
+    async def wait_for_change(self, *locator, old_value, attribute=None, timeout=None):
+        '''Wait for an element's text or attribute to change from old_value.
+
+        Returns (str): The new value.'''
+        async def changed():
+            value = await self.tab.execute_script(VALUE_JS, locator[0], locator[1], attribute)
+            return value if value is not None and value != old_value else None
+        return await self._until(changed, timeout, '{} did not change'.format(locator[1]))
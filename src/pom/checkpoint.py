@@ -0,0 +1,132 @@
+'''Checkpoints of finished tests, so a rerun can pick up where the last run failed.
+
+Every test leaves a checkpoint: its outcome and, when it passed in a browser,
+the cookies, the URL it ended on and the cart_list model of its cart. A
+resumed run skips the tests that passed last time, up to the first one that
+didn't, and seeds the shared cart from the newest checkpoint the store still
+honours instead of filling a cart again.'''
+import json
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+
+from pom.pages import CartState
+from pom.session import clean_cookie
+
+# The outcomes of the run being resumed, frozen before any test of the resumed
+# run writes its own checkpoint.
+RESUME_FILE = 'resume.json'
+
+# Outcomes a resumed run doesn't need to repeat.
+DONE = ('passed', 'skipped')
+
+Checkpoint = namedtuple('Checkpoint', ['test', 'outcome', 'time', 'url', 'cookies', 'cart'])
+Checkpoint.__doc__ = '''The end state of one test. url, cookies and cart are None when the
+test didn't pass in a browser, cart also when the test had no cart.'''
+
+
+def checkpoint_name(nodeid):
+    return re.sub(r'[^\w.-]+', '_', nodeid) + '.json'
+
+
+class CheckpointStore(object):
+    '''Checkpoints of the last run, one JSON file per test so pytest-xdist
+    workers never write the same file.
+
+    Args:
+        directory (str): Where the checkpoints are kept.'''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tests = os.path.join(directory, 'tests')
+        self.previous = {}
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp, 'w') as checkpoint:
+            json.dump(data, checkpoint)
+        os.replace(temp, path)
+
+    def _save(self, checkpoint):
+        self._write(os.path.join(self.tests, checkpoint_name(checkpoint.test)), checkpoint._asdict())
+
+    def record(self, nodeid, driver=None, cart=None):
+        '''Checkpoint a passing test, with the state of its browser when it had one.
+
+        Args:
+            nodeid (str): The test.
+            driver (obj): Its browser, still on the page the test ended on.
+            cart (list): The cart_list model of the cart in that browser.'''
+        if driver is None:
+            self._save(Checkpoint(nodeid, 'passed', time.time(), None, None, None))
+            return
+        cookies = [clean_cookie(c) for c in driver.get_cookies()]
+        self._save(Checkpoint(nodeid, 'passed', time.time(), driver.current_url, cookies, cart))
+
+    def fail(self, nodeid):
+        self._save(Checkpoint(nodeid, 'failed', time.time(), None, None, None))
+
+    def skip(self, nodeid):
+        self._save(Checkpoint(nodeid, 'skipped', time.time(), None, None, None))
+
+    def load(self):
+        '''Every checkpoint on disk, by test.'''
+        checkpoints = {}
+        if not os.path.isdir(self.tests):
+            return checkpoints
+        for name in os.listdir(self.tests):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.tests, name), 'r') as checkpoint:
+                    data = Checkpoint(**json.load(checkpoint))
+            except (IOError, ValueError, TypeError):
+                continue
+            checkpoints[data.test] = data
+        return checkpoints
+
+    def clear(self):
+        '''Forget the last run, a run that isn't resumed starts from scratch.'''
+        shutil.rmtree(self.tests, ignore_errors=True)
+
+    def freeze(self):
+        '''Keep the outcomes of the last run aside for a resumed run. Call it
+        once, before any worker starts running tests.'''
+        self._write(os.path.join(self.directory, RESUME_FILE),
+                    {test: checkpoint._asdict() for test, checkpoint in self.load().items()})
+
+    def thaw(self):
+        '''Read the outcomes frozen by freeze(), in every worker.'''
+        try:
+            with open(os.path.join(self.directory, RESUME_FILE), 'r') as frozen:
+                self.previous = {test: Checkpoint(**data) for test, data in json.load(frozen).items()}
+        except (IOError, ValueError, TypeError):
+            self.previous = {}
+        return self.previous
+
+    def resume_point(self, nodeids):
+        '''Index of the first test in nodeids that didn't pass (or never ran)
+        last time, len(nodeids) when they all did.'''
+        for index, nodeid in enumerate(nodeids):
+            checkpoint = self.previous.get(nodeid)
+            if checkpoint is None or checkpoint.outcome not in DONE:
+                return index
+        return len(nodeids)
+
+    def nearest(self, nodeids, index):
+        '''The checkpoint of the last test before nodeids[index] that passed
+        in a browser, None if there is none.'''
+        for nodeid in reversed(nodeids[:index]):
+            checkpoint = self.previous.get(nodeid)
+            if checkpoint is not None and checkpoint.outcome == 'passed' and checkpoint.url:
+                return checkpoint
+        return None
+
+    def carts(self):
+        '''The carts of the last run as CartStates, newest first.'''
+        checkpoints = sorted((c for c in self.previous.values() if c.outcome == 'passed' and c.cart),
+                             key=lambda c: c.time, reverse=True)
+        return [CartState(c.cookies, c.cart) for c in checkpoints]
@@ -0,0 +1,289 @@
+import contextlib
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from selenium import webdriver
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+from pom import timing
+from pom.stats import summarize
+
+# Clears web storage for the origin the driver is currently on.
+CLEAR_STORAGE_JS = '''
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+'''
+
+
+# Third party fonts, analytics and ad scripts the practice store pulls in that
+# none of the locators depend on.
+DEFAULT_BLOCKLIST = [
+    '*fonts.googleapis.com*',
+    '*fonts.gstatic.com*',
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*connect.facebook.net*',
+    '*platform.twitter.com*',
+    '*.woff', '*.woff2', '*.ttf',
+]
+
+PAGE_LOAD_STRATEGIES = ('normal', 'eager', 'none')
+
+# Chrome switches that turn off what a test browser never uses: extensions,
+# background networking, sync, first run UI and the GPU process.
+LEAN_ARGUMENTS = [
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--mute-audio',
+    '--no-first-run',
+    '--no-default-browser-check',
+]
+
+# Named launch profiles, keyword arguments of LaunchOptions.
+#   default:  Chrome as it comes, with a window.
+#   headless: No window, a fixed viewport large enough for the desktop layout.
+#   lean:     Headless without GPU, extensions or background services, the
+#             profile lives in tmpfs so nothing is written to disk.
+#   ci:       lean for containers, no sandbox and no /dev/shm backed shared memory.
+PROFILES = {
+    'default': {},
+    'headless': {'headless': True, 'window_size': (1280, 1024)},
+    'lean': {'headless': True, 'window_size': (1280, 1024), 'arguments': LEAN_ARGUMENTS,
+             'user_data_dir': 'tmpfs'},
+    'ci': {'headless': True, 'window_size': (1280, 1024),
+           'arguments': LEAN_ARGUMENTS + ['--no-sandbox', '--disable-dev-shm-usage'],
+           'user_data_dir': 'tmpfs'},
+}
+
+# Where 'tmpfs' profiles go, RAM backed on Linux.
+TMPFS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def worker_id():
+    '''Name of the pytest-xdist worker we are running in, "master" without xdist.'''
+    return os.environ.get('PYTEST_XDIST_WORKER', 'master')
+
+
+def reset_driver(driver):
+    '''Reset a driver between tests without relaunching the browser.
+
+    Cookies and local/session storage are cleared so the next test starts
+    with a fresh context on the same Chrome process.'''
+    driver.delete_all_cookies()
+    driver.execute_script(CLEAR_STORAGE_JS)
+
+
+class LaunchOptions(object):
+    '''How Chrome is launched and what it is allowed to download.
+
+    Args:
+        page_load_strategy (str): 'normal' waits for every resource on get(),
+            'eager' only for DOMContentLoaded and 'none' returns right away.
+            The page objects wait for the elements they need either way.
+        block_images (bool): Don't load any image.
+        blocklist (list): URL patterns ("*" wildcard) the browser won't request.
+        allowlist (list): Host names the browser may resolve, every other host
+            fails DNS resolution. Empty allows everything.
+        headless (bool): Run without a window.
+        window_size (tuple): (width, height) of the window or headless viewport.
+        arguments (list): Extra Chrome switches.
+        user_data_dir (str): Chrome profile directory. 'tmpfs' gives every
+            browser a throwaway profile in RAM that is removed when it quits.
+            A path is shared across runs (warm disk cache) with one profile per
+            worker and browser under it, Chrome locks a profile to one process.
+            None lets chromedriver create a temporary profile on disk.'''
+
+    def __init__(self, page_load_strategy='normal', block_images=False, blocklist=None, allowlist=None,
+                 headless=False, window_size=None, arguments=None, user_data_dir=None):
+        if page_load_strategy not in PAGE_LOAD_STRATEGIES:
+            raise ValueError('page_load_strategy must be one of {}'.format(', '.join(PAGE_LOAD_STRATEGIES)))
+        self.page_load_strategy = page_load_strategy
+        self.block_images = block_images
+        self.blocklist = list(blocklist or [])
+        self.allowlist = list(allowlist or [])
+        self.headless = headless
+        self.window_size = window_size
+        self.arguments = list(arguments or [])
+        self.user_data_dir = user_data_dir
+        self.startup_times = []
+        self._profiles = itertools.count()
+
+    @classmethod
+    def profile(cls, name, **overrides):
+        '''LaunchOptions of a named profile from PROFILES, overrides win.'''
+        if name not in PROFILES:
+            raise ValueError('profile must be one of {}'.format(', '.join(sorted(PROFILES))))
+        kwargs = dict(PROFILES[name])
+        kwargs.update(overrides)
+        return cls(**kwargs)
+
+    def _profile_dir(self):
+        '''A fresh profile directory, the second value tells if it is temporary.'''
+        if self.user_data_dir == 'tmpfs':
+            return (tempfile.mkdtemp(prefix='pom-chrome-', dir=TMPFS_DIR), True)
+        path = os.path.join(self.user_data_dir, '{}-{}'.format(worker_id(), next(self._profiles)))
+        os.makedirs(path, exist_ok=True)
+        return (path, False)
+
+    def chrome_options(self, user_data_dir=None):
+        '''ChromeOptions with the launch flags these options need.'''
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument('--headless')
+        if self.window_size:
+            options.add_argument('--window-size={},{}'.format(*self.window_size))
+        if user_data_dir:
+            options.add_argument('--user-data-dir={}'.format(user_data_dir))
+        for argument in self.arguments:
+            options.add_argument(argument)
+        if self.block_images:
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        if self.allowlist:
+            rules = ['MAP * ~NOTFOUND'] + ['EXCLUDE {}'.format(host) for host in self.allowlist]
+            options.add_argument('--host-resolver-rules={}'.format(' , '.join(rules)))
+        return options
+
+    def capabilities(self):
+        capabilities = DesiredCapabilities.CHROME.copy()
+        capabilities['pageLoadStrategy'] = self.page_load_strategy
+        return capabilities
+
+    def apply(self, driver):
+        '''Set up what can only be configured on a running browser.'''
+        if self.blocklist:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocklist})
+
+    def launch(self):
+        '''Launch Chrome with these options.
+
+        The time from starting chromedriver to a usable browser is kept in
+        startup_times and recorded as a 'startup' span when timing is on.'''
+        (profile_dir, temporary) = self._profile_dir() if self.user_data_dir else (None, False)
+        start = time.perf_counter()
+        driver = webdriver.Chrome(options=self.chrome_options(profile_dir),
+                                  desired_capabilities=self.capabilities())
+        self.apply(driver)
+        duration = time.perf_counter() - start
+        self.startup_times.append(duration)
+        timeline = timing.active()
+        if timeline is not None:
+            timeline.add('launch', 'startup', start, duration)
+        if temporary:
+            quit = driver.quit
+
+            def quit_and_remove_profile():
+                try:
+                    quit()
+                finally:
+                    shutil.rmtree(profile_dir, ignore_errors=True)
+
+            driver.quit = quit_and_remove_profile
+        return driver
+
+    def startup_summary(self):
+        '''count, mean, p50, p95, p99 and max of the launch times (s).'''
+        return summarize(self.startup_times)
+
+
+class DriverPool(object):
+    '''Pool of reusable webdrivers.
+
+    Every pytest-xdist worker is its own process, so each worker gets its own
+    pool. Within a process, each thread leasing a driver gets a different one,
+    drivers are only launched when nobody has an idle one to hand out and they
+    are reset (not relaunched) when they come back to the pool.
+
+    Args:
+        factory (callable): Creates a new webdriver. Defaults to Chrome.
+        warm_url (str): Optional URL a new driver loads right after launch so
+            the first test doesn't pay for the cold page load.
+        retire (callable): Optional retire(driver) -> bool, asked whenever a
+            driver comes back. True quits it instead of reusing it, the next
+            lease launches a fresh one (e.g. ResourceMonitor.retire).'''
+
+    def __init__(self, factory=webdriver.Chrome, warm_url=None, retire=None):
+        self.factory = factory
+        self.warm_url = warm_url
+        self.retire = retire
+        self._idle = []
+        self._all = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._all)
+
+    def launch(self):
+        '''Launch a new driver and register it with the pool.'''
+        driver = self.factory()
+        if self.warm_url:
+            driver.get(self.warm_url)
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def acquire(self):
+        '''Take an idle driver from the pool, launching one if none is idle.'''
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.launch()
+
+    def release(self, driver, reset=True):
+        '''Give a driver back to the pool.
+
+        Args:
+            driver (obj): Webdriver previously returned by acquire().
+            reset (bool): Clear cookies and storage before it is reused. A
+                driver that fails to reset (e.g. its browser crashed) is
+                discarded.'''
+        if self.retire is not None and self.retire(driver):
+            self.discard(driver)
+            return
+        if reset:
+            try:
+                reset_driver(driver)
+            except Exception:
+                self.discard(driver)
+                return
+        with self._lock:
+            self._idle.append(driver)
+
+    def discard(self, driver):
+        '''Quit a driver and drop it from the pool (e.g. it crashed).'''
+        with self._lock:
+            if driver in self._idle:
+                self._idle.remove(driver)
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            # The browser is gone already, chromedriver went down with it.
+            pass
+
+    @contextlib.contextmanager
+    def lease(self, reset=True):
+        '''Context manager that acquires a driver and releases it afterwards.'''
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver, reset=reset)
+
+    def close(self):
+        '''Quit every driver the pool has launched.'''
+        with self._lock:
+            drivers, self._all, self._idle = self._all, [], []
+        for driver in drivers:
+            driver.quit()
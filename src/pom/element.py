@@ -1,22 +1,145 @@
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+from pom.snapshot import RESOLVE_JS
+from pom.waits import default_policy
+
+# Sets many fields at once and fires the events a user typing would, so page
+# scripts listening for input/change still react. Nothing is set unless every
+# field can be found; the names of the missing ones are returned instead.
+# arguments: [[name, by, value, kind, new value], ...]
+FILL_JS = RESOLVE_JS + '''
+var fields = arguments[0], elements = [], missing = [];
+for (var i = 0; i < fields.length; i++) {
+    var element = pomResolve(fields[i][1], fields[i][2]);
+    if (!element) { missing.push(fields[i][0]); }
+    elements.push(element);
+}
+if (missing.length) { return missing; }
+for (var i = 0; i < fields.length; i++) {
+    var element = elements[i];
+    if (fields[i][3] === 'checked') { element.checked = fields[i][4]; }
+    else { element.value = fields[i][4]; }
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return missing;
+'''
 
 
 class BasePageElement(object):
-    """Base page class that is initialized on every page object class.
-    - Derived from Selenium docs: https://selenium-python.readthedocs.io/page-objects.html#page-elements,"""
+    """Base page element descriptor that is initialized on every page object class.
+    - Derived from Selenium docs: https://selenium-python.readthedocs.io/page-objects.html#page-elements,
+
+    Args:
+        locator (tuple): (By, value) locator, e.g. from pom.locators. A plain
+            string is taken as the element name, like subclasses setting a
+            `locator` class attribute always did.
+        timeout (int): Seconds to wait for the field to be present, the wait
+            policy's timeout for this locator when None."""
+
+    # How the field is written to by fill_fields(): 'value' or 'checked'.
+    kind = 'value'
+
+    def __init__(self, locator=None, timeout=None):
+        if locator is not None:
+            self.locator = locator
+        self.timeout = timeout
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    @property
+    def by(self):
+        '''The field locator as a (By, value) tuple.'''
+        if isinstance(self.locator, str):
+            return (By.NAME, self.locator)
+        return tuple(self.locator)
+
+    def element(self, driver):
+        '''Wait for the field and return its element (a single lookup).'''
+        return default_policy().wait(driver, EC.presence_of_element_located(self.by), key=self.by,
+                                     timeout=self.timeout, message='Field not found: {}'.format(self.by[1]))
+
+    def to_dom(self, value):
+        '''Convert a Python value to what is written to the element.'''
+        return '' if value is None else str(value)
+
+    def from_dom(self, element):
+        '''Read the Python value back from the element.'''
+        return element.get_attribute("value")
 
     def __set__(self, obj, value):
         """Sets the text to the value supplied"""
-        driver = obj.driver
-        WebDriverWait(driver, 100).until(
-            lambda driver: driver.find_element_by_name(self.locator))
-        driver.find_element_by_name(self.locator).clear()
-        driver.find_element_by_name(self.locator).send_keys(value)
+        element = self.element(obj.driver)
+        element.clear()
+        element.send_keys(self.to_dom(value))
 
     def __get__(self, obj, owner):
         """Gets the text of the specified object"""
-        driver = obj.driver
-        WebDriverWait(driver, 100).until(
-            lambda driver: driver.find_element_by_name(self.locator))
-        element = driver.find_element_by_name(self.locator)
-        return element.get_attribute("value")
+        if obj is None:
+            return self
+        return self.from_dom(self.element(obj.driver))
+
+
+class TextField(BasePageElement):
+    '''A text, email or password input.'''
+
+
+class NumberField(BasePageElement):
+    '''An input holding an integer, such as a quantity box.'''
+
+    def from_dom(self, element):
+        value = element.get_attribute("value")
+        return int(value) if value else None
+
+
+class CheckboxField(BasePageElement):
+    '''A checkbox or radio button, read and written as a bool.'''
+
+    kind = 'checked'
+
+    def to_dom(self, value):
+        return bool(value)
+
+    def from_dom(self, element):
+        return element.is_selected()
+
+    def __set__(self, obj, value):
+        element = self.element(obj.driver)
+        if element.is_selected() != bool(value):
+            element.click()
+
+
+class SelectField(BasePageElement):
+    '''A <select>, read and written by option value.'''
+
+    def __set__(self, obj, value):
+        fill_fields(obj.driver, [(self, value)])
+
+
+def fill_fields(driver, values, timeout=None):
+    '''Set many fields in a single script call.
+
+    Args:
+        driver (obj): Webdriver object.
+        values (list): (BasePageElement, value) pairs.
+        timeout (int): Seconds to keep retrying while fields are missing,
+            defaults to the longest timeout of the fields.'''
+    policy = default_policy()
+    args = [[field.name or field.by[1], field.by[0], field.by[1], field.kind, field.to_dom(value)]
+            for field, value in values]
+    if timeout is None:
+        timeout = max([policy.timeout_for(field.by, field.timeout) for field, _ in values] or [0])
+
+    missing = []
+    def filled(driver):
+        missing[:] = driver.execute_script(FILL_JS, args)
+        return not missing
+
+    try:
+        policy.wait(driver, filled, timeout=timeout)
+    except TimeoutException:
+        raise TimeoutException('Form fields not found: {}'.format(', '.join(missing)))
@@ -0,0 +1,148 @@
+'''Check server side facts over plain HTTP instead of through the browser.
+
+Cart totals, login errors and whether a cart survives in its cookies don't
+need a rendered page. StoreClient asks the store's own endpoints for them over
+pooled keep-alive connections, with the cookies of a browser session when
+given one, so a test can seed state in the browser and verify it without
+another page load (or verify without a browser at all).'''
+import json
+import re
+from collections import namedtuple
+from html import unescape
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin
+
+import urllib3
+
+from pom.snapshot import parse_price
+
+# Keep-alive connections shared by every client of the process.
+POOL = urllib3.PoolManager(maxsize=8, retries=False)
+
+# Hops followed before giving up on a redirect loop.
+MAX_REDIRECTS = 5
+
+TOKEN_RE = re.compile(r'''static_token\s*=\s*['"](?P<token>\w+)['"]''')
+ERRORS_RE = re.compile(r'<div class="alert alert-danger">.*?<ol>(?P<items>.*?)</ol>', re.S)
+ITEM_RE = re.compile(r'<li>(?P<text>.*?)</li>', re.S)
+TAG_RE = re.compile(r'<[^>]+>')
+
+Response = namedtuple('Response', ['status', 'url', 'headers', 'text'])
+
+LoginResult = namedtuple('LoginResult', ['ok', 'errors', 'url'])
+LoginResult.__doc__ = '''ok is True when the store sent us on to "my account", errors are
+the messages of the alert list otherwise.'''
+
+
+class StoreClient(object):
+    '''Talks to the store's endpoints with a cookie jar of its own.
+
+    Args:
+        home_url (str): URL of the store's index.php.
+        cookies (dict): Cookie name -> value to start with.
+        timeout (float): Seconds per request.'''
+
+    def __init__(self, home_url, cookies=None, timeout=10):
+        self.home_url = home_url
+        self.cookies = dict(cookies or {})
+        self.timeout = timeout
+        self._token = None
+
+    @classmethod
+    def from_cookies(cls, home_url, cookies, **kwargs):
+        '''A client with WebDriver style cookie dicts, e.g. of a CartState.'''
+        return cls(home_url, {c['name']: c['value'] for c in cookies}, **kwargs)
+
+    @classmethod
+    def from_driver(cls, driver, home_url, **kwargs):
+        '''A client in the browser session of driver: same cookies, same cart,
+        same signed in customer.'''
+        return cls.from_cookies(home_url, driver.get_cookies(), **kwargs)
+
+    def url(self, **params):
+        return '{}?{}'.format(self.home_url, urlencode(params)) if params else self.home_url
+
+    def _store_cookies(self, response):
+        for header in response.headers.getlist('Set-Cookie'):
+            for name, morsel in SimpleCookie(header).items():
+                if morsel['max-age'] == '0' or morsel.value == 'deleted':
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+
+    def request(self, method, url, form=None):
+        '''Send a request with our cookies, following redirects and keeping
+        the cookies every hop sets.'''
+        for _ in range(MAX_REDIRECTS + 1):
+            headers = {'Cookie': '; '.join('{}={}'.format(k, v) for k, v in self.cookies.items())}
+            body = None
+            if form is not None:
+                body = urlencode(form)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            response = POOL.request(method, url, body=body, headers=headers, redirect=False,
+                                    timeout=self.timeout)
+            self._store_cookies(response)
+            location = response.headers.get('Location')
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                return Response(response.status, url, response.headers, response.data.decode('utf-8', 'replace'))
+            url = urljoin(url, location)
+            if response.status in (301, 302, 303):
+                (method, form) = ('GET', None)
+        raise IOError('Too many redirects from {}'.format(url))
+
+    def token(self):
+        '''The store's static token the cart controller wants, read once.'''
+        if self._token is None:
+            match = TOKEN_RE.search(self.request('GET', self.home_url).text)
+            self._token = match.group('token') if match else ''
+        return self._token
+
+    def _cart(self, **params):
+        params.update(controller='cart', ajax='true', token=self.token())
+        response = self.request('POST', self.url(rand=0), form=params)
+        return json.loads(response.text)
+
+    def cart_summary(self):
+        '''The cart of this session as the AJAX cart controller reports it.'''
+        return self._cart()
+
+    def add_to_cart(self, id_product, qty=1):
+        '''Add a product, returns the new cart summary.'''
+        return self._cart(add=1, qty=qty, id_product=id_product)
+
+    def cart_quantity(self):
+        return int(self.cart_summary()['nbTotalProducts'])
+
+    def check_cart_correctness(self, shipping_price, cart_items):
+        '''Check the cart totals against the cart_list model, like
+        CartPage.check_cart_correctness() does on the rendered cart page.'''
+        total_product = float('{0:.2f}'.format(sum([i['price']*i['number_of_items'] for i in cart_items])))
+        grand_total = float('{0:.2f}'.format(total_product + shipping_price))
+        summary = self.cart_summary()
+        return (total_product == parse_price(summary['productTotal']) and
+                shipping_price == parse_price(summary['shippingCost']) and
+                grand_total == parse_price(summary['total']) and
+                sum(i['number_of_items'] for i in cart_items) == int(summary['nbTotalProducts']))
+
+    def login(self, email, password):
+        '''Post the authentication form.
+
+        Returns (LoginResult)'''
+        response = self.request('POST', self.url(controller='authentication'),
+                                form={'email': email, 'passwd': password, 'back': 'my-account',
+                                      'SubmitLogin': ''})
+        if 'my-account' in response.url:
+            return LoginResult(True, [], response.url)
+        match = ERRORS_RE.search(response.text)
+        errors = [unescape(TAG_RE.sub('', item.group('text'))).strip()
+                  for item in ITEM_RE.finditer(match.group('items'))] if match else []
+        return LoginResult(False, errors, response.url)
+
+    def check_login_case(self, item):
+        '''Sign in with one case from logins.yml and check the store answers
+        what it expects, like SignInPage.check_login_case() does in the browser.'''
+        result = self.login(item['username'], item['password'])
+        if 'My account' != item['expect']:
+            assert(not result.ok and result.errors and item['expect'] == result.errors[0])
+        else:
+            assert(result.ok)
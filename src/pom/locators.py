@@ -67,7 +67,8 @@ class SearchResultsPageLocators(object):
     CENTER_COLUMN = (By.XPATH, '//*[@id="center_column"]/ul')
     LIST_OF_SEARCH_ITEMS = (By.XPATH, '//*[@id="center_column"]/ul/li')
     SEARCH_ALERT = (By.XPATH, '//*[@id="center_column"]/p')
-    ROW_VIEW = (By.CLASS_NAME, 'row')
+    GRID_LIST = (By.CSS_SELECTOR, '#center_column ul.product_list.grid')
+    LIST_LIST = (By.CSS_SELECTOR, '#center_column ul.product_list.list')
 
 class SignInOutLocator(object):
     '''A class for sign in/out locators.'''
@@ -0,0 +1,263 @@
+'''Browser side performance metrics of the pages the page objects visit.
+
+Nothing is recorded until a MetricsRecorder is activated. Then every page
+object navigation (get(), refresh() and navigating clicks) reads the page's
+Navigation Timing, Resource Timing and long tasks, and every cart action
+wrapped in ajax() records how long its XHRs took, all tagged with the page
+class and the running test. report() turns the samples of a run into
+percentiles and compares them with the runs before it.'''
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from pom.stats import percentile, summarize
+from pom.timing import current_test
+
+# Collects long tasks from the start of every document. Installed with
+# Page.addScriptToEvaluateOnNewDocument, so nothing is missed before the first
+# lookup. The resource timing buffer is raised so big pages don't overflow it.
+LONG_TASKS_JS = '''
+(function () {
+    if (window.__pomLongTasks) { return; }
+    window.__pomLongTasks = [];
+    if (performance.setResourceTimingBufferSize) { performance.setResourceTimingBufferSize(1000); }
+    try {
+        new PerformanceObserver(function (list) {
+            var entries = list.getEntries();
+            for (var i = 0; i < entries.length; i++) {
+                window.__pomLongTasks.push([entries[i].startTime, entries[i].duration]);
+            }
+        }).observe({entryTypes: ['longtask']});
+    } catch (e) {}
+})();
+'''
+
+# Navigation Timing of the current document (the level 2 entry, performance.timing
+# where there isn't one) in ms from the start of the navigation, its resources
+# and its long tasks so far.
+NAVIGATION_JS = '''
+var nav = performance.getEntriesByType('navigation')[0], t = performance.timing;
+var timing = nav ? [nav.type, nav.domainLookupEnd - nav.domainLookupStart, nav.connectEnd - nav.connectStart,
+                    nav.responseStart, nav.responseEnd, nav.domInteractive, nav.domContentLoadedEventEnd,
+                    nav.loadEventEnd, nav.transferSize || 0]
+                 : ['navigate', t.domainLookupEnd - t.domainLookupStart, t.connectEnd - t.connectStart,
+                    t.responseStart - t.navigationStart, t.responseEnd - t.navigationStart,
+                    t.domInteractive - t.navigationStart, t.domContentLoadedEventEnd - t.navigationStart,
+                    t.loadEventEnd ? t.loadEventEnd - t.navigationStart : 0, 0];
+var resources = performance.getEntriesByType('resource'), bytes = 0, slowest = null;
+for (var i = 0; i < resources.length; i++) {
+    bytes += resources[i].transferSize || 0;
+    if (!slowest || resources[i].duration > slowest.duration) { slowest = resources[i]; }
+}
+var tasks = window.__pomLongTasks || [], blocked = 0;
+for (var j = 0; j < tasks.length; j++) { blocked += tasks[j][1]; }
+return [window.location.href, timing, resources.length, bytes,
+        slowest ? [slowest.name, slowest.duration] : null, tasks.length, blocked];
+'''
+
+# The XHR and fetch requests, and long tasks, since arguments[0] (a
+# performance.now() mark).
+AJAX_JS = '''
+var since = arguments[0], requests = [], blocked = 0;
+var resources = performance.getEntriesByType('resource');
+for (var i = 0; i < resources.length; i++) {
+    var r = resources[i];
+    if (r.startTime >= since && (r.initiatorType === 'xmlhttprequest' || r.initiatorType === 'fetch')) {
+        requests.push([r.name, r.duration]);
+    }
+}
+var tasks = window.__pomLongTasks || [];
+for (var j = 0; j < tasks.length; j++) {
+    if (tasks[j][0] >= since) { blocked += tasks[j][1]; }
+}
+return [requests, blocked];
+'''
+
+NOW_JS = 'return performance.now();'
+
+# Runs kept in the history the trend is computed from.
+HISTORY_LIMIT = 100
+
+Navigation = namedtuple('Navigation', ['page', 'test', 'url', 'type', 'dns_ms', 'connect_ms', 'ttfb_ms',
+                                       'response_ms', 'dom_interactive_ms', 'dom_content_loaded_ms',
+                                       'load_ms', 'document_bytes', 'resources', 'resource_bytes',
+                                       'slowest_resource', 'long_tasks', 'long_task_ms'])
+Navigation.__doc__ = '''One page load as the browser timed it. load_ms is None when the page
+object didn't wait for the load event (page load strategies "eager" and "none").'''
+
+Ajax = namedtuple('Ajax', ['page', 'action', 'test', 'wall_ms', 'requests', 'request_ms', 'long_task_ms'])
+Ajax.__doc__ = '''One cart action: wall_ms from the click to the page showing the result,
+request_ms the slowest XHR it sent, None if the browser timed none.'''
+
+# Fields of the report, by kind of sample.
+NAVIGATION_FIELDS = ('ttfb_ms', 'response_ms', 'dom_content_loaded_ms', 'load_ms', 'resources',
+                     'resource_bytes', 'long_task_ms')
+AJAX_FIELDS = ('wall_ms', 'request_ms', 'long_task_ms')
+
+# The run being recorded to, None when metrics are off.
+_active = None
+
+
+def activate(recorder):
+    '''Start recording metrics to recorder (None stops recording).'''
+    global _active
+    _active = recorder
+
+
+def active():
+    return _active
+
+
+def instrument(driver):
+    '''Collect long tasks in every document driver loads from now on.'''
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': LONG_TASKS_JS})
+    except Exception:
+        # Not a local Chrome: long tasks are counted from the first sample on.
+        pass
+    return driver
+
+
+def navigation(page, destination=None):
+    '''Record the page load page just went through, if metrics are on. The
+    sample is tagged with the page class destination, page's class when None.'''
+    if _active is not None:
+        _active.navigation(page.driver, (destination or type(page)).__name__)
+
+
+@contextlib.contextmanager
+def ajax(page, action):
+    '''Record the XHRs of the action run in the with block, if metrics are on.'''
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    since = page.driver.execute_script(NOW_JS)
+    start = time.perf_counter()
+    yield
+    recorder.ajax(page.driver, type(page).__name__, action, since, time.perf_counter() - start)
+
+
+def _ms(value):
+    return value if value and value > 0 else None
+
+
+class MetricsRecorder(object):
+    '''Collects the navigation and AJAX samples of one process.'''
+
+    def __init__(self):
+        self.navigations = []
+        self.ajax_actions = []
+        self._lock = threading.Lock()
+
+    def navigation(self, driver, page):
+        '''Sample the document driver is on.'''
+        try:
+            (url, timing, resources, resource_bytes, slowest, long_tasks,
+             long_task_ms) = driver.execute_script(NAVIGATION_JS)
+        except Exception:
+            # The page went away under us, e.g. a click that redirected twice.
+            return None
+        (nav_type, dns, connect, ttfb, response, interactive, loaded, load, document_bytes) = timing
+        sample = Navigation(page, current_test(), url, nav_type, dns, connect, _ms(ttfb), _ms(response),
+                            _ms(interactive), _ms(loaded), _ms(load), document_bytes, resources,
+                            resource_bytes, slowest, long_tasks, long_task_ms)
+        with self._lock:
+            self.navigations.append(sample)
+        return sample
+
+    def ajax(self, driver, page, action, since, wall):
+        '''Sample the XHRs driver sent since the performance.now() mark since.'''
+        (requests, long_task_ms) = driver.execute_script(AJAX_JS, since)
+        sample = Ajax(page, action, current_test(), wall * 1000, requests,
+                      max([duration for (_, duration) in requests]) if requests else None, long_task_ms)
+        with self._lock:
+            self.ajax_actions.append(sample)
+        return sample
+
+    def write(self, path):
+        '''Write every sample as JSON, for report() to merge.'''
+        with open(path, 'w') as samples:
+            json.dump({'navigations': [n._asdict() for n in self.navigations],
+                       'ajax': [a._asdict() for a in self.ajax_actions]}, samples)
+
+
+def prepare(directory):
+    '''Create directory and drop samples a crashed run left behind. Call it
+    once, before any worker starts recording.'''
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith('samples-') and name.endswith('.json'):
+            os.remove(os.path.join(directory, name))
+
+
+def summarize_samples(navigations, ajax_actions):
+    '''Percentiles of every field, per page class for navigations and per
+    page.action for AJAX.'''
+    groups = {}
+    for sample in navigations:
+        groups.setdefault(('navigation', sample['page']), []).append(sample)
+    for sample in ajax_actions:
+        groups.setdefault(('ajax', '{}.{}'.format(sample['page'], sample['action'])), []).append(sample)
+    summary = {'navigation': {}, 'ajax': {}}
+    for (kind, name), samples in sorted(groups.items()):
+        fields = NAVIGATION_FIELDS if kind == 'navigation' else AJAX_FIELDS
+        summary[kind][name] = {field: summarize([s[field] for s in samples if s[field] is not None])
+                               for field in fields}
+    return summary
+
+
+def compare(summary, history, threshold=0.2):
+    '''p50 and p95 of summary against the median of the same figure over the
+    runs in history. Returns rows, regressions (over threshold) first.'''
+    rows = []
+    for kind in ('navigation', 'ajax'):
+        for name, fields in summary[kind].items():
+            for field, stats in fields.items():
+                for figure in ('p50', 'p95'):
+                    past = [run['summary'][kind][name][field][figure] for run in history
+                            if figure in run['summary'].get(kind, {}).get(name, {}).get(field, {})]
+                    if figure not in stats or not past:
+                        continue
+                    baseline = percentile(past, 50)
+                    change = (stats[figure] - baseline) / baseline if baseline else 0.0
+                    rows.append({'name': '{} {}.{}'.format(kind, name, field), 'figure': figure,
+                                 'value': stats[figure], 'baseline': baseline, 'change': change,
+                                 'runs': len(past), 'regression': change > threshold})
+    return sorted(rows, key=lambda row: (not row['regression'], -row['change']))
+
+
+def report(directory, history_runs=10, threshold=0.2):
+    '''Merge the samples every process wrote to directory into one run
+    report, compare it with the previous runs and add it to their history.
+
+    Returns (dict): The report, also written to directory/report.json. None
+    when nothing was sampled.'''
+    navigations, ajax_actions = [], []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('samples-') and name.endswith('.json'):
+            with open(os.path.join(directory, name), 'r') as samples:
+                data = json.load(samples)
+            navigations.extend(data['navigations'])
+            ajax_actions.extend(data['ajax'])
+            os.remove(os.path.join(directory, name))
+    if not navigations and not ajax_actions:
+        return None
+
+    history_path = os.path.join(directory, 'history.json')
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path, 'r') as previous:
+            history = json.load(previous)
+    summary = summarize_samples(navigations, ajax_actions)
+    run = {'time': time.time(), 'navigations': len(navigations), 'ajax': len(ajax_actions),
+           'summary': summary}
+    result = dict(run, trend=compare(summary, history[-history_runs:], threshold))
+    with open(os.path.join(directory, 'report.json'), 'w') as output:
+        json.dump(result, output, indent=2)
+    with open(history_path, 'w') as output:
+        json.dump((history + [run])[-HISTORY_LIMIT:], output)
+    return result
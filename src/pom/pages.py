@@ -1,77 +1,259 @@
+import copy
+import functools
+import os
 import random
 import re
-import time
 import yaml
+from collections import namedtuple
 
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import JavascriptException, StaleElementReferenceException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 
-from pom.element import BasePageElement
+from pom import metrics, waits
+from pom.catalog import (CATALOG_JS, PRICE_RE, SEARCH_RESULTS_JS, parse_result_count,
+                         product_from_row, search_result_from_row)
+from pom.element import BasePageElement, TextField, fill_fields
+from pom.registry import REGISTRY
+from pom.results import cached_check
+from pom.session import clean_cookie
+from pom.snapshot import SNAPSHOT_JS, Snapshot, locator_args
+from pom.timing import TimedActions, timed
 from pom.locators import (CartPageLocator,
                           MainPageLocators,
                           SearchResultsPageLocators,
                           SignInOutLocator)
 
-LOGIN_DATA_PATH = r'./data/logins.yml'
+# Next to the pom package, so it is found whatever directory pytest runs from.
+LOGIN_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'logins.yml')
 
-class BasePage(object):
+@functools.lru_cache(maxsize=None)
+def load_login_cases(path=LOGIN_DATA_PATH):
+    '''Parse the login test cases once and cache them.
+
+    Returns (tuple): dicts with use_case, username, password and expect.'''
+    with open(path, 'r') as file:
+        return tuple(yaml.load(file, Loader=yaml.FullLoader)['logins'])
+
+
+class BasePage(TimedActions):
     """Base class to initialize the base page that will be called from all pages"""
 
-    def __init__(self, driver):
+    def __init__(self, driver, policy=None):
         self.driver = driver
+        # Timeouts and poll intervals, the session wide one by default.
+        self.policy = policy or waits.default_policy()
+        # (By, value) -> WebElement resolved by find().
+        self._elements = {}
+
+    @timed
+    def find(self, *locator, timeout=None):
+        '''Wait for a locator to be visible and return its element.
+
+        The element is cached per page object, so looking the same locator up
+        again costs a single visibility check instead of a new lookup. Stale
+        entries are dropped and resolved again. XPaths are looked up through
+        their ID/CSS equivalent from the locator registry once it has been
+        checked to find the same element.'''
+        element = self._elements.get(locator)
+        if element is not None:
+            try:
+                if element.is_displayed():
+                    return element
+            except StaleElementReferenceException:
+                pass
+            del self._elements[locator]
+        fast = REGISTRY.resolve(self.driver, locator)
+        element = self.policy.wait(self.driver, EC.visibility_of_element_located(fast),
+                                   key=locator, timeout=timeout,
+                                   message='Element not visible: {}'.format(locator[1]))
+        self._elements[locator] = element
+        return element
+
+    def invalidate(self, *locator):
+        '''Forget a cached element, or all of them when no locator is given.'''
+        if locator:
+            self._elements.pop(locator, None)
+        else:
+            self._elements.clear()
 
-    def click(self, *locator):
-        WebDriverWait(self.driver, 10).until(EC.visibility_of_element_located(locator)).click()
+    def _on_element(self, locator, action):
+        '''Run action on the element of locator, retrying once with a freshly
+        resolved element if the cached one went stale in between.'''
+        try:
+            return action(self.find(*locator))
+        except StaleElementReferenceException:
+            self.invalidate(*locator)
+            return action(self.find(*locator))
+
+    @timed
+    def get(self, url):
+        '''Navigate to a URL. Elements of the previous page are forgotten.'''
+        self.invalidate()
+        self.driver.get(url)
+        self._wait_for_document()
+        metrics.navigation(self)
+
+    @timed
+    def refresh(self):
+        '''Reload the current page. Elements of the previous page are forgotten.'''
+        self.invalidate()
+        self.driver.refresh()
+        self._wait_for_document()
+        metrics.navigation(self)
+
+    def _document_origin(self):
+        '''Origin of the current document when a navigating click could return
+        before it is replaced ("eager" and "none" page load strategies), else None.'''
+        if self.driver.capabilities.get('pageLoadStrategy') in ('eager', 'none'):
+            return self.driver.execute_script(waits.DOCUMENT_STATE_JS)[0]
+        return None
+
+    def _wait_for_document(self, origin=None, timeout=None):
+        '''With the "none" page load strategy get() returns before the page is
+        parsed, wait for the DOM here so the next lookup doesn't hit the old page.
+        After a navigating click, origin from _document_origin() waits for the
+        document clicked on to be replaced first.'''
+        if origin is not None:
+            # A script can hit the old document as it unloads, try again.
+            self.policy.wait(self.driver, waits.document_replaced(origin), timeout=timeout, poll=0.05,
+                             message='Document not replaced', ignored_exceptions=(JavascriptException,))
+        elif self.driver.capabilities.get('pageLoadStrategy') == 'none':
+            self.policy.wait(self.driver, waits.document_interactive(), timeout=timeout, poll=0.05,
+                             message='Document not parsed')
+
+    @timed
+    def click(self, *locator, navigates=False, destination=None):
+        '''Click an element once it is visible.
 
+        Args:
+            navigates (bool): The click loads a new page, forget cached elements.
+            destination (type): Page class of the page loaded, its metrics are
+                tagged with this page's class when None.'''
+        origin = self._document_origin() if navigates else None
+        self._on_element(locator, lambda element: element.click())
+        if navigates:
+            self.invalidate()
+            self._wait_for_document(origin)
+            metrics.navigation(self, destination)
+
+    @timed
     def visible(self, *locator):
         '''Wait for a locator to become visible after an interaction is performed.'''
-        element = WebDriverWait(self.driver, 10).until(EC.visibility_of_element_located(locator))
-        return bool(element)
+        return bool(self.find(*locator))
 
+    @timed
     def disappear(self, *locator):
-        '''Expect an element to not be there or to disappear. Wait 1 second.'''
-        try:
-            WebDriverWait(self.driver, 1).until(EC.visibility_of_element_located(locator))
-        except TimeoutException:
-            return True
-        else:
-            return False
+        '''Expect an element to not be there or to disappear.
 
+        A missing element is answered by a single lookup, a displayed one gets
+        the policy's absence grace period to go away.'''
+        return self.policy.absent(self.driver, REGISTRY.resolve(self.driver, locator))
+
+    @timed
     def enter_text(self, *locator, text):
-        return WebDriverWait(self.driver, 10).until(EC.visibility_of_element_located(locator)).send_keys(text)
+        return self._on_element(locator, lambda element: element.send_keys(text))
 
+    @timed
     def clear_text(self, *locator, text):
-        return WebDriverWait(self.driver, 10).until(EC.visibility_of_element_located(locator)).clear()
+        return self._on_element(locator, lambda element: element.clear())
 
+    @timed
     def hover(self, *locator):
-        element = WebDriverWait(self.driver, 10).until(EC.visibility_of_element_located(locator))
-        ActionChains(self.driver).move_to_element(element).perform()
+        self._on_element(locator, lambda element: ActionChains(self.driver).move_to_element(element).perform())
+
+    @timed
+    def fill(self, **values):
+        '''Fill many of the page's BasePageElement fields in one round-trip.
 
+        Args:
+            values: Field attribute name -> value to set.'''
+        fill_fields(self.driver, [(getattr(type(self), name), value) for name, value in values.items()])
+
+    @timed
     def list_of_items(self, *locator, text):
         return self.driver.find_element(*locator).find_elements_by_tag_name(text)
 
-    def wait_element(self, *locator):
+    @timed
+    def wait_element(self, *locator, timeout=None):
+        '''Wait for an element to be present. Raises TimeoutException, the
+        driver is shared with the tests after this one and stays up.'''
+        fast = REGISTRY.resolve(self.driver, locator)
+        return self.policy.wait(self.driver, EC.presence_of_element_located(fast), key=locator,
+                                timeout=timeout, message='Element not found: {}'.format(locator[1]))
+
+    @timed
+    def snapshot(self, locators, attributes=('value',), root=None):
+        '''Read the text and attributes of many locators in one round-trip.
+
+        Args:
+            locators (dict): Field name -> (By, value) locator.
+            attributes (tuple): Attribute names to read for every field.
+            root (obj): WebElement or (By, value) locator to search under.
+
+        Returns (Snapshot): Field name -> Field(found, text, attrs).'''
+        result = self.driver.execute_script(
+            SNAPSHOT_JS, locator_args(locators), list(attributes), root)
+        return Snapshot.from_script(result)
+
+    def track_ajax(self):
+        '''Start counting the page's XHR/fetch requests so wait_for_ajax() can
+        see them. Call it before the interaction that fires the request.'''
+        self.driver.execute_script(waits.TRACK_AJAX_JS)
+
+    @timed
+    def wait_for_ajax(self, timeout=None):
+        '''Wait for jQuery and tracked XHR/fetch activity to finish.'''
+        self.policy.wait(self.driver, waits.ajax_complete(), timeout=timeout, message='AJAX still running')
+
+    @timed
+    def wait_for_dom_settled(self, element=None, quiet=0.2, timeout=None):
+        '''Wait for the DOM (or the subtree under element) to stop changing.'''
+        self.driver.set_script_timeout(self.policy.timeout_for(timeout=timeout))
         try:
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located(locator))
-        except TimeoutException:
-            print("\n * ELEMENT NOT FOUND WITHIN GIVEN TIME! --> %s" %(locator[1]))
-            self.driver.quit()
+            return waits.dom_settled(element, quiet)(self.driver)
+        finally:
+            # The driver goes back to the pool, don't leave our timeout behind.
+            self.driver.set_script_timeout(waits.SCRIPT_TIMEOUT)
+
+    @timed
+    def wait_for_change(self, *locator, old_value, attribute=None, timeout=None):
+        '''Wait for an element's text or attribute to change from old_value.
+
+        Returns (str): The new value.'''
+        fast = REGISTRY.resolve(self.driver, locator)
+        return self.policy.wait(self.driver, waits.value_changes(fast, old_value, attribute),
+                                timeout=timeout, message='{} did not change'.format(locator[1]),
+                                ignored_exceptions=(StaleElementReferenceException,))
 
 
 class HomePage(BasePage):
     """Home page action methods are ."""
+    @cached_check(MainPageLocators.TITLE)
     def is_title_correct(self):
         '''Is the title of the home page correct.'''
-        return bool(self.driver.find_element(*MainPageLocators.TITLE) == 'My Store')
+        return bool(self.driver.title == 'My Store')
 
     def items_list(self):
         '''Get a list of items from the home page.'''
         assert(self.visible(*MainPageLocators.CART_ITEMS))
         return self.list_of_items(*MainPageLocators.CART_ITEMS, text='li')
 
+    # CATALOG_JS arguments: the product list and the class names it reads.
+    CATALOG_ARGS = (MainPageLocators.CART_ITEMS[1], MainPageLocators.BLOCK_PRODUCT[1],
+                    MainPageLocators.ADD_ITEM_BTN[1], MainPageLocators.ITEM_PRICE[1],
+                    MainPageLocators.ITEM_NAME[1])
+
+    def catalog(self):
+        '''Get name, prices, id and add-to-cart link of every home page product
+        in a single script call.
+
+        Returns (list): Product records in page order.'''
+        assert(self.visible(*MainPageLocators.CART_ITEMS))
+        rows = self.driver.execute_script(CATALOG_JS, *self.CATALOG_ARGS)
+        return [product_from_row(row) for row in rows]
+
     def cart_quantity(self):
         '''Gets the scalar number of the number of items in a cart.'''
         return int(self.driver.find_element(*MainPageLocators.CART_QUANTITY).text)
@@ -80,20 +262,27 @@ class HomePage(BasePage):
         '''Get the value from the cart if it is expected to be empty.'''
         return self.driver.find_element(*MainPageLocators.CART_NO_QUANTITY).text
 
+    @cached_check(MainPageLocators.CART_PAGE)
+    def is_cart_empty(self):
+        '''Does the header cart say it is empty.'''
+        return bool(self.cart_no_quantity() == '(empty)')
+
     def search_and_click(self, text):
         '''Search and click results.
         
         Args:
             text (str): Search text.'''
-        self.driver.find_element(*MainPageLocators.SEARCH_TEXTBOX).clear()
+        self.clear_text(*MainPageLocators.SEARCH_TEXTBOX, text='')
         self.enter_text(*MainPageLocators.SEARCH_TEXTBOX, text=text)
-        self.click(*MainPageLocators.SEARCH_SUBMIT)
+        self.click(*MainPageLocators.SEARCH_SUBMIT, navigates=True, destination=SearchResultsPage)
 
-    def hover_then_click_add(self, add_cart_element):
+    def hover_then_click_add(self, add_cart_element, product=None):
         '''Hover then click on "Add to cart".
         
         Args:
-            locator (obj): cart locator item to hover and click on.
+            add_cart_element (obj): cart locator item to hover and click on.
+            product (Product): The item's catalog() record. Saves reading the
+                name and price from the page when given.
             
         Returns: tuple (item(str), price(float))'''
         # Get the hover hover object.
@@ -103,58 +292,82 @@ class HomePage(BasePage):
         # Wait for the button item to appear and get values.
         add_cart_btn = add_cart_element.find_element(*MainPageLocators.ADD_ITEM_BTN)
         self.wait_element(*MainPageLocators.ADD_ITEM_BTN)
-        item_price = add_cart_element.find_element(*MainPageLocators.ITEM_PRICE).text
-        item_name = add_cart_element.find_element(*MainPageLocators.ITEM_NAME).get_attribute('title')
+        if product is not None:
+            item_name, actual_price = product.name, product.price
+        else:
+            item_price = add_cart_element.find_element(*MainPageLocators.ITEM_PRICE).text
+            item_name = add_cart_element.find_element(*MainPageLocators.ITEM_NAME).get_attribute('title')
 
-        # Since there are discounts let's only get the first price.
-        re_obj = re.compile(r'^\$(?P<act_price>\d+\.\d{2}).*')
-        assert(re_obj is not None)
-        actual_price = re_obj.match(item_price)
+            # Since there are discounts let's only get the first price.
+            actual_price = float(PRICE_RE.match(item_price).group('act_price'))
 
         # Move then click on the item add.
         hover.move_to_element(add_cart_btn)
 
         # TODO: Randomize the clicks to get more items.
-        add_cart_btn.click()
+        with metrics.ajax(self, 'add_to_cart'):
+            add_cart_btn.click()
 
-        # Wait for modal and get element
-        assert(self.visible(*MainPageLocators.MODAL_CONFIRM))
+            # Wait for modal and get element
+            assert(self.visible(*MainPageLocators.MODAL_CONFIRM))
+
+        return (item_name, actual_price)
 
-        return (item_name, float(actual_price.group('act_price')))
-        
 
 class CartModal(BasePage):
     '''Methods for the modal cart items go here.'''
 
-    def __init__(self, driver):
-        self.modal = driver.find_element(*MainPageLocators.MODAL_CONFIRM)  
+    # Every field the confirm_* checks look at, read together in one snapshot.
+    FIELDS = {'name': MainPageLocators.CART_PROD_NAME,
+              'price': MainPageLocators.CART_PROD_PRICE,
+              'qty': MainPageLocators.CART_PROD_QTY,
+              'total_qty': MainPageLocators.TOTAL_QTY,
+              'block_total': MainPageLocators.BLOCK_PROD_TOTAL,
+              'shipping': MainPageLocators.SHIPPING_COST,
+              'cart_total': MainPageLocators.CART_TOTAL}
+
+    def __init__(self, driver, policy=None):
+        super(CartModal, self).__init__(driver, policy)
+        self.modal = driver.find_element(*MainPageLocators.MODAL_CONFIRM)
+        self._fields = None
+
+    @property
+    def fields(self):
+        '''Snapshot of the modal fields, read on first use.'''
+        if self._fields is None:
+            self.refresh_fields()
+        return self._fields
+
+    def refresh_fields(self):
+        '''Re-read every modal field in a single round-trip.'''
+        self._fields = self.snapshot(self.FIELDS, attributes=(), root=self.modal)
 
     def confirm_cart_product_name(self, cart_prod_name):
         '''Confirms cart product name.'''
-        return bool(cart_prod_name == self.modal.find_element(*MainPageLocators.CART_PROD_NAME).text)
+        return bool(cart_prod_name == self.fields.text('name'))
 
     def confirm_cart_product_price(self, cart_prod_price):
         '''Confirms cart product price.'''
-        return bool(cart_prod_price == float(self.modal.find_element(*MainPageLocators.CART_PROD_PRICE).text.replace('$', '')))
+        return bool(cart_prod_price == self.fields.price('price'))
 
     def confirm_cart_product_qty(self, cart_prod_qty):
         '''Confirms cart product qty.'''
-        return bool(cart_prod_qty == int(self.modal.find_element(*MainPageLocators.CART_PROD_QTY).text))
+        return bool(cart_prod_qty == self.fields.number('qty'))
 
     def confirm_total_product_qty(self, total_prod_qty):
         '''Confirms total product qty.'''
-        return bool(total_prod_qty == int(self.modal.find_element(*MainPageLocators.TOTAL_QTY).text))
+        return bool(total_prod_qty == self.fields.number('total_qty'))
 
     def confirm_block_product_total(self, block_prod_price):
         '''Confirms block product total.'''
-        return bool(block_prod_price == float(self.modal.find_element(*MainPageLocators.BLOCK_PROD_TOTAL).text.replace('$', '')))
+        return bool(block_prod_price == self.fields.price('block_total'))
 
     def confirm_shipping_cost(self, shipping_cost):
         '''Confirms block product total.'''
-        return bool(shipping_cost == float(self.modal.find_element(*MainPageLocators.SHIPPING_COST).text.replace('$', '')))
+        return bool(shipping_cost == self.fields.price('shipping'))
 
     def confirm_cart_total(self, cart_total):
-        return bool(cart_total == float(self.modal.find_element(*MainPageLocators.CART_TOTAL).text.replace('$', '')))
+        return bool(cart_total == self.fields.price('cart_total'))
 
     def close_modal(self):
         '''Closes the modal. Randomize which button is clicked'''
@@ -166,50 +379,78 @@ class CartModal(BasePage):
 class SearchResultsPage(BasePage):
     """Search results page class."""
         
+    @cached_check(SearchResultsPageLocators.SEARCH_ALERT)
     def check_results_expect_empty(self, compare_text):
         '''Check the results from an expected empty result.
         Args:
             compare_text (str): text to compare to the value of the result.'''
-        assert(self.visible(*SearchResultsPageLocators.SEARCH_ALERT))
-        return bool(self.driver.find_element(*SearchResultsPageLocators.SEARCH_ALERT).text == compare_text)
+        return bool(self.find(*SearchResultsPageLocators.SEARCH_ALERT).text == compare_text)
+
+    def results(self):
+        '''Read every search result in a single script call.
+
+        Returns (tuple): (results, count) with a SearchResult per result in
+            page order and the count of the results heading, None without one.'''
+        assert(self.visible(*SearchResultsPageLocators.CENTER_COLUMN))
+        table = self.driver.execute_script(
+            SEARCH_RESULTS_JS, SearchResultsPageLocators.CENTER_COLUMN[0],
+            SearchResultsPageLocators.CENTER_COLUMN[1], 'price', 'product-name', 'availability')
+        return ([search_result_from_row(row) for row in table['rows']], parse_result_count(table['counter']))
+
+    def relevant_results(self, compare_text, results=None):
+        '''The results whose text contains compare_text, ignoring case.'''
+        if results is None:
+            (results, _) = self.results()
+        compare_text = compare_text.lower()
+        return [result for result in results if compare_text in result.text.lower()]
 
     def check_results_known_search_term(self, compare_text):
-        '''Check the results from an expected empty result.
+        '''Check that a known search term found results that mention it.
         Args:
             compare_text (str): text to compare to the value of the result.'''
-        assert(self.visible(*SearchResultsPageLocators.CENTER_COLUMN))
-        list_of_items = self.list_of_items(*SearchResultsPageLocators.LIST_OF_SEARCH_ITEMS, text='li')
-        for search_item in list_of_items:
-            if compare_text.lower() in search_item.text.lower():
-                return False
-        return True
+        (results, _) = self.results()
+        return bool(self.relevant_results(compare_text, results))
+
+    def check_results_count(self, expected=None, minimum=None):
+        '''Check the number of results against the results heading and, when
+        given, the expected count or the minimum count.'''
+        (results, count) = self.results()
+        return ((count is None or count == len(results)) and
+                (expected is None or expected == len(results)) and
+                (minimum is None or minimum <= len(results)))
 
     def switch_check_to_grid_view(self):
         '''Switch to grid view.'''
         self.click(*SearchResultsPageLocators.GRID_VIEW)
-        # check for the row div to disappear or it's absence.
-        return self.disappear(*SearchResultsPageLocators.ROW_VIEW)
+        # the product list swaps its list class for the grid class.
+        return (self.visible(*SearchResultsPageLocators.GRID_LIST) and
+                self.disappear(*SearchResultsPageLocators.LIST_LIST))
 
     def switch_check_to_list_view(self):
         '''Switch to list view.'''
         self.click(*SearchResultsPageLocators.LIST_VIEW)
-        # check for the row div to appear.
-        return self.visible(*SearchResultsPageLocators.ROW_VIEW)
+        # the product list swaps its grid class for the list class.
+        return (self.visible(*SearchResultsPageLocators.LIST_LIST) and
+                self.disappear(*SearchResultsPageLocators.GRID_LIST))
 
 
 class SignInPage(BasePage):
     """Sign in Page. Test Class"""
 
+    # Authentication form fields.
+    email = TextField(SignInOutLocator.EMAIL_INPUT)
+    password = TextField(SignInOutLocator.PASSWORD_INPUT)
+
     def click_signin_page(self):
         '''Go to the sign in page and check for authentication element div.'''
         self.hover(*MainPageLocators.SIGN_IN)
-        self.click(*MainPageLocators.SIGN_IN)
+        self.click(*MainPageLocators.SIGN_IN, navigates=True, destination=SignInPage)
         return self.check_authentication_page()
 
     def click_logout(self):
         '''Go to the sign in page and check for authnetication element div.'''
         self.hover(*SignInOutLocator.LOGOUT_BTN)
-        self.click(*SignInOutLocator.LOGOUT_BTN)
+        self.click(*SignInOutLocator.LOGOUT_BTN, navigates=True, destination=SignInPage)
         return self.check_authentication_page()
 
     def check_authentication_page(self):
@@ -222,8 +463,7 @@ class SignInPage(BasePage):
 
     def check_username_signin(self, username):
         '''Check that the username is correct.'''
-        assert(self.visible(*SignInOutLocator.SIGN_IN_BOX))
-        sign_in = self.driver.find_element(*SignInOutLocator.SIGN_IN_BOX).text
+        sign_in = self.find(*SignInOutLocator.SIGN_IN_BOX).text
 
         # Reg ex to get username and domain.
         re_un = re.compile(r'^(?P<username>.+)\@(?P<domain>.+)\..+$')
@@ -242,84 +482,134 @@ class SignInPage(BasePage):
 
     def fillout_authenticator(self, username, password):
         '''Fill out the authenticator.'''
-        # First clear out input.
-        self.clear_text(*SignInOutLocator.EMAIL_INPUT, text='')
-        self.clear_text(*SignInOutLocator.PASSWORD_INPUT, text='')
-
-        # Now fill out input boxes and sign in... or try.
-        self.enter_text(*SignInOutLocator.EMAIL_INPUT, text=username)
-        self.enter_text(*SignInOutLocator.PASSWORD_INPUT, text=password)
+        # Replace whatever is in both input boxes in one go, then sign in... or try.
+        self.fill(email=username, password=password)
         self.hover(*SignInOutLocator.SUBMIT_BTN)
-        self.click(*SignInOutLocator.SUBMIT_BTN)
+        self.click(*SignInOutLocator.SUBMIT_BTN, navigates=True)
+
+    def check_login_case(self, item):
+        '''Sign in with one case from logins.yml and check the page shows what it expects.'''
+        self.fillout_authenticator(item['username'], item['password'])
+
+        # We handle the passing test case differently.
+        if 'My account' != item['expect']:
+            assert(item['expect'] == self.find(*SignInOutLocator.ALERT_TEXT).text)
+        else:
+            assert(item['expect'] == self.find(*SignInOutLocator.LOGGED_IN_TEXT).text)
 
     def check_login_behavior(self):
         '''Read from a YAML file to get test data and conditions for testing login.'''
-        with open(LOGIN_DATA_PATH, 'r') as file:
-            userlist = yaml.load(file, Loader=yaml.FullLoader)
-            for num, item in enumerate(userlist['logins']):
-                print ('Test Case: {}, Description: {}'.format(num, item['use_case']))
-                self.fillout_authenticator(item['username'], item['password'])
-
-                # We handle the passing test case differently.
-                if 'My account' != item['expect']:
-                    assert(self.visible(*SignInOutLocator.ALERT_TEXT))
-                    assert(item['expect'] == self.driver.find_element(*SignInOutLocator.ALERT_TEXT).text)
-                else:
-                    assert(self.visible(*SignInOutLocator.LOGGED_IN_TEXT))
-                    assert(item['expect'] == self.driver.find_element(*SignInOutLocator.LOGGED_IN_TEXT).text)
+        for num, item in enumerate(load_login_cases()):
+            print ('Test Case: {}, Description: {}'.format(num, item['use_case']))
+            self.check_login_case(item)
+
+CartState = namedtuple('CartState', ['cookies', 'items'])
+CartState.__doc__ = '''A cart captured by CartPage.capture_state(): the browser cookies that
+hold it and the cart_list model of what is in it.'''
 
 class CartPage(BasePage):
     """Search cart page action methods defined here."""
 
+    def capture_state(self, cart_items):
+        '''Capture the cart of this browser so it can be restored elsewhere.
+
+        Args:
+            cart_items (list): The cart_list model of what is in the cart.
+
+        Returns (CartState)'''
+        cookies = [clean_cookie(c) for c in self.driver.get_cookies()]
+        return CartState(cookies, copy.deepcopy(cart_items))
+
+    def restore_state(self, state, shipping_price):
+        '''Restore a captured cart into this browser and check the cart page
+        matches the model: item count, product total, shipping and totals.
+
+        The browser must be on a page of the store and is left on the cart
+        page. The restored cookies point at the same cart on the server, so
+        drivers restoring one state share it: use it for checks that read the
+        cart and seed a fresh cart for tests that change it.
+
+        Returns (list): A copy of the cart_list model of the restored cart.'''
+        self.driver.delete_all_cookies()
+        for cookie in state.cookies:
+            self.driver.add_cookie(cookie)
+        # The header link loads the cart page with the restored cookies.
+        assert(self.click_cart_page())
+        quantity = sum(i['number_of_items'] for i in state.items)
+        header = self.snapshot({'quantity': MainPageLocators.CART_QUANTITY}, attributes=())
+        assert(header['quantity'].found and header.number('quantity') == quantity)
+        assert(self.check_cart_correctness(shipping_price, state.items))
+        return copy.deepcopy(state.items)
+
     def click_cart_page(self):
         '''Go to the sign in page and check for authnetication element div.'''
         self.hover(*MainPageLocators.CART_PAGE)
-        self.click(*MainPageLocators.CART_PAGE)
+        self.click(*MainPageLocators.CART_PAGE, navigates=True, destination=CartPage)
         return bool(self.visible(*CartPageLocator.CART_TABLE))
 
+    # Cart summary fields, read together in one snapshot.
+    SUMMARY = {'total_product': CartPageLocator.TOTAL_PROD,
+               'total_shipping': CartPageLocator.TOTAL_SHIPPING,
+               'sub_total': CartPageLocator.SUB_TOTAL,
+               'total_price': CartPageLocator.TOTAL_PRICE}
+
+    FIRST_ROW = {'qty': CartPageLocator.FIRST_ROW_QTY,
+                 'total': CartPageLocator.FIRST_ROW_TOTAL}
+
     def check_cart_correctness(self, shipping_price, cart_items):
         '''Check the cart items for correctness in the cart page.'''
+        return self.summary_matches(self.snapshot(self.SUMMARY, attributes=()), shipping_price, cart_items)
+
+    @staticmethod
+    def summary_matches(summary, shipping_price, cart_items):
+        '''Does a snapshot of SUMMARY add up to the cart items and shipping?'''
         total_product = float('{0:.2f}'.format(sum([i['price']*i['number_of_items'] for i in cart_items])))
         grand_total = total_product + shipping_price
-        return(total_product == float(self.driver.find_element(*CartPageLocator.TOTAL_PROD).text.replace('$', '')) and
-               shipping_price == float(self.driver.find_element(*CartPageLocator.TOTAL_SHIPPING).text.replace('$', '')) and
-               grand_total == float(self.driver.find_element(*CartPageLocator.SUB_TOTAL).text.replace('$', '')) and
-               grand_total == float(self.driver.find_element(*CartPageLocator.TOTAL_PRICE).text.replace('$', '')))
+        return(total_product == summary.price('total_product') and
+               shipping_price == summary.price('total_shipping') and
+               grand_total == summary.price('sub_total') and
+               grand_total == summary.price('total_price'))
+
+    def _change_first_row_qty(self, *locator, action):
+        '''Click a first row quantity button and return as soon as the AJAX
+        update has landed in the quantity input.'''
+        old_qty = self.find(*CartPageLocator.FIRST_ROW_QTY).get_attribute('value')
+        self.track_ajax()
+        self.hover(*locator)
+        with metrics.ajax(self, action):
+            self.click(*locator)
+            self.wait_for_change(*CartPageLocator.FIRST_ROW_QTY, old_value=old_qty, attribute='value')
+            # The row total and summary are updated by the same request.
+            self.wait_for_ajax()
+        row = self.snapshot(self.FIRST_ROW)
+        assert(row['qty'].found and row['total'].found)
+        return (row.number('qty', 'value'), row.price('total'))
 
     def add_product_item(self):
         '''Adds a product from the first line of the cart. QTY should be 2.
         returns (tuple): (<item qty>, <total item price>)'''
-        self.hover(*CartPageLocator.FIRST_ROW_ADD)
-        self.click(*CartPageLocator.FIRST_ROW_ADD)
-        # Wait a bit for the qty to register.
-        time.sleep(2)
-        assert(self.visible(*CartPageLocator.FIRST_ROW_QTY))
-        assert(self.visible(*CartPageLocator.FIRST_ROW_TOTAL))
-        return (int(self.driver.find_element(*CartPageLocator.FIRST_ROW_QTY).get_attribute('value')),
-                float(self.driver.find_element(*CartPageLocator.FIRST_ROW_TOTAL).text.replace('$', '')))
+        return self._change_first_row_qty(*CartPageLocator.FIRST_ROW_ADD, action='add_qty')
 
     def delete_product_item(self):
         '''Subtracts a product from the first line in the cart. QTY should be 1.
         returns (tuple): (<item qty>, <total item price>)'''
-        self.hover(*CartPageLocator.FIRST_ROW_SUBTRACT)
-        self.click(*CartPageLocator.FIRST_ROW_SUBTRACT)
-        # Wait a bit for the qty to register.
-        time.sleep(2)
-        assert(self.visible(*CartPageLocator.FIRST_ROW_QTY))
-        assert(self.visible(*CartPageLocator.FIRST_ROW_TOTAL))
-        return (int(self.driver.find_element(*CartPageLocator.FIRST_ROW_QTY).get_attribute('value')),
-                float(self.driver.find_element(*CartPageLocator.FIRST_ROW_TOTAL).text.replace('$', '')))
+        return self._change_first_row_qty(*CartPageLocator.FIRST_ROW_SUBTRACT, action='subtract_qty')
 
     def remove_product_item(self):
         '''Removes to the first line product item.'''
+        self.track_ajax()
         self.hover(*CartPageLocator.FIRST_ROW_REMOVE)
-        self.click(*CartPageLocator.FIRST_ROW_REMOVE)
-        time.sleep(2)
+        with metrics.ajax(self, 'remove_row'):
+            self.click(*CartPageLocator.FIRST_ROW_REMOVE)
+            self.wait_for_ajax()
+        # The row fades out before it is dropped from the table.
+        self.policy.wait(self.driver, EC.invisibility_of_element_located(CartPageLocator.FIRST_ROW_REMOVE),
+                         message='Removed cart row still shown')
 
     def checkout(self):
         '''Click on the checkout button.'''
         self.hover(*CartPageLocator.TO_CHECKOUT)
-        self.click(*CartPageLocator.TO_CHECKOUT)
+        self.click(*CartPageLocator.TO_CHECKOUT, navigates=True)
 
     def is_address_page(self):
         '''Are we in the address page whcih shows authentication worked with cart items.'''
@@ -0,0 +1,223 @@
+'''Locator registry: fast equivalents and robustness of the pom.locators.
+
+Most locators are absolute XPaths under an id anchor, like
+`//*[@id="header"]/div[3]/div/a/span[1]`. Those translate one to one to CSS,
+`[@id="x"]` to `#x` and a positional step `div[3]` to `div:nth-of-type(3)`,
+which browsers resolve faster than XPath; a bare `//*[@id="x"]` becomes an ID
+lookup. Page objects resolve through resolve(), which checks a translation
+finds the same element as its XPath the first time both are on the page and
+falls back to the XPath for good when they don't.
+
+The registry also scores how fragile every locator is and, validated against
+live pages, how long each strategy takes to resolve. See locator_report.py.'''
+import re
+from collections import namedtuple
+
+from selenium.webdriver.common.by import By
+
+from pom import locators
+from pom.snapshot import RESOLVE_JS
+
+# One location step of the XPaths we can translate: a tag with an optional
+# position, or any element with an id predicate.
+ID_STEP_RE = re.compile(r'^\*\[@id=(?P<q>["\'])(?P<id>[^"\']+)(?P=q)\]$')
+TAG_STEP_RE = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*)(?:\[(?P<index>\d+)\])?$')
+CSS_IDENT_RE = re.compile(r'^-?[_a-zA-Z][\w-]*$')
+
+# Resolves every locator and its fast equivalent, checks both find the same
+# element and times `repeat` resolutions of each inside the page.
+# arguments: [[name, by, value, fast by, fast value], ...], repeat
+BENCHMARK_JS = RESOLVE_JS + '''
+var fields = arguments[0], repeat = arguments[1], result = {};
+function time(by, value) {
+    var start = performance.now();
+    for (var i = 0; i < repeat; i++) { pomResolve(by, value); }
+    return (performance.now() - start) / repeat;
+}
+for (var i = 0; i < fields.length; i++) {
+    var f = fields[i], element = pomResolve(f[1], f[2]);
+    var fast = f[3] ? pomResolve(f[3], f[4]) : null;
+    result[f[0]] = {'found': !!element,
+                    'same': f[3] ? element === fast : null,
+                    'ms': element ? time(f[1], f[2]) : null,
+                    'fast_ms': element && f[3] ? time(f[3], f[4]) : null};
+}
+return result;
+'''
+
+# Does the fast equivalent find the element of the original locator? null when
+# the original finds nothing on this page, so there is nothing to compare.
+# arguments: by, value, fast by, fast value
+VERIFY_JS = RESOLVE_JS + '''
+var element = pomResolve(arguments[0], arguments[1]);
+if (!element) { return null; }
+return element === pomResolve(arguments[2], arguments[3]);
+'''
+
+Entry = namedtuple('Entry', ['name', 'locator', 'translated', 'fragility', 'reasons'])
+
+
+def _css_id(value):
+    return '#' + value if CSS_IDENT_RE.match(value) else '[id="{}"]'.format(value)
+
+
+def translate(locator):
+    '''Equivalent ID or CSS locator of an XPath locator, None when the XPath
+    uses anything besides an id anchor and child steps.'''
+    (by, value) = locator
+    if by != By.XPATH:
+        return None
+    if value.startswith('//'):
+        steps = value[2:].split('/')
+        anchor = ID_STEP_RE.match(steps[0])
+        if not anchor:
+            return None
+        if len(steps) == 1:
+            return (By.ID, anchor.group('id'))
+        parts = [_css_id(anchor.group('id'))]
+    elif value.startswith('/html/'):
+        steps = value[1:].split('/')
+        parts = [':root']
+    else:
+        return None
+    for step in steps[1:]:
+        match = TAG_STEP_RE.match(step)
+        if not match:
+            return None
+        parts.append(match.group('tag') + (':nth-of-type({})'.format(match.group('index'))
+                                           if match.group('index') else ''))
+    return (By.CSS_SELECTOR, ' > '.join(parts))
+
+
+def fragility(locator):
+    '''How likely a layout change breaks the locator, and why.
+
+    Returns (tuple): (score, reasons). 0 is an id or name lookup; every step
+    below the anchor adds 1, every positional index 2 more.'''
+    (by, value) = locator
+    if by in (By.ID, By.NAME):
+        return (0, [])
+    if by != By.XPATH:
+        return (1, [])
+    reasons = []
+    steps = [step for step in value.split('/') if step]
+    if value.startswith('/') and not value.startswith('//'):
+        reasons.append('absolute from the document root')
+    elif ID_STEP_RE.match(steps[0]):
+        steps = steps[1:]
+    positions = sum(1 for step in steps if re.search(r'\[\d+\]$', step))
+    if steps:
+        reasons.append('{} step(s) below the anchor'.format(len(steps)))
+    if positions:
+        reasons.append('{} positional index(es)'.format(positions))
+    return (len(steps) + 2 * positions, reasons)
+
+
+def locator_classes(module=locators):
+    '''(class name, class) of every *Locator(s) class of module.'''
+    return [(name, cls) for name, cls in sorted(vars(module).items())
+            if isinstance(cls, type) and name.endswith(('Locator', 'Locators'))]
+
+
+class LocatorRegistry(object):
+    '''Every locator of the locator classes with its fast equivalent.
+
+    Args:
+        classes (list): (class name, class) pairs, all of pom.locators by default.'''
+
+    def __init__(self, classes=None):
+        self.entries = {}
+        # locator -> benchmark results merged over every validated page
+        self.results = {}
+        # Locators whose translation found another element somewhere.
+        self.rejected = set()
+        # Locators whose translation found the same element on a live page.
+        self.verified = set()
+        self._fast = {}
+        for cls_name, cls in classes if classes is not None else locator_classes():
+            for attr, value in sorted(vars(cls).items()):
+                if attr.isupper() and isinstance(value, tuple):
+                    name = '{}.{}'.format(cls_name, attr)
+                    (score, reasons) = fragility(value)
+                    self.entries.setdefault(name, Entry(name, value, translate(value), score, reasons))
+
+    def fast(self, locator):
+        '''The fastest known equivalent of locator, locator itself if none.'''
+        locator = tuple(locator)
+        fast = self._fast.get(locator)
+        if fast is None:
+            fast = None if locator in self.rejected else translate(locator)
+            fast = self._fast[locator] = fast or locator
+        return fast
+
+    def resolve(self, driver, locator):
+        '''The locator to look locator up with on the page driver is on: its
+        translation once it has been seen to find the same element, the
+        original until then. Costs one script call per locator and process.'''
+        locator = tuple(locator)
+        fast = self.fast(locator)
+        if fast == locator or locator in self.verified:
+            return fast
+        same = driver.execute_script(VERIFY_JS, locator[0], locator[1], fast[0], fast[1])
+        if same:
+            self.verified.add(locator)
+            return fast
+        if same is False:
+            self.rejected.add(locator)
+            self._fast.pop(locator, None)
+        return locator
+
+    def validate(self, driver, repeat=200):
+        '''Check and time every locator on the page driver is on.
+
+        A translation that resolves to another element than its XPath is
+        rejected for good, fast() hands out the XPath from then on.
+
+        Returns (dict): name -> {'found', 'same', 'ms', 'fast_ms'} for this page.'''
+        fields = [[name, e.locator[0], e.locator[1]] + list(e.translated or (None, None))
+                  for name, e in self.entries.items()]
+        page = driver.execute_script(BENCHMARK_JS, fields, repeat)
+        for name, result in page.items():
+            entry = self.entries[name]
+            if not result['found']:
+                continue
+            merged = self.results.setdefault(entry.locator, {'pages': 0, 'same': True, 'ms': 0.0,
+                                                             'fast_ms': None})
+            merged['pages'] += 1
+            merged['ms'] = max(merged['ms'], result['ms'])
+            if result['fast_ms'] is not None:
+                merged['fast_ms'] = max(merged['fast_ms'] or 0.0, result['fast_ms'])
+            if result['same']:
+                self.verified.add(entry.locator)
+            elif result['same'] is False:
+                merged['same'] = False
+                self.verified.discard(entry.locator)
+                self.rejected.add(entry.locator)
+                self._fast.pop(entry.locator, None)
+        return page
+
+    def report(self, slow_ms=0.05, fragile=4):
+        '''Locators worth rewriting: slow to resolve, fragile, never found on
+        a validated page or with a translation that is not equivalent.
+
+        Returns (list): dicts sorted from the most to the least fragile.'''
+        rows = []
+        for name, entry in sorted(self.entries.items()):
+            result = self.results.get(entry.locator)
+            problems = list(entry.reasons) if entry.fragility >= fragile else []
+            if result is None:
+                problems.append('not found on any validated page')
+            else:
+                if result['ms'] > slow_ms:
+                    problems.append('resolves in {:.3f}ms'.format(result['ms']))
+                if not result['same']:
+                    problems.append('translation finds another element')
+            if problems:
+                rows.append({'name': name, 'locator': list(entry.locator), 'fragility': entry.fragility,
+                             'fast': list(self.fast(entry.locator)), 'problems': problems,
+                             'ms': result and result['ms'], 'fast_ms': result and result['fast_ms']})
+        return sorted(rows, key=lambda row: -row['fragility'])
+
+
+# The registry page objects resolve through.
+REGISTRY = LocatorRegistry()
@@ -0,0 +1,192 @@
+'''Memory footprint of long-lived browsers: process RSS and JS heap per test.
+
+A pooled browser serves test after test and accumulates DOM, JS heap and
+cache on the way. ResourceMonitor samples the chromedriver process, the Chrome
+processes it started and `performance.memory` after every test, reports the
+growth each test caused and tells the DriverPool when a browser is over its
+memory or age budget and should be relaunched.'''
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import psutil
+except ImportError:  # Optional, /proc is read instead.
+    psutil = None
+
+# Heap of the current page in bytes, null outside Chrome.
+JS_HEAP_JS = '''
+var memory = window.performance && window.performance.memory;
+return memory ? [memory.usedJSHeapSize, memory.totalJSHeapSize] : null;
+'''
+
+MB = 1024.0 * 1024.0
+
+Sample = namedtuple('Sample', ['test', 'driver', 'driver_rss', 'browser_rss', 'browser_processes',
+                               'js_heap_used', 'js_heap_total', 'age', 'tests'])
+
+
+def _proc_children():
+    '''pid -> child pids of every process, read from /proc.'''
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(entry), 'r') as stat:
+                # The command name may hold spaces, the ppid follows its ')'.
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except (IOError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open('/proc/{}/status'.format(pid), 'r') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        pass
+    return 0
+
+
+def process_tree(pid):
+    '''pid followed by every process it started, children first generation first.'''
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    children = _proc_children()
+    tree, index = [pid], 0
+    while index < len(tree):
+        tree.extend(children.get(tree[index], []))
+        index += 1
+    return tree
+
+
+def rss(pid):
+    '''Resident set size of a process in bytes, 0 once it is gone.'''
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    return _proc_rss(pid)
+
+
+def driver_pid(driver):
+    '''pid of the chromedriver serving driver, None for remote drivers.'''
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    return process.pid if process else None
+
+
+class ResourceMonitor(object):
+    '''Samples the memory of pooled drivers after every test.
+
+    Process RSS sums count pages shared between Chrome's processes once per
+    process, so compare them with each other rather than with system totals.
+
+    Args:
+        max_rss_mb (float): Relaunch a browser once chromedriver and Chrome
+            together hold more than this many MB.
+        max_age (float): Relaunch a browser after this many seconds.
+        max_tests (int): Relaunch a browser after this many tests.'''
+
+    def __init__(self, max_rss_mb=None, max_age=None, max_tests=None):
+        self.max_rss_mb = max_rss_mb
+        self.max_age = max_age
+        self.max_tests = max_tests
+        self.samples = []
+        self.recycled = []
+        # driver.session_id -> (launch time, tests run). Unlike id(driver), a
+        # session id is never handed to a later driver.
+        self._drivers = {}
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def register(self, driver):
+        '''Start the age and test count of a newly launched driver.'''
+        with self._lock:
+            self._drivers[driver.session_id] = (time.monotonic(), 0)
+
+    def sample(self, driver, test):
+        '''Sample driver after test ran in it.'''
+        pid = driver_pid(driver)
+        tree = process_tree(pid) if pid else []
+        driver_rss = rss(pid) if pid else 0
+        browser_rss = sum(rss(child) for child in tree[1:])
+        try:
+            heap = driver.execute_script(JS_HEAP_JS) or [None, None]
+        except Exception:
+            heap = [None, None]
+        with self._lock:
+            (launched, tests) = self._drivers.get(driver.session_id, (time.monotonic(), 0))
+            self._drivers[driver.session_id] = (launched, tests + 1)
+            sample = Sample(test, driver.session_id, driver_rss, browser_rss, len(tree) - 1, heap[0],
+                            heap[1], time.monotonic() - launched, tests + 1)
+            self.samples.append(sample)
+            self._last[driver.session_id] = sample
+        return sample
+
+    def over_budget(self, driver):
+        '''Why driver should be relaunched, None while it is within budget.'''
+        sample = self._last.get(driver.session_id)
+        if sample is None:
+            return None
+        total_mb = (sample.driver_rss + sample.browser_rss) / MB
+        if self.max_rss_mb is not None and total_mb > self.max_rss_mb:
+            return 'rss {:.0f}MB > {:.0f}MB'.format(total_mb, self.max_rss_mb)
+        if self.max_age is not None and sample.age > self.max_age:
+            return 'age {:.0f}s > {:.0f}s'.format(sample.age, self.max_age)
+        if self.max_tests is not None and sample.tests >= self.max_tests:
+            return '{} tests'.format(sample.tests)
+        return None
+
+    def retire(self, driver):
+        '''DriverPool hook: True when the released driver must be relaunched.'''
+        reason = self.over_budget(driver)
+        if reason:
+            with self._lock:
+                self.recycled.append({'test': self._last[driver.session_id].test, 'reason': reason})
+                self._drivers.pop(driver.session_id, None)
+                self._last.pop(driver.session_id, None)
+        return bool(reason)
+
+    def growth(self):
+        '''Per test memory growth of the driver it ran in, in MB.'''
+        rows, previous = [], {}
+        for sample in self.samples:
+            before = previous.get(sample.driver)
+            total = (sample.driver_rss + sample.browser_rss) / MB
+            heap = sample.js_heap_used / MB if sample.js_heap_used is not None else None
+            rows.append({'test': sample.test,
+                         'rss_mb': total,
+                         'rss_growth_mb': total - before[0] if before else None,
+                         'js_heap_mb': heap,
+                         'js_heap_growth_mb': heap - before[1] if before and None not in (heap, before[1]) else None,
+                         'browser_processes': sample.browser_processes,
+                         'driver_tests': sample.tests,
+                         'driver_age_s': sample.age})
+            previous[sample.driver] = (total, heap)
+        return rows
+
+    def summary(self):
+        rows = self.growth()
+        grown = sorted((r for r in rows if r['rss_growth_mb'] is not None), key=lambda r: -r['rss_growth_mb'])
+        return {'samples': len(rows),
+                'peak_rss_mb': max([r['rss_mb'] for r in rows] or [0]),
+                'recycled': len(self.recycled),
+                'largest_growth': [{'test': r['test'], 'rss_growth_mb': r['rss_growth_mb']} for r in grown[:10]]}
+
+    def write(self, path):
+        '''Write the summary, every recycle and the growth of every test as JSON.'''
+        with open(path, 'w') as report:
+            json.dump({'summary': self.summary(), 'recycled': self.recycled, 'tests': self.growth()},
+                      report, indent=2)
@@ -0,0 +1,128 @@
+'''Skip read-only checks whose page and page-object code haven't changed.
+
+A check decorated with cached_check() fingerprints the DOM subtrees it reads
+in one script call. When a ResultCache is active and holds a passing result
+for the same fingerprint, check arguments and page-object source (pages.py and
+locators.py) younger than its TTL, that result is returned without running
+the check. Nothing is cached until a ResultCache is activated.'''
+import functools
+import hashlib
+import json
+import os
+import time
+
+from pom.snapshot import RESOLVE_JS
+
+# The page-object code a cached result depends on.
+SOURCES = ('pages.py', 'locators.py')
+
+# FNV-1a hash of the URL's path and query and the markup of every subtree,
+# with its length. The host is left out, the local storefront's port changes
+# every run. null when a subtree isn't there (yet), the check then runs uncached.
+# arguments: [[by, value], ...]
+FINGERPRINT_JS = RESOLVE_JS + '''
+var locators = arguments[0], text = window.location.pathname + window.location.search;
+for (var i = 0; i < locators.length; i++) {
+    var element = pomResolve(locators[i][0], locators[i][1]);
+    if (!element) { return null; }
+    text += '\\u0000' + element.outerHTML;
+}
+var hash = 0x811c9dc5;
+for (var j = 0; j < text.length; j++) {
+    hash = Math.imul(hash ^ text.charCodeAt(j), 0x01000193) >>> 0;
+}
+return text.length + ':' + hash.toString(16);
+'''
+
+# The cache checks consult, None when caching is off.
+_active = None
+
+
+def activate(cache):
+    '''Start consulting cache (None turns caching off).'''
+    global _active
+    _active = cache
+
+
+def active():
+    return _active
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash():
+    '''Hash of the page-object code, read once per process.'''
+    digest = hashlib.sha1()
+    for name in SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    '''Passing check results, one JSON file per key so pytest-xdist workers
+    share them without locking.
+
+    Args:
+        directory (str): Where results are kept.
+        ttl (float): Seconds a result is reused.
+        refresh (bool): Run every check and store its result anyway.'''
+
+    def __init__(self, directory, ttl=60 * 60, refresh=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, check, args, kwargs, fingerprint):
+        data = json.dumps([check, args, sorted(kwargs.items()), fingerprint, source_hash()], default=repr)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def lookup(self, key):
+        '''The cached entry of key, None when there is no fresh one.'''
+        if self.refresh:
+            return None
+        try:
+            with open(self._path(key), 'r') as cached:
+                entry = json.load(cached)
+        except (IOError, ValueError):
+            return None
+        return entry if time.time() - entry['time'] < self.ttl else None
+
+    def store(self, key, check, result):
+        os.makedirs(self.directory, exist_ok=True)
+        temp = '{}.{}.tmp'.format(self._path(key), os.getpid())
+        with open(temp, 'w') as cached:
+            json.dump({'check': check, 'result': result, 'time': time.time()}, cached)
+        os.replace(temp, self._path(key))
+
+
+def cached_check(*locators):
+    '''Decorate a read-only page-object check whose result only depends on
+    the markup of locators and its arguments, and returns True when it passes.
+    Only passing results are cached.'''
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = _active
+            if cache is None:
+                return method(self, *args, **kwargs)
+            fingerprint = self.driver.execute_script(FINGERPRINT_JS, [list(locator) for locator in locators])
+            if fingerprint is None:
+                return method(self, *args, **kwargs)
+            check = '{}.{}'.format(type(self).__name__, method.__name__)
+            key = cache.key(check, args, kwargs, fingerprint)
+            entry = cache.lookup(key)
+            if entry is not None:
+                cache.hits += 1
+                return entry['result']
+            cache.misses += 1
+            result = method(self, *args, **kwargs)
+            if result is True:
+                cache.store(key, check, result)
+            return result
+        return wrapper
+    return decorate
@@ -0,0 +1,115 @@
+from urllib.parse import urlencode
+
+from pom.pages import HomePage, SearchResultsPage, SignInPage
+
+# Shipping cost is static at $2.00
+SHIPPING_COST = 2.0
+
+# The store's test account.
+USERNAME = 'something@something.com'
+PASSWORD = 'something'
+
+# Adds products to the cart through the store's own AJAX cart controller, one
+# after the other, so the whole cart is filled in a single driver round-trip.
+# Stops at the first add the store rejects (an HTTP error or hasError), the
+# number of products added tells how far it got.
+ADD_TO_CART_JS = '''
+var ids = arguments[0], done = arguments[arguments.length - 1];
+var url = (window.baseUri || window.location.pathname) + '?rand=' + new Date().getTime();
+var added = 0;
+function next() {
+    if (added >= ids.length) { return done(added); }
+    var xhr = new XMLHttpRequest();
+    xhr.open('POST', url, true);
+    xhr.setRequestHeader('Content-Type', 'application/x-www-form-urlencoded');
+    xhr.onload = function () {
+        var cart = null;
+        try { cart = JSON.parse(xhr.responseText); } catch (e) {}
+        if (xhr.status !== 200 || !cart || cart.hasError) { return done(added); }
+        added++;
+        next();
+    };
+    xhr.onerror = function () { done(added); };
+    xhr.send('controller=cart&add=1&ajax=true&qty=1&id_product=' + ids[added] +
+             '&token=' + (window.static_token || ''));
+}
+next();
+'''
+
+# Posts the authentication form directly. Cookies set by the response are kept
+# by the browser, the final URL tells us whether the login went through.
+LOGIN_JS = '''
+var body = arguments[0], done = arguments[arguments.length - 1];
+var xhr = new XMLHttpRequest();
+xhr.open('POST', arguments[1], true);
+xhr.setRequestHeader('Content-Type', 'application/x-www-form-urlencoded');
+xhr.onload = function () { done(xhr.responseURL || ''); };
+xhr.onerror = function () { done(''); };
+xhr.send(body);
+'''
+
+
+def cart_items(products):
+    '''Cart item dicts ({'name', 'price', 'number_of_items', 'id_product'}) of
+    products added once each, in the shape the tests track the cart with.'''
+    return [{'name': p.name, 'price': p.price, 'number_of_items': 1,
+             'id_product': p.id_product} for p in products]
+
+
+class Scenario(object):
+    '''Seeds browser state directly so every test can start from the state it
+    needs instead of relying on the tests that ran before it.
+
+    Args:
+        driver (obj): Webdriver object.
+        home_url (str): URL of the store's index.php.'''
+
+    def __init__(self, driver, home_url):
+        self.driver = driver
+        self.home_url = home_url
+
+    def url(self, **params):
+        '''Build a store URL from controller parameters.'''
+        return '{}?{}'.format(self.home_url, urlencode(params)) if params else self.home_url
+
+    def home(self):
+        '''Go to the home page, returns its HomePage.'''
+        homepage = HomePage(self.driver)
+        homepage.get(self.home_url)
+        return homepage
+
+    def cart(self, count=None):
+        '''Fill the cart with the home page products through the AJAX cart controller.
+
+        Args:
+            count (int): Number of products to add, all of them by default.
+
+        Returns: list of cart item dicts ({'name', 'price', 'number_of_items'}) in
+            the same shape the tests track the cart with.'''
+        homepage = self.home()
+        products = homepage.catalog()[:count]
+        added = self.driver.execute_async_script(ADD_TO_CART_JS, [p.id_product for p in products])
+        assert(added == len(products))
+
+        # Reload so the header cart block shows the seeded items.
+        homepage.refresh()
+        return cart_items(products)
+
+    def login(self, username, password):
+        '''Sign in by posting the authentication form directly.
+
+        Returns: bool, True if the store sent us to "my account".'''
+        self.home()
+        body = urlencode({'email': username, 'passwd': password,
+                          'back': 'my-account', 'SubmitLogin': ''})
+        final_url = self.driver.execute_async_script(
+            LOGIN_JS, body, self.url(controller='authentication'))
+        return 'my-account' in final_url
+
+    def sign_in_page(self):
+        '''Go straight to the authentication page.'''
+        SignInPage(self.driver).get(self.url(controller='authentication'))
+
+    def search(self, text):
+        '''Go straight to the search results for a search term.'''
+        SearchResultsPage(self.driver).get(self.url(controller='search', search_query=text, submit_search=''))
@@ -0,0 +1,118 @@
+'''Log in once, then replay the session cookies into every driver that needs a
+signed in user.'''
+import hashlib
+import json
+import os
+import threading
+import time
+
+from pom.locators import SignInOutLocator
+
+# Cookie keys add_cookie() accepts.
+COOKIE_KEYS = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry')
+
+
+def clean_cookie(cookie):
+    return {key: cookie[key] for key in COOKIE_KEYS if key in cookie}
+
+
+def cookies_expired(cookies, now=None):
+    '''True when any cookie carries an expiry that has passed.'''
+    now = time.time() if now is None else now
+    return any('expiry' in cookie and cookie['expiry'] <= now for cookie in cookies)
+
+
+def is_signed_in(driver):
+    '''Does the page header offer to sign out? One lookup, no waiting.'''
+    return bool(driver.find_elements(*SignInOutLocator.LOGOUT_BTN))
+
+
+class SessionCache(object):
+    '''Caches the cookies of a signed in session.
+
+    The first driver that asks for a signed in state pays for the login; its
+    cookies are kept (and written to `directory` when given, so other pytest-
+    xdist workers and later runs can reuse them) for `ttl` seconds. Expired or
+    rejected sessions are logged in again on demand.
+
+    Args:
+        login (callable): login(driver) signs the driver in, returns bool.
+        key (str): Identifies the account and store, e.g. "user@store-url".
+        ttl (float): Seconds a cached session is reused.
+        directory (str): Optional directory to persist sessions in.'''
+
+    def __init__(self, login, key, ttl=15 * 60, directory=None):
+        self.login = login
+        self.ttl = ttl
+        self.path = None
+        if directory:
+            name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+            self.path = os.path.join(directory, name)
+        self._cookies = None
+        self._created = 0.0
+        self._lock = threading.Lock()
+        self.logins = 0
+
+    def _fresh(self, cookies, created):
+        return (cookies is not None and time.time() - created < self.ttl
+                and not cookies_expired(cookies))
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as cache:
+                    data = json.load(cache)
+                return (data['cookies'], data['created'])
+            except (IOError, ValueError, KeyError):
+                pass
+        return (None, 0.0)
+
+    def _store(self, cookies, created):
+        self._cookies, self._created = cookies, created
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(temp, 'w') as cache:
+                json.dump({'cookies': cookies, 'created': created}, cache)
+            os.replace(temp, self.path)
+
+    def invalidate(self):
+        '''Forget the cached session so the next request logs in again.'''
+        with self._lock:
+            self._cookies, self._created = None, 0.0
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def cookies(self, driver):
+        '''Cookies of a signed in session, logging in with driver if there is
+        no fresh one cached.'''
+        with self._lock:
+            if self._fresh(self._cookies, self._created):
+                return self._cookies
+            cookies, created = self._load()
+            if self._fresh(cookies, created):
+                self._cookies, self._created = cookies, created
+                return cookies
+
+            driver.delete_all_cookies()
+            assert(self.login(driver))
+            self.logins += 1
+            cookies = [clean_cookie(c) for c in driver.get_cookies()]
+            self._store(cookies, time.time())
+            return cookies
+
+    def sign_in(self, driver):
+        '''Put driver in a signed in state by injecting the cached cookies.
+
+        The driver must be on a page of the store. If the store no longer
+        accepts the cached session, log in again once.'''
+        for attempt in range(2):
+            cookies = self.cookies(driver)
+            driver.delete_all_cookies()
+            for cookie in cookies:
+                driver.add_cookie(cookie)
+            driver.refresh()
+            if is_signed_in(driver):
+                return True
+            self.invalidate()
+        return False
@@ -0,0 +1,94 @@
+'''Read many locators in a single WebDriver round-trip.'''
+from collections import namedtuple
+
+# Resolves a (By, value) locator inside the browser, optionally under a root
+# element. Shared by every script that takes locators as arguments.
+RESOLVE_JS = '''
+function pomResolve(by, value, root) {
+    root = root || document;
+    switch (by) {
+    case 'id':
+        return root === document ? document.getElementById(value)
+                                 : root.querySelector('[id="' + value + '"]');
+    case 'xpath':
+        return document.evaluate(value, root, null,
+                                 XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    case 'class name':
+        return root.getElementsByClassName(value)[0] || null;
+    case 'css selector':
+        return root.querySelector(value);
+    case 'name':
+        return root.querySelector('[name="' + value + '"]');
+    case 'tag name':
+        return root.getElementsByTagName(value)[0] || null;
+    case 'link text':
+    case 'partial link text':
+        var links = root.getElementsByTagName('a');
+        for (var i = 0; i < links.length; i++) {
+            var text = links[i].innerText.trim();
+            if (by === 'link text' ? text === value : text.indexOf(value) !== -1) {
+                return links[i];
+            }
+        }
+        return null;
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+}
+'''
+
+# arguments: [[name, by, value], ...], attribute names, root element or locator.
+SNAPSHOT_JS = RESOLVE_JS + '''
+var fields = arguments[0], attributes = arguments[1], root = arguments[2];
+if (Array.isArray(root)) { root = pomResolve(root[0], root[1]); }
+var result = {};
+for (var i = 0; i < fields.length; i++) {
+    var element = pomResolve(fields[i][1], fields[i][2], root);
+    var attrs = {};
+    if (element) {
+        for (var j = 0; j < attributes.length; j++) {
+            attrs[attributes[j]] = attributes[j] === 'value' && 'value' in element
+                ? element.value : element.getAttribute(attributes[j]);
+        }
+    }
+    result[fields[i][0]] = {'found': !!element,
+                            'text': element ? element.innerText.trim() : null,
+                            'attrs': attrs};
+}
+return result;
+'''
+
+Field = namedtuple('Field', ['found', 'text', 'attrs'])
+
+
+def parse_price(text):
+    '''Turn a "$16.51" style price into a float.'''
+    return float(text.strip().split()[0].replace('$', ''))
+
+
+def locator_args(locators):
+    '''Flatten a {name: (By, value)} dict into script arguments.'''
+    return [[name, by, value] for name, (by, value) in locators.items()]
+
+
+class Snapshot(dict):
+    '''Field name -> Field read in one go by BasePage.snapshot().'''
+
+    @classmethod
+    def from_script(cls, result):
+        return cls((name, Field(**field)) for name, field in result.items())
+
+    def text(self, name):
+        '''Visible text of a field.'''
+        return self[name].text
+
+    def attr(self, name, attribute):
+        '''An attribute (or the live value for "value") of a field.'''
+        return self[name].attrs.get(attribute)
+
+    def number(self, name, attribute=None):
+        '''A field's text, or attribute when given, as an int.'''
+        return int(self.attr(name, attribute) if attribute else self.text(name))
+
+    def price(self, name):
+        '''A field's "$16.51" style text as a float.'''
+        return parse_price(self.text(name))
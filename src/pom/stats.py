@@ -0,0 +1,28 @@
+'''Small statistics helpers shared by the benchmark, load and metrics reports.'''
+
+
+def percentile(values, pct):
+    '''Percentile of values with linear interpolation between closest ranks.
+
+    Args:
+        values (list): Numbers, in any order.
+        pct (float): 0 to 100.'''
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values):
+    '''count, mean, p50, p95, p99 and max of values.'''
+    if not values:
+        return {'count': 0}
+    return {'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': max(values)}
@@ -0,0 +1,177 @@
+'''Timing instrumentation for page-object actions and WebDriver commands.
+
+Nothing is recorded until a Timeline is activated. Every span is tagged with
+the page class, the locator's name from pom.locators and the running test, and
+a Timeline can be written as a per-test JSON summary and as a Chrome trace
+(load it in chrome://tracing or https://ui.perfetto.dev).'''
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from pom import locators
+
+Span = namedtuple('Span', ['name', 'category', 'page', 'locator', 'test', 'start', 'duration', 'thread'])
+
+# The timeline spans are currently recorded to, None when timing is off.
+_active = None
+
+
+def activate(timeline):
+    '''Start recording spans to timeline (None stops recording).'''
+    global _active
+    _active = timeline
+
+
+def active():
+    return _active
+
+
+def _locator_names():
+    names = {}
+    for cls_name in dir(locators):
+        cls = getattr(locators, cls_name)
+        if isinstance(cls, type) and cls_name.endswith(('Locator', 'Locators')):
+            for attr, value in vars(cls).items():
+                if attr.isupper() and isinstance(value, tuple):
+                    names.setdefault(value, '{}.{}'.format(cls_name, attr))
+    return names
+
+LOCATOR_NAMES = _locator_names()
+
+
+def locator_name(locator):
+    '''"MainPageLocators.CART_ITEMS" for a known (By, value), else the value.'''
+    return LOCATOR_NAMES.get(tuple(locator), locator[1])
+
+
+def current_test():
+    '''Node id of the running pytest test, from PYTEST_CURRENT_TEST.'''
+    test = os.environ.get('PYTEST_CURRENT_TEST', '')
+    return test.rsplit(' ', 1)[0]
+
+
+class Timeline(object):
+    '''Collects spans with monotonic start times and durations.'''
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, category, start, duration, page=None, locator=None):
+        span = Span(name, category, page, locator, current_test(), start - self.origin, duration,
+                    threading.get_ident())
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def for_test(self, test):
+        return [span for span in self.spans if span.test == test]
+
+    def summary(self, test):
+        '''Timing summary of one test: totals per action and per command plus
+        the slowest individual spans.'''
+        spans = self.for_test(test)
+        groups = {}
+        for span in spans:
+            key = (span.category, span.name if span.category == 'command'
+                   else '{}.{}'.format(span.page, span.name))
+            group = groups.setdefault(key, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            group['count'] += 1
+            group['total_ms'] += span.duration * 1000
+            group['max_ms'] = max(group['max_ms'], span.duration * 1000)
+        slowest = sorted((s for s in spans if s.category == 'action'), key=lambda s: -s.duration)[:10]
+        return {'test': test,
+                'commands': sum(g['count'] for (cat, _), g in groups.items() if cat == 'command'),
+                'command_ms': sum(g['total_ms'] for (cat, _), g in groups.items() if cat == 'command'),
+                'actions': {name: g for (cat, name), g in groups.items() if cat == 'action'},
+                'by_command': {name: g for (cat, name), g in groups.items() if cat == 'command'},
+                'slowest': [{'action': '{}.{}'.format(s.page, s.name), 'locator': s.locator,
+                             'ms': s.duration * 1000} for s in slowest]}
+
+    def write_summary(self, test, path):
+        with open(path, 'w') as report:
+            json.dump(self.summary(test), report, indent=2)
+
+    def write_trace(self, path):
+        '''Write every span in the Chrome trace event format.'''
+        pid = os.getpid()
+        events = [{'name': '{}.{}'.format(span.page, span.name) if span.page else span.name,
+                   'cat': span.category, 'ph': 'X', 'pid': pid, 'tid': span.thread,
+                   'ts': span.start * 1e6, 'dur': span.duration * 1e6,
+                   'args': {'test': span.test, 'locator': span.locator}}
+                  for span in self.spans]
+        with open(path, 'w') as trace:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace)
+
+
+def _action_locator(args):
+    return locator_name(args[:2]) if len(args) >= 2 and isinstance(args[0], str) else None
+
+
+def timed(method):
+    '''Decorate a page-object method so every call is recorded as an action.
+    Coroutine methods are timed until they are done, not until they return
+    their coroutine.'''
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            timeline = _active
+            if timeline is None:
+                return await method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                timeline.add(method.__name__, 'action', start, time.perf_counter() - start,
+                             page=type(self).__name__, locator=_action_locator(args))
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timeline = _active
+            if timeline is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                timeline.add(method.__name__, 'action', start, time.perf_counter() - start,
+                             page=type(self).__name__, locator=_action_locator(args))
+    wrapper.timed = True
+    return wrapper
+
+
+class TimedActions(object):
+    '''Base of the page objects of every backend: each public method of a
+    subclass is timed as a page-object action.'''
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if inspect.isfunction(attr) and not name.startswith('_') and not getattr(attr, 'timed', False):
+                setattr(cls, name, timed(attr))
+
+
+def instrument_driver(driver):
+    '''Record every WebDriver command sent through driver.
+
+    All commands, including the ones sent by its WebElements, go through
+    driver.execute(), which is wrapped on this instance only.'''
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        timeline = _active
+        if timeline is None:
+            return execute(driver_command, params)
+        start = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            timeline.add(driver_command, 'command', start, time.perf_counter() - start)
+
+    driver.execute = timed_execute
+    return driver
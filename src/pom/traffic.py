@@ -0,0 +1,92 @@
+'''Per page request counts and transferred bytes, read from Resource Timing.'''
+import json
+from collections import namedtuple
+
+# Transfer sizes of the document and every resource it loaded so far. Blocked
+# requests never start, so they don't show up here at all.
+PAGE_TRAFFIC_JS = '''
+var entries = performance.getEntriesByType('navigation').concat(
+    performance.getEntriesByType('resource'));
+var bytes = 0, decoded = 0, byType = {};
+for (var i = 0; i < entries.length; i++) {
+    var type = entries[i].initiatorType || 'navigation';
+    bytes += entries[i].transferSize || 0;
+    decoded += entries[i].decodedBodySize || 0;
+    byType[type] = (byType[type] || 0) + 1;
+}
+return [window.location.href, entries.length, bytes, decoded, byType];
+'''
+
+PageTraffic = namedtuple('PageTraffic', ['url', 'requests', 'bytes', 'decoded_bytes', 'by_type'])
+
+
+class TrafficRecorder(object):
+    '''Records how much every page a driver loads pulled over the network.
+
+    attach() wraps the driver's get() and refresh() so each navigation is
+    recorded without changes to the tests. With the "eager" and "none" page
+    load strategies get() returns while resources are still loading, so a
+    page is sampled again right before the driver leaves it (the next get(),
+    refresh() or quit()) and that later sample replaces the first.'''
+
+    def __init__(self):
+        self.pages = []
+        # driver -> index in pages of the page it is on
+        self._current = {}
+
+    def record(self, driver):
+        '''Record the traffic of the page the driver is on.'''
+        traffic = PageTraffic(*driver.execute_script(PAGE_TRAFFIC_JS))
+        self.pages.append(traffic)
+        self._current[driver] = len(self.pages) - 1
+        return traffic
+
+    def update(self, driver):
+        '''Sample the page the driver is on again, replacing its first sample
+        if it is still the same page.'''
+        index = self._current.pop(driver, None)
+        if index is None:
+            return
+        try:
+            traffic = PageTraffic(*driver.execute_script(PAGE_TRAFFIC_JS))
+        except Exception:
+            # The browser is gone, keep the first sample.
+            return
+        if traffic.url == self.pages[index].url:
+            self.pages[index] = traffic
+
+    def attach(self, driver):
+        '''Record every page the driver loads through get() and refresh().'''
+        recorder = self
+
+        def recording(navigate):
+            def wrapper(*args, **kwargs):
+                recorder.update(driver)
+                result = navigate(*args, **kwargs)
+                recorder.record(driver)
+                return result
+            return wrapper
+
+        def quitting(quit):
+            def wrapper():
+                recorder.update(driver)
+                return quit()
+            return wrapper
+
+        driver.get = recording(driver.get)
+        driver.refresh = recording(driver.refresh)
+        driver.quit = quitting(driver.quit)
+        return driver
+
+    def summary(self):
+        '''Totals over every recorded page.'''
+        return {'pages': len(self.pages),
+                'requests': sum(p.requests for p in self.pages),
+                'bytes': sum(p.bytes for p in self.pages),
+                'decoded_bytes': sum(p.decoded_bytes for p in self.pages)}
+
+    def write(self, path):
+        '''Write the summary and every page as JSON.'''
+        with open(path, 'w') as report:
+            json.dump({'summary': self.summary(), 'pages': [p._asdict() for p in self.pages]},
+                      report, indent=2)
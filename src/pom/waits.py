@@ -0,0 +1,235 @@
+'''Event driven wait conditions.
+
+The conditions follow the selenium `expected_conditions` protocol: they are
+callables taking the driver and returning a truthy value once they are met, so
+they can be handed to `WebDriverWait.until` like any of the stock conditions.
+
+WaitPolicy holds the timeouts and poll intervals every page object waits with,
+and can learn per locator timeouts from how long elements actually took.'''
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from pom.stats import percentile
+
+# Counts in-flight XMLHttpRequests and fetches so we can tell when the page's
+# AJAX activity is over even without jQuery. Installing twice is a no-op.
+TRACK_AJAX_JS = '''
+if (window.__pomAjax) { return; }
+window.__pomAjax = {pending: 0};
+var send = XMLHttpRequest.prototype.send;
+XMLHttpRequest.prototype.send = function () {
+    window.__pomAjax.pending++;
+    this.addEventListener('loadend', function () { window.__pomAjax.pending--; });
+    return send.apply(this, arguments);
+};
+if (window.fetch) {
+    var fetch = window.fetch;
+    window.fetch = function () {
+        window.__pomAjax.pending++;
+        var done = function (value) { window.__pomAjax.pending--; return value; };
+        return fetch.apply(this, arguments).then(done, function (error) {
+            done(); throw error;
+        });
+    };
+}
+'''
+
+AJAX_IDLE_JS = '''
+return document.readyState === 'complete' &&
+       (!window.jQuery || window.jQuery.active === 0) &&
+       (!window.__pomAjax || window.__pomAjax.pending === 0);
+'''
+
+# Resolves once the DOM under the given root (or the whole document) has not
+# changed for `quiet` milliseconds.
+DOM_SETTLED_JS = '''
+var root = arguments[0] || document.documentElement, quiet = arguments[1];
+var done = arguments[arguments.length - 1];
+var timer = setTimeout(finish, quiet);
+var observer = new MutationObserver(function () {
+    clearTimeout(timer);
+    timer = setTimeout(finish, quiet);
+});
+function finish() { observer.disconnect(); done(true); }
+observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+'''
+
+
+class document_interactive(object):
+    '''An expectation that the document has been parsed (DOMContentLoaded).'''
+
+    def __call__(self, driver):
+        return driver.execute_script('return document.readyState') != 'loading'
+
+
+# The current document and its readyState. performance.timeOrigin is new for
+# every document (navigationStart where there is no timeOrigin).
+DOCUMENT_STATE_JS = 'return [performance.timeOrigin || performance.timing.navigationStart, document.readyState];'
+
+
+class document_replaced(object):
+    '''An expectation that the document whose origin (the first item of
+    DOCUMENT_STATE_JS) was origin has been replaced and the new one parsed.'''
+
+    def __init__(self, origin):
+        self.origin = origin
+
+    def __call__(self, driver):
+        (origin, state) = driver.execute_script(DOCUMENT_STATE_JS)
+        return origin != self.origin and state != 'loading'
+
+
+class ajax_complete(object):
+    '''An expectation that jQuery and tracked XHR/fetch activity has finished
+    and the document has loaded.'''
+
+    def __call__(self, driver):
+        return driver.execute_script(AJAX_IDLE_JS)
+
+
+# WebDriver's script timeout in seconds unless changed. Selenium 3 can't read
+# the current value back, so changes are undone by setting this again.
+SCRIPT_TIMEOUT = 30
+
+
+class dom_settled(object):
+    '''An expectation that the DOM stops changing for a quiet period.
+
+    Args:
+        element (obj): Optional WebElement to observe instead of the document.
+        quiet (float): Seconds without any mutation that counts as settled.'''
+
+    def __init__(self, element=None, quiet=0.2):
+        self.element = element
+        self.quiet = quiet
+
+    def __call__(self, driver):
+        return driver.execute_async_script(DOM_SETTLED_JS, self.element, int(self.quiet * 1000))
+
+
+class value_changes(object):
+    '''An expectation that an element's text (or attribute when given) differs
+    from a previously read value. Returns the new value.
+
+    Args:
+        locator (tuple): (By, value) of the element to watch.
+        old_value (str): The value read before the action that changes it.
+        attribute (str): Attribute to watch, the element text when None.'''
+
+    def __init__(self, locator, old_value, attribute=None):
+        self.locator = locator
+        self.old_value = old_value
+        self.attribute = attribute
+
+    def __call__(self, driver):
+        elements = driver.find_elements(*self.locator)
+        if not elements:
+            return False
+        element = elements[0]
+        value = element.get_attribute(self.attribute) if self.attribute else element.text
+        return value if value != self.old_value else False
+
+
+class WaitPolicy(object):
+    '''Timeouts and poll intervals of every wait, in one place.
+
+    With `adaptive` on, how long a locator took to show up is recorded and,
+    once there are `min_samples`, it is given `multiplier` times its p95
+    instead of the full timeout, so something that is normally there in 200ms
+    fails in seconds rather than after the default.
+
+    Args:
+        timeout (float): Seconds to wait when nothing else is known.
+        poll (float): Seconds between two checks of a condition.
+        absence_grace (float): Seconds an absence check gives an element that
+            is still displayed to go away (e.g. while it fades out).
+        adaptive (bool): Learn per locator timeouts.
+        multiplier (float): Learned timeout is this times the observed p95.
+        min_timeout (float): Learned timeouts are never shorter than this.
+        min_samples (int): Observations needed before a timeout is learned.
+        samples (int): Observations kept per locator.'''
+
+    def __init__(self, timeout=10, poll=0.1, absence_grace=1.0, adaptive=False, multiplier=4.0,
+                 min_timeout=2.0, min_samples=5, samples=50):
+        self.timeout = timeout
+        self.poll = poll
+        self.absence_grace = absence_grace
+        self.adaptive = adaptive
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.samples = samples
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds):
+        '''Record how long the wait for key took.'''
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.samples)).append(seconds)
+
+    def learned(self, key):
+        '''Timeout learned for key, None until there are enough observations.'''
+        latencies = list(self._latencies.get(key, ()))
+        if not self.adaptive or len(latencies) < self.min_samples:
+            return None
+        return min(self.timeout, max(self.min_timeout, percentile(latencies, 95) * self.multiplier))
+
+    def timeout_for(self, key=None, timeout=None):
+        '''An explicit timeout wins, then the learned one, then the default.'''
+        if timeout is not None:
+            return timeout
+        learned = self.learned(key) if key is not None else None
+        return self.timeout if learned is None else learned
+
+    def wait(self, driver, condition, key=None, timeout=None, poll=None, message='', ignored_exceptions=None):
+        '''WebDriverWait(...).until(condition) with this policy's timeout and
+        poll interval. key (e.g. the locator) is what latency is learned for.
+
+        Raises TimeoutException, the driver is left alone.'''
+        timeout = self.timeout_for(key, timeout)
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=poll or self.poll,
+                                   ignored_exceptions=ignored_exceptions).until(condition, message)
+        except TimeoutException as error:
+            raise TimeoutException('{} (waited {:.1f}s)'.format(message or error.msg or 'Timed out', timeout))
+        if key is not None:
+            self.observe(key, time.perf_counter() - start)
+        return result
+
+    def absent(self, driver, locator, grace=None):
+        '''Is the element of locator missing or hidden?
+
+        One find_elements call answers for the common case of an element that
+        isn't there at all. Only a displayed element is given the grace period
+        to disappear.'''
+        elements = driver.find_elements(*locator)
+        try:
+            if not any(element.is_displayed() for element in elements):
+                return True
+        except StaleElementReferenceException:
+            pass
+        try:
+            self.wait(driver, EC.invisibility_of_element_located(locator),
+                      timeout=self.absence_grace if grace is None else grace)
+        except TimeoutException:
+            return False
+        return True
+
+
+# The policy page objects and fields wait with unless given their own.
+_default = WaitPolicy()
+
+
+def set_default_policy(policy):
+    global _default
+    _default = policy
+
+
+def default_policy():
+    return _default
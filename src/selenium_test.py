@@ -1,117 +1,97 @@
 #!/usr/bin/env python
-from selenium import webdriver
+import asyncio
 import pytest
-import time
 from pom.pages import (CartPage, CartModal, HomePage,
-                       SearchResultsPage, SignInPage)
-
-# URLs we are going to uuse
-PRACTICE_WEBPAGE_HOME_URL = 'http://automationpractice.com/index.php'
-PRACTICE_WEBPAGE_CART_CHECKOUT_URL = 'http://automationpractice.com/index.php?controller=order'
+                       SearchResultsPage, SignInPage, load_login_cases)
+from pom.scenarios import PASSWORD, SHIPPING_COST, USERNAME
+from pom.async_pages import AsyncCartPage, AsyncHomePage, AsyncSearchResultsPage
+from pom.cdp import Browser
+from pom.http import StoreClient
 
 # CONSTANTS
-USERNAME = 'something@something.com'
-PASSWORD = 'something'
-
-# We need this data to traverse different tests.
-total_shipping_cost = 2.0 # Shipping cost is static at $2.00
-cart_list = [] # List data object for tracking cart items.
-
-class Driver(object):
-    '''Context manager class for the Selenium webdriver.'''
-    def __init__(self, driver):
-        self.driver = driver
-
-    def __enter__(self):
-        return self.driver
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.driver.quit()
-
-@pytest.fixture(scope='session')
-def browser(driver=webdriver.Chrome(),
-            webpage_url=PRACTICE_WEBPAGE_HOME_URL):
-    '''pytest test fixture for initializing the browser.
-    Scope is "session so we don't close the driver until all test have completed." 
-    
-    Args:
-        driver (obj): Webdriver object.
-        webpage_url (str): THe webpage URL for the webdrive initialization.'''
-
-    # Context manager for closing drivers after the tests complete.
-    with Driver(driver) as driver:
-        driver.get(webpage_url)
-        yield driver
+total_shipping_cost = SHIPPING_COST
 
 def test_page_loads(browser):
     '''Test to make sure the home page loads as expected.'''
     homepage = HomePage(browser)
-    assert(homepage.is_title_correct)
+    assert(homepage.is_title_correct())
 
 def test_cart_is_empty_on_load(browser):
     '''Test to make sure the cart is empty on the initial home page load.'''
     homepage = HomePage(browser)
-    assert(homepage.cart_no_quantity() == '(empty)')
+    assert(homepage.is_cart_empty())
 
-def test_search_empty(browser):
+def test_search_empty(browser, checkout_url):
     '''Test to make sure that not inputing a search term that the user gets
     the appropiate message.'''
     homepage = HomePage(browser)
-    browser.get(PRACTICE_WEBPAGE_CART_CHECKOUT_URL)
+    browser.get(checkout_url)
     homepage.search_and_click('') # Empty string.
     searchpage = SearchResultsPage(browser)
     assert(searchpage.check_results_expect_empty('Please enter a search keyword'))
 
-def test_search_known_good_search_term(browser):
+def test_search_known_good_search_term(browser, checkout_url):
     '''Test to make sure that a known search term get the correct results.'''
     homepage = HomePage(browser)
-    browser.get(PRACTICE_WEBPAGE_CART_CHECKOUT_URL)
+    browser.get(checkout_url)
     homepage.search_and_click('Dress') # Empty string.
     searchpage = SearchResultsPage(browser)
     assert(searchpage.check_results_known_search_term('Dress'))
+    assert(searchpage.check_results_count(minimum=1))
 
-def test_switch_to_list_view(browser):
+def test_switch_to_list_view(browser, scenario):
     '''Switch to list view and confirm the action took place.'''
+    scenario.search('Dress')
     searchpage = SearchResultsPage(browser)
-    searchpage.switch_check_to_list_view()
+    assert(searchpage.switch_check_to_list_view())
 
-def test_switch_to_grid_view(browser):
+def test_switch_to_grid_view(browser, scenario):
     '''Switch to grid view and confirm the action took place.'''
+    scenario.search('Dress')
     searchpage = SearchResultsPage(browser)
-    searchpage.switch_check_to_grid_view()
+    # results open in grid view, leave it first.
+    assert(searchpage.switch_check_to_list_view())
+    assert(searchpage.switch_check_to_grid_view())
 
 def test_sign_on(browser):
     '''Test the sign going to the sign on page.'''
-    homepage = HomePage(browser)
-    browser.get(PRACTICE_WEBPAGE_HOME_URL)
     signonpage = SignInPage(browser)
-
     assert(signonpage.click_signin_page())
 
-def test_user_validation(browser):
-    '''Test the sign on feature with various incorrect variations.
-    We'll end off on a good signon.'''
-    signonpage = SignInPage(browser)
-    signonpage.check_login_behavior()
-
-def test_sign_off(browser):
-    '''Test the sign going to the sign on page.'''
+# One test item per case of data/logins.yml, so a failing case doesn't hide the
+# others and the matrix spreads over pytest-xdist workers like any other test.
+LOGIN_CASES = load_login_cases()
+
+@pytest.mark.parametrize('login_case', LOGIN_CASES,
+                         ids=['{:02d}-{}'.format(num, case['use_case']) for num, case in enumerate(LOGIN_CASES)])
+def test_user_validation(login_check, login_case):
+    '''Test the sign on feature with a variation from the login data. Every case
+    starts from a fresh, signed out session.'''
+    login_check(login_case)
+
+def test_sign_off(browser, scenario):
+    '''Test the sign going to the sign on page. Signing off ends the session,
+    so this test signs in on its own instead of using the cached session
+    other tests and workers share.'''
+    assert(scenario.login(USERNAME, PASSWORD))
     signonpage = SignInPage(browser)
+    signonpage.refresh()
     assert(signonpage.click_logout())
 
 def test_load_cart_home_page(browser):
-    '''Test ordering on the main page for correctness.
-    This also primes the cart page with expected items.'''
-    # Initialize the home page driver and go to the home page.
+    '''Test ordering on the main page for correctness.'''
+    # Initialize the home page driver.
     homepage = HomePage(browser)
-    browser.get(PRACTICE_WEBPAGE_HOME_URL)
+    cart_list = []
 
     # Get items from home page to test the cart feature for correctness.
+    # The catalog holds every product's name and price, read in one go.
+    catalog = homepage.catalog()
     cart_items = homepage.items_list()
 
     # Test adding the cart items from the home page by itereating through each items.
-    for num, item in enumerate(cart_items):
-        (name, price) = homepage.hover_then_click_add(item)
+    for product in catalog:
+        (name, price) = homepage.hover_then_click_add(cart_items[product.index], product)
         cart_list.append({'name': name, 'price': price, 'number_of_items': 1})
         model = CartModal(browser)
 
@@ -131,10 +111,10 @@ def test_load_cart_home_page(browser):
         # Clost the modal that pops up after checking the data is correct.
         model.close_modal()
 
-def test_cart_cookies(browser):
-    '''Now that the cart is loaded. Let's test that the cookies can be removed and added.'''
+def test_cart_cookies(browser, restored_cart):
+    '''With a restored cart, test that the cookies can be removed and added.'''
     homepage = HomePage(browser)
-    qty_total = sum([i['number_of_items'] for i in cart_list])
+    qty_total = sum([i['number_of_items'] for i in restored_cart])
 
     # Get current cookies, delete and refresh page to check cart items.
     cookies = browser.get_cookies()
@@ -145,49 +125,56 @@ def test_cart_cookies(browser):
     # Restore cookies and check cart qty to make sure the items have been restored.
     [browser.add_cookie(c) for c in cookies]
     browser.refresh()
-    
+
     assert(homepage.cart_quantity() == qty_total)
 
-def test_load_cart_page(browser):
+def test_cart_survives_in_cookies(cart_state, store_client, home_url):
+    '''The captured cart cookies alone bring the cart back, checked over HTTP.'''
+    qty_total = sum([i['number_of_items'] for i in cart_state.items])
+    assert(store_client.cart_quantity() == 0)
+    client = StoreClient.from_cookies(home_url, cart_state.cookies)
+    assert(client.cart_quantity() == qty_total)
+    assert(client.check_cart_correctness(total_shipping_cost, cart_state.items))
+
+def test_load_cart_page(browser, restored_cart):
     '''Go to the cart page for checkout. Make sure we are in the page.'''
     cartpage = CartPage(browser)
     assert(cartpage.click_cart_page())
 
-def test_current_cart_numbers(browser):
+def test_current_cart_numbers(cart_check, restored_cart):
     '''Check to make sure the numbers in the cart are good.'''
-    cartpage = CartPage(browser)
-    assert(cartpage.check_cart_correctness(total_shipping_cost, cart_list))
+    assert(cart_check(total_shipping_cost, restored_cart))
 
-def test_add_product_to_cart(browser):
+def test_add_product_to_cart(cartpage, cart_list):
     '''Check to make sure additional items fo a product can be added.'''
-    cartpage = CartPage(browser)
     (qty, total_item_price) = cartpage.add_product_item()
     cart_list[0]['number_of_items'] += 1
     assert(qty == cart_list[0]['number_of_items'])
     assert(total_item_price == (cart_list[0]['price'] * cart_list[0]['number_of_items']))
     assert(cartpage.check_cart_correctness(total_shipping_cost, cart_list))
 
-def test_remove_product_from_cart(browser):
+def test_remove_product_from_cart(cartpage, cart_list):
     '''Check to make sure additional items fo a product can be removed.'''
-    cartpage = CartPage(browser)
+    # Start from a quantity of two so there is something to take away.
+    cartpage.add_product_item()
+    cart_list[0]['number_of_items'] += 1
+
     (qty, total_item_price) = cartpage.delete_product_item()
     cart_list[0]['number_of_items'] -= 1
     assert(qty == cart_list[0]['number_of_items'])
     assert(total_item_price == (cart_list[0]['price'] * cart_list[0]['number_of_items']))
-    cartpage.check_cart_correctness(total_shipping_cost, cart_list)
+    assert(cartpage.check_cart_correctness(total_shipping_cost, cart_list))
 
-def test_remove_item_from_cart(browser):
+def test_remove_item_from_cart(cartpage, cart_list):
     '''Check to make sure a product can be removed from the cart list.'''
-    cartpage = CartPage(browser)
     cartpage.remove_product_item()
     del(cart_list[0])
     assert(cartpage.check_cart_correctness(total_shipping_cost, cart_list))
 
-def test_user_must_signin_to_checkout(browser):
-    '''We are signed off at this point. Let's make sure when we checkout it takes
+def test_user_must_signin_to_checkout(browser, cartpage):
+    '''A fresh session is signed off. Let's make sure when we checkout it takes
     us to the sign on page and then the next step, to fill out address info.'''
     # We'll be visiting the sign on and cart page.
-    cartpage = CartPage(browser)
     signonpage = SignInPage(browser)
 
     # Checkout and make sure we are in the sign in page.
@@ -197,3 +184,36 @@ def test_user_must_signin_to_checkout(browser):
     # Fill out authentication with valid username and password then check page.
     signonpage.fillout_authenticator(USERNAME, PASSWORD)
     assert(cartpage.is_address_page())
+
+def test_signed_in_checkout(signed_in, cartpage):
+    '''A signed in user checks out straight to the address info, without the
+    sign on page in between.'''
+    cartpage.checkout()
+    assert(cartpage.is_address_page())
+
+def test_concurrent_tabs(browser, home_url, launch_options):
+    '''Run a search check and a cart check interleaved in two isolated tabs
+    of the leased browser, driven over the DevTools protocol.'''
+
+    async def check_search(chrome):
+        tab = await (await chrome.new_context()).new_page()
+        homepage = AsyncHomePage(tab)
+        await homepage.get(home_url)
+        await homepage.search_and_click('')
+        searchpage = AsyncSearchResultsPage(tab)
+        return await searchpage.check_results_expect_empty('Please enter a search keyword')
+
+    async def check_cart(chrome):
+        tab = await (await chrome.new_context()).new_page()
+        homepage = AsyncHomePage(tab)
+        await homepage.get(home_url)
+        cart_list = await homepage.add_to_cart(await homepage.catalog())
+        cartpage = AsyncCartPage(tab)
+        assert(await cartpage.click_cart_page())
+        return await cartpage.check_cart_correctness(total_shipping_cost, cart_list)
+
+    async def run():
+        async with await Browser.attach(browser, launch_options) as chrome:
+            return await asyncio.gather(check_search(chrome), check_cart(chrome))
+
+    assert(all(asyncio.run(run())))
@@ -0,0 +1,25 @@
+'''Run the stand-in storefront: python -m storefront --port 8000'''
+import argparse
+
+from storefront.server import StorefrontServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the practice storefront.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--verbose', action='store_true', help='Log every request.')
+    args = parser.parse_args()
+
+    server = StorefrontServer(args.host, args.port, verbose=args.verbose)
+    print('Serving the storefront at {}'.format(server.home_url))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
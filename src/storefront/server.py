@@ -0,0 +1,191 @@
+'''HTTP server of the stand-in storefront.
+
+Serves index.php with the home, search, cart (page and AJAX controller),
+authentication, my-account and order controllers the tests use. Sessions live
+in memory and are keyed by a cookie, so dropping and restoring cookies empties
+and restores the cart just like on the real store.'''
+import json
+import mimetypes
+import os
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from storefront import templates
+from storefront.store import Store, authenticate, search
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+class StorefrontHandler(BaseHTTPRequestHandler):
+    '''Routes a request to its controller.'''
+
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def do_GET(self):
+        self.handle_request({})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        self.handle_request(dict(parse_qsl(body, keep_blank_values=True)))
+
+    def handle_request(self, form):
+        url = urlsplit(self.path)
+        if url.path.startswith('/static/'):
+            return self.send_static(url.path[len('/static/'):])
+        if url.path not in ('/', '/index.php'):
+            return self.send_html(404, '<h1>Page not found</h1>')
+
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        params.update(form)
+        cookie = SimpleCookie(self.headers.get('Cookie'))
+        key = cookie[Store.COOKIE].value if Store.COOKIE in cookie else None
+        self.session, self.new_session = self.store.session(key)
+
+        if 'mylogout' in params:
+            self.session.customer = None
+            return self.redirect('index.php?controller=authentication')
+
+        controller = params.get('controller', 'index')
+        handler = getattr(self, 'controller_' + controller.replace('-', '_'), None)
+        if handler is None:
+            return self.send_html(404, '<h1>Page not found</h1>')
+        handler(params)
+
+    # Controllers.
+
+    def controller_index(self, params):
+        self.send_html(200, templates.home(self.session, self.store.token))
+
+    def controller_search(self, params):
+        query = params.get('search_query', '')
+        products = search(query) if query.strip() else []
+        self.send_html(200, templates.search(self.session, self.store.token, query, products))
+
+    def controller_cart(self, params):
+        try:
+            product_id = int(params.get('id_product') or 0)
+            if 'delete' in params:
+                self.session.delete(product_id)
+            elif 'add' in params:
+                qty = int(params.get('qty') or 1)
+                self.session.add(product_id, -qty if params.get('op') == 'down' else qty)
+        except (KeyError, ValueError):
+            return self.send_json({'hasError': True, 'errors': ['Product not found']})
+        if 'ajax' in params:
+            return self.send_json(self.session.summary())
+        self.redirect('index.php?controller=order')
+
+    def controller_order(self, params):
+        if params.get('step') and not self.session.customer:
+            return self.redirect('index.php?controller=authentication&back=order%26step%3D1')
+        if params.get('step'):
+            return self.send_html(200, templates.addresses(self.session, self.store.token))
+        self.send_html(200, templates.cart(self.session, self.store.token))
+
+    def controller_authentication(self, params):
+        back = params.get('back', '')
+        if 'SubmitLogin' not in params:
+            return self.send_html(200, templates.authentication(self.session, self.store.token, back=back))
+        email = params.get('email', '')
+        error, customer = authenticate(email, params.get('passwd', ''))
+        if error:
+            return self.send_html(200, templates.authentication(
+                self.session, self.store.token, email=email, back=back, error=error))
+        self.session.customer = customer
+        if not back:
+            back = 'my-account'
+        self.redirect('index.php?controller=' + back)
+
+    def controller_my_account(self, params):
+        if not self.session.customer:
+            return self.redirect('index.php?controller=authentication&back=my-account')
+        self.send_html(200, templates.my_account(self.session, self.store.token))
+
+    # Responses.
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if getattr(self, 'new_session', False):
+            self.send_header('Set-Cookie', '{}={}; Path=/; HttpOnly'.format(Store.COOKIE, self.session.key))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_html(self, status, html):
+        self.send_body(status, 'text/html; charset=utf-8', html.encode('utf-8'))
+
+    def send_json(self, data):
+        self.send_body(200, 'application/json', json.dumps(data).encode('utf-8'))
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', '/' + location)
+        self.send_header('Content-Length', '0')
+        if self.new_session:
+            self.send_header('Set-Cookie', '{}={}; Path=/; HttpOnly'.format(Store.COOKIE, self.session.key))
+        self.end_headers()
+
+    def send_static(self, name):
+        path = os.path.join(STATIC_DIR, os.path.basename(name))
+        if not os.path.isfile(path):
+            return self.send_html(404, '<h1>Not found</h1>')
+        with open(path, 'rb') as static:
+            body = static.read()
+        self.new_session = False
+        self.send_body(200, mimetypes.guess_type(path)[0] or 'application/octet-stream', body)
+
+
+class StorefrontServer(object):
+    '''Runs the stand-in storefront on a background thread.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on, 0 picks a free one.
+        verbose (bool): Log every request to stderr.'''
+
+    def __init__(self, host='127.0.0.1', port=0, verbose=False):
+        self.httpd = ThreadingHTTPServer((host, port), StorefrontHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.store = Store()
+        self.httpd.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        '''Base URL of the store, e.g. "http://127.0.0.1:8000".'''
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def home_url(self):
+        return self.url + '/index.php'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='storefront', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
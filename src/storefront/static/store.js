@@ -0,0 +1,116 @@
+/* Cart, modal and view behaviour of the stand-in storefront. Requests go
+ * through XMLHttpRequest so the page objects' AJAX waits can see them. */
+(function () {
+    'use strict';
+
+    function post(params, done) {
+        var xhr = new XMLHttpRequest();
+        xhr.open('POST', baseUri + '?rand=' + new Date().getTime(), true);
+        xhr.setRequestHeader('Content-Type', 'application/x-www-form-urlencoded');
+        xhr.onload = function () { done(JSON.parse(xhr.responseText)); };
+        xhr.send(params + '&ajax=true&token=' + static_token);
+    }
+
+    function each(selector, fn) {
+        var elements = document.querySelectorAll(selector);
+        for (var i = 0; i < elements.length; i++) { fn(elements[i]); }
+    }
+
+    function show(selector, visible) {
+        each(selector, function (el) { el.style.display = visible ? '' : 'none'; });
+    }
+
+    function setText(selector, text) {
+        each(selector, function (el) { el.textContent = text; });
+    }
+
+    function updateHeader(cart) {
+        var qty = cart.nbTotalProducts;
+        setText('.ajax_cart_quantity', qty);
+        setText('.ajax_cart_total', cart.productTotal);
+        show('.shopping_cart .ajax_cart_quantity, .shopping_cart .ajax_cart_total', qty > 0);
+        show('.shopping_cart .ajax_cart_product_txt', qty === 1);
+        show('.shopping_cart .ajax_cart_product_txt_s', qty > 1);
+        show('.shopping_cart .ajax_cart_no_product', qty === 0);
+    }
+
+    function findProduct(cart, id) {
+        for (var i = 0; i < cart.products.length; i++) {
+            if (String(cart.products[i].id) === String(id)) { return cart.products[i]; }
+        }
+        return null;
+    }
+
+    function showModal(cart, id) {
+        var product = findProduct(cart, id);
+        var modal = document.getElementById('layer_cart');
+        document.getElementById('layer_cart_product_title').textContent = product.name;
+        document.getElementById('layer_cart_product_quantity').textContent = 1;
+        document.getElementById('layer_cart_product_price').textContent =
+            '$' + (product.price_float / product.quantity).toFixed(2);
+        setText('#layer_cart .ajax_block_products_total', cart.productTotal);
+        setText('#layer_cart .ajax_cart_shipping_cost', cart.shippingCost);
+        setText('#layer_cart .ajax_block_cart_total', cart.total);
+        modal.style.top = (window.pageYOffset + 80) + 'px';
+        modal.style.display = 'block';
+    }
+
+    function updateSummary(cart, id) {
+        var key = id + '_' + id + '_0_0';
+        var row = document.getElementById('product_' + key);
+        var product = findProduct(cart, id);
+        if (row && product) {
+            each('#product_' + key + ' input', function (input) { input.value = product.quantity; });
+            document.getElementById('total_product_price_' + key).textContent = product.price;
+        } else if (row) {
+            row.parentNode.removeChild(row);
+        }
+        setText('#total_product', cart.productTotal);
+        setText('#total_shipping', cart.shippingCost);
+        setText('#total_price_without_tax', cart.total);
+        setText('#total_price', cart.total);
+        if (!cart.products.length) { window.location.reload(); }
+    }
+
+    function switchView(view) {
+        each('.product_list', function (list) {
+            list.classList.remove(view === 'list' ? 'grid' : 'list');
+            list.classList.add(view);
+        });
+        each('.display li', function (li) { li.classList.toggle('selected', li.id === view); });
+    }
+
+    document.addEventListener('click', function (event) {
+        var target = event.target.closest('a, span, li');
+        if (!target) { return; }
+        var id = target.getAttribute('data-id-product');
+
+        if (target.classList.contains('ajax_add_to_cart_button')) {
+            event.preventDefault();
+            post('controller=cart&add=1&qty=1&id_product=' + id, function (cart) {
+                updateHeader(cart);
+                showModal(cart, id);
+            });
+        } else if (target.classList.contains('cross') || target.classList.contains('continue')) {
+            show('#layer_cart', false);
+        } else if (target.classList.contains('cart_quantity_up') ||
+                   target.classList.contains('cart_quantity_down')) {
+            event.preventDefault();
+            var op = target.classList.contains('cart_quantity_up') ? 'up' : 'down';
+            post('controller=cart&add=1&summary=1&qty=1&op=' + op + '&id_product=' + id, function (cart) {
+                updateHeader(cart);
+                updateSummary(cart, id);
+            });
+        } else if (target.classList.contains('cart_quantity_delete')) {
+            event.preventDefault();
+            post('controller=cart&delete=1&summary=1&id_product=' + id, function (cart) {
+                updateHeader(cart);
+                updateSummary(cart, id);
+            });
+        } else if (target.id === 'grid' || target.id === 'list' ||
+                   (target.parentNode && (target.parentNode.id === 'grid' || target.parentNode.id === 'list'))) {
+            event.preventDefault();
+            switchView(target.id || target.parentNode.id);
+        }
+    });
+}());
@@ -0,0 +1,152 @@
+'''Data and business rules of the stand-in storefront.
+
+Prices are kept in cents so totals add up exactly like the real store shows them.'''
+import re
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+
+Product = namedtuple('Product', ['id', 'name', 'category', 'description', 'price', 'old_price'])
+
+# The featured products of the practice store, prices in cents.
+PRODUCTS = OrderedDict((p.id, p) for p in [
+    Product(1, 'Faded Short Sleeve T-shirts', 'T-shirts',
+            'Faded short sleeve t-shirt with high neckline.', 1651, None),
+    Product(2, 'Blouse', 'Blouses',
+            'Short sleeved blouse with feminine draped sleeve detail.', 2700, None),
+    Product(3, 'Printed Dress', 'Casual Dresses',
+            '100% cotton double printed dress. Black and white striped top.', 2600, None),
+    Product(4, 'Printed Dress', 'Evening Dresses',
+            'Printed evening dress with straight sleeves with black thin waist belt.', 5099, None),
+    Product(5, 'Printed Summer Dress', 'Summer Dresses',
+            'Long printed dress with thin adjustable straps.', 2898, 3051),
+    Product(6, 'Printed Summer Dress', 'Summer Dresses',
+            'Sleeveless knee-length chiffon dress.', 3050, None),
+    Product(7, 'Printed Chiffon Dress', 'Summer Dresses',
+            'Printed chiffon knee length dress with tank straps.', 1640, 2050),
+])
+
+# Shipping cost is static at $2.00
+SHIPPING = 200
+
+# email -> (password, first name, last name)
+ACCOUNTS = {
+    'something@something.com': ('something', 'something', 'something'),
+}
+
+# Close to PrestaShop's Validate::isEmail, a domain with a dot is required.
+EMAIL_RE = re.compile(r"^[a-z0-9!#$%&'*+/=?^`{}|~_-]+[.a-z0-9!#$%&'*+/=?^`{}|~_-]*"
+                      r"@[a-z0-9]+(?:[.]?[_a-z0-9-])*\.[a-z0-9]+$", re.IGNORECASE)
+MIN_PASSWORD_LENGTH = 5
+
+
+def money(cents):
+    '''Format cents as the store does, e.g. "$16.51".'''
+    return '${}.{:02d}'.format(cents // 100, cents % 100)
+
+
+def authenticate(email, password):
+    '''Validate a login like the store does.
+
+    Returns (tuple): (error message or None, email when the login succeeded).'''
+    email = email.strip()
+    if not email:
+        return ('An email address required.', None)
+    if not EMAIL_RE.match(email):
+        return ('Invalid email address.', None)
+    if not password:
+        return ('Password is required.', None)
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return ('Invalid password.', None)
+    account = ACCOUNTS.get(email.lower())
+    if account is None or account[0] != password:
+        return ('Authentication failed.', None)
+    return (None, email.lower())
+
+
+def search(query):
+    '''Products whose name, category or description contain the query.'''
+    query = query.strip().lower()
+    return [p for p in PRODUCTS.values()
+            if query in p.name.lower() or query in p.category.lower() or query in p.description.lower()]
+
+
+class Session(object):
+    '''One visitor: their cart (product id -> quantity) and signed in customer.'''
+
+    def __init__(self, key):
+        self.key = key
+        self.cart = OrderedDict()
+        self.customer = None
+
+    def add(self, product_id, qty=1):
+        '''Change the quantity of a product, removing it once it reaches 0.'''
+        if product_id not in PRODUCTS:
+            raise KeyError(product_id)
+        qty = self.cart.get(product_id, 0) + qty
+        if qty > 0:
+            self.cart[product_id] = qty
+        else:
+            self.cart.pop(product_id, None)
+
+    def delete(self, product_id):
+        self.cart.pop(product_id, None)
+
+    def lines(self):
+        '''(product, quantity, line total in cents) for every cart line.'''
+        return [(PRODUCTS[pid], qty, PRODUCTS[pid].price * qty) for pid, qty in self.cart.items()]
+
+    @property
+    def quantity(self):
+        return sum(self.cart.values())
+
+    @property
+    def products_total(self):
+        return sum(total for _, _, total in self.lines())
+
+    @property
+    def shipping(self):
+        return SHIPPING if self.cart else 0
+
+    @property
+    def total(self):
+        return self.products_total + self.shipping
+
+    def summary(self):
+        '''The cart as the AJAX cart controller returns it.'''
+        return {'products': [{'id': p.id, 'idCombination': p.id, 'name': p.name,
+                              'quantity': qty, 'price': money(p.price * qty),
+                              'price_float': total / 100.0}
+                             for p, qty, total in self.lines()],
+                'nbTotalProducts': self.quantity,
+                'productTotal': money(self.products_total),
+                'shippingCost': money(self.shipping),
+                'total': money(self.total),
+                'hasError': False}
+
+    def customer_name(self):
+        '''"First Last" of the signed in customer.'''
+        _, first, last = ACCOUNTS[self.customer]
+        return '{} {}'.format(first, last)
+
+
+class Store(object):
+    '''All the sessions of a running storefront, keyed by cookie value.'''
+
+    COOKIE = 'storefront'
+
+    def __init__(self):
+        self.sessions = {}
+        self.token = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def session(self, key):
+        '''Get the session for a cookie value, creating one if it is unknown.
+
+        Returns (tuple): (session, bool that is True for a new session).'''
+        with self._lock:
+            if key in self.sessions:
+                return (self.sessions[key], False)
+            session = Session(uuid.uuid4().hex)
+            self.sessions[session.key] = session
+            return (session, True)
@@ -0,0 +1,217 @@
+'''HTML of the stand-in storefront.
+
+The markup mirrors the practice store closely enough for every locator in
+pom/locators.py, including the absolute XPaths into the header, to resolve to
+the same element it does on the real site.'''
+from html import escape
+
+from storefront.store import PRODUCTS, money
+
+LAYOUT = '''<!DOCTYPE html>
+<html>
+<head>
+<title>{title}</title>
+<meta charset="utf-8">
+<link rel="stylesheet" href="static/store.css">
+<script>var baseUri = 'index.php'; var static_token = '{token}';</script>
+<script src="static/store.js"></script>
+</head>
+<body id="{page}">
+<div id="page">
+<div id="header">
+<div class="banner"></div>
+<div class="nav"><div class="container"><div class="row"><nav>{user_info}</nav></div></div></div>
+<div><div class="container"><div class="row">
+<div id="header_logo"><a href="index.php" title="My Store">My Store</a></div>
+<div id="search_block_top"><form id="searchbox" method="get" action="index.php">
+<input type="hidden" name="controller" value="search">
+<input class="search_query" type="text" id="search_query_top" name="search_query" placeholder="Search" value="{query}">
+<button type="submit" name="submit_search" class="button-search">Search</button>
+</form></div>
+<div class="clearfix"><div class="shopping_cart"><a href="index.php?controller=order" title="View my shopping cart"><b>Cart</b> <span class="ajax_cart_quantity"{hide_full}>{quantity}</span><span class="ajax_cart_product_txt"{hide_one}>Product</span><span class="ajax_cart_product_txt_s"{hide_many}>Products</span><span class="ajax_cart_total"{hide_full}>{products_total}</span><span class="ajax_cart_no_product"{hide_empty}>(empty)</span></a></div></div>
+</div></div></div>
+</div>
+<div id="columns">
+<div class="breadcrumb"><a class="home" href="index.php" title="Return to Home">Home</a><span class="navigation-pipe">&gt;</span><span class="navigation_page">{crumb}</span></div>
+<div id="center_column">
+{center}
+</div>
+</div>
+{layer_cart}
+</div>
+</body>
+</html>
+'''
+
+SIGNED_OUT = '''<div class="header_user_info"><a class="login" href="index.php?controller=my-account" rel="nofollow" title="Log in to your customer account">Sign in</a></div>'''
+
+SIGNED_IN = '''<div class="header_user_info"><a class="account" href="index.php?controller=my-account" title="View my customer account" rel="nofollow"><span>{name}</span></a></div>
+<div class="header_user_info"><a class="logout" href="index.php?mylogout=" rel="nofollow" title="Log me out">Sign out</a></div>'''
+
+LAYER_CART = '''<div id="layer_cart" style="display: none;">
+<div class="layer_cart_product">
+<span class="cross" title="Close window">&times;</span>
+<h2>Product successfully added to your shopping cart</h2>
+<div class="layer_cart_product_info">
+<span id="layer_cart_product_title" class="product-name"></span>
+<div><strong>Quantity</strong> <span id="layer_cart_product_quantity"></span></div>
+<div><strong>Total</strong> <span id="layer_cart_product_price"></span></div>
+</div>
+</div>
+<div class="layer_cart_cart">
+<h2>There are <span class="ajax_cart_quantity"></span> items in your cart.</h2>
+<div class="layer_cart_line"><strong>Total products</strong> <span class="ajax_block_products_total"></span></div>
+<div class="layer_cart_line"><strong>Total shipping</strong> <span class="ajax_cart_shipping_cost"></span></div>
+<div class="layer_cart_line"><strong>Total</strong> <span class="ajax_block_cart_total"></span></div>
+<div class="button-container"><span class="continue button" title="Continue shopping">Continue shopping</span>
+<a class="button" href="index.php?controller=order" title="Proceed to checkout" rel="nofollow">Proceed to checkout</a></div>
+</div>
+</div>'''
+
+PRODUCT_ITEM = '''<li class="ajax_block_product">
+<div class="product-container">
+<div class="left-block"><a class="product_img_link" href="{url}" title="{name}"><img class="replace-2x" src="static/product.svg" alt="{name}" title="{name}" width="125" height="125"></a>
+<div class="content_price"><span class="price product-price">{price}</span>{old_price}</div></div>
+<div class="right-block"><h5><a class="product-name" href="{url}" title="{name}">{name}</a></h5>
+<span class="availability"><span class="available-now">In stock</span></span>
+<div class="row"><p class="product-desc">{description}</p></div>
+<div class="button-container"><a class="button ajax_add_to_cart_button" href="index.php?controller=cart&amp;add=1&amp;id_product={id}" rel="nofollow" title="Add to cart" data-id-product="{id}"><span>Add to cart</span></a></div>
+</div>
+</div>
+</li>'''
+
+OLD_PRICE = '''<span class="old-price product-price">{old}</span><span class="price-percent-reduction">-{percent}%</span>'''
+
+CART_ROW = '''<tr id="product_{key}" class="cart_item" data-id-product="{id}">
+<td class="cart_product"><img src="static/product.svg" alt="{name}" width="98" height="98"></td>
+<td class="cart_description"><p class="product-name">{name}</p></td>
+<td class="cart_avail"><span class="label">In stock</span></td>
+<td class="cart_unit"><span class="price">{price}</span></td>
+<td class="cart_quantity"><input type="hidden" value="{qty}" name="quantity_{key}_hidden"><input size="2" type="text" autocomplete="off" class="cart_quantity_input" value="{qty}" name="quantity_{key}"><div class="cart_quantity_button"><a rel="nofollow" class="cart_quantity_down" id="cart_quantity_down_{key}" href="#" data-id-product="{id}" title="Subtract">-</a><a rel="nofollow" class="cart_quantity_up" id="cart_quantity_up_{key}" href="#" data-id-product="{id}" title="Add">+</a></div></td>
+<td class="cart_total"><span class="price" id="total_product_price_{key}">{total}</span></td>
+<td class="cart_delete"><div><a rel="nofollow" title="Delete" class="cart_quantity_delete" id="{key}" href="#" data-id-product="{id}">Delete</a></div></td>
+</tr>'''
+
+CART = '''<h1 id="cart_title" class="page-heading">Shopping-cart summary</h1>
+<p>Your shopping cart contains: <span class="ajax_cart_quantity">{quantity}</span> products</p>
+<div id="order-detail-content">
+<table id="cart_summary">
+<thead><tr><th>Product</th><th>Description</th><th>Avail.</th><th>Unit price</th><th>Qty</th><th>Total</th><th>&nbsp;</th></tr></thead>
+<tbody>
+{rows}
+</tbody>
+<tfoot>
+<tr><td colspan="5">Total products</td><td class="price" id="total_product">{products_total}</td></tr>
+<tr><td colspan="5">Total shipping</td><td class="price" id="total_shipping">{shipping}</td></tr>
+<tr><td colspan="5">Total</td><td class="price" id="total_price_without_tax">{total}</td></tr>
+<tr><td colspan="5">Total</td><td class="price" id="total_price_container"><span id="total_price">{total}</span></td></tr>
+</tfoot>
+</table>
+</div>
+<p class="cart_navigation clearfix"><a href="index.php?controller=order&amp;step=1" class="button standard-checkout" title="Proceed to checkout">Proceed to checkout</a> <a href="index.php" class="button-exclusive" title="Continue shopping">Continue shopping</a></p>'''
+
+EMPTY_CART = '''<h1 id="cart_title" class="page-heading">Shopping-cart summary</h1>
+<p class="alert alert-warning">Your shopping cart is empty.</p>'''
+
+AUTHENTICATION = '''<h1 class="page-heading">Authentication</h1>
+{errors}<div class="auth-forms">
+<form action="index.php?controller=authentication" method="post" id="login_form" class="box">
+<h3 class="page-subheading">Already registered?</h3>
+<div class="form-group"><label for="email">Email address</label><input class="form-control" type="text" id="email" name="email" value="{email}"></div>
+<div class="form-group"><label for="passwd">Password</label><input class="form-control" type="password" id="passwd" name="passwd" value=""></div>
+<input type="hidden" class="hidden" name="back" value="{back}">
+<button type="submit" id="SubmitLogin" name="SubmitLogin" class="button">Sign in</button>
+</form>
+</div>'''
+
+ERRORS = '''<div class="alert alert-danger"><p>There is 1 error</p><ol><li>{message}</li></ol></div>
+'''
+
+MY_ACCOUNT = '''<h1 class="page-heading">My account</h1>
+<p class="info-account">Welcome to your account. Here you can manage all of your personal information and orders.</p>'''
+
+ADDRESSES = '''<h1 class="page-heading">Addresses</h1>
+<p>The selected address will be used both as your personal address (for invoice) and as your delivery address.</p>
+<ul class="address"><li class="address_name">{name}</li></ul>
+<p class="cart_navigation clearfix"><a href="index.php?controller=order" class="button-exclusive" title="Previous">Continue Shopping</a></p>'''
+
+SEARCH_RESULTS = '''<h1 class="page-heading product-listing">Search <span class="lighter">"{query}"</span> <span class="heading-counter">{count} result{plural} {verb} been found.</span></h1>
+<div class="content_sortPagiBar"><ul class="display"><li class="display-title">View:</li><li id="grid" class="selected"><a rel="nofollow" href="#" title="Grid"><i class="icon-th-large">Grid</i></a></li><li id="list"><a rel="nofollow" href="#" title="List"><i class="icon-th-list">List</i></a></li></ul></div>
+<ul class="product_list grid row">
+{items}
+</ul>'''
+
+SEARCH_ALERT = '''<h1 class="page-heading product-listing">Search</h1>
+<p class="alert alert-warning">{message}</p>'''
+
+
+def product_item(product):
+    old_price = ''
+    if product.old_price:
+        percent = int(round(100 - 100.0 * product.price / product.old_price))
+        old_price = OLD_PRICE.format(old=money(product.old_price), percent=percent)
+    return PRODUCT_ITEM.format(id=product.id, name=escape(product.name),
+                               url='index.php?id_product={}&amp;controller=product'.format(product.id),
+                               price=money(product.price), old_price=old_price,
+                               description=escape(product.description))
+
+
+def layout(session, token, title, center, crumb='', page='index', query=''):
+    '''Wrap the center column in the header, breadcrumb and cart modal.'''
+    def hide(hidden):
+        return ' style="display: none;"' if hidden else ''
+    quantity = session.quantity
+    user_info = SIGNED_IN.format(name=escape(session.customer_name())) if session.customer else SIGNED_OUT
+    return LAYOUT.format(title=escape(title), token=token, page=page, user_info=user_info,
+                         query=escape(query), quantity=quantity,
+                         products_total=money(session.products_total),
+                         hide_full=hide(not quantity), hide_one=hide(quantity != 1),
+                         hide_many=hide(quantity < 2), hide_empty=hide(quantity),
+                         crumb=escape(crumb), center=center, layer_cart=LAYER_CART)
+
+
+def home(session, token):
+    items = '\n'.join(product_item(p) for p in PRODUCTS.values())
+    center = '<ul id="homefeatured" class="product_list grid row homefeatured">\n{}\n</ul>'.format(items)
+    return layout(session, token, 'My Store', center)
+
+
+def cart(session, token):
+    if not session.cart:
+        center = EMPTY_CART
+    else:
+        rows = '\n'.join(CART_ROW.format(key='{0}_{0}_0_0'.format(p.id), id=p.id, name=escape(p.name),
+                                         price=money(p.price), qty=qty, total=money(total))
+                         for p, qty, total in session.lines())
+        center = CART.format(rows=rows, quantity=session.quantity,
+                             products_total=money(session.products_total),
+                             shipping=money(session.shipping), total=money(session.total))
+    return layout(session, token, 'Order - My Store', center, crumb='Your shopping cart', page='order')
+
+
+def authentication(session, token, email='', back='', error=None):
+    errors = ERRORS.format(message=escape(error)) if error else ''
+    center = AUTHENTICATION.format(errors=errors, email=escape(email), back=escape(back))
+    return layout(session, token, 'Login - My Store', center, crumb='Authentication', page='authentication')
+
+
+def my_account(session, token):
+    return layout(session, token, 'My account - My Store', MY_ACCOUNT, crumb='My account', page='my-account')
+
+
+def addresses(session, token):
+    center = ADDRESSES.format(name=escape(session.customer_name()))
+    return layout(session, token, 'Order - My Store', center, crumb='Addresses', page='order')
+
+
+def search(session, token, query, products):
+    if not query.strip():
+        center = SEARCH_ALERT.format(message='Please enter a search keyword')
+    elif not products:
+        center = SEARCH_ALERT.format(message='No results were found for your search "{}"'.format(escape(query)))
+    else:
+        center = SEARCH_RESULTS.format(query=escape(query.upper()), count=len(products),
+                                       plural='s' if len(products) != 1 else '',
+                                       verb='have' if len(products) != 1 else 'has',
+                                       items='\n'.join(product_item(p) for p in products))
+    return layout(session, token, 'Search - My Store', center, crumb='Search', page='search', query=query)